@@ -1,18 +1,17 @@
 import os
-from openai import AzureOpenAI
+import sys
 
-client = AzureOpenAI(
-    api_key=os.environ.get("AZURE_OPENAI_API_KEY"),  
+# Shared completion client (pooled HTTP connections, batch helpers)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from genai_common.completion import CompletionClient
+
+deployment_name='gpt-35-turbo-instruct'
+client = CompletionClient.azure(
+    deployment_name,
+    azure_endpoint="https://rk-aiworks.openai.azure.com/",
     api_version="2024-02-01",
-    azure_endpoint = "https://rk-aiworks.openai.azure.com/"
+    max_tokens=200,
     )
-deployment_name='gpt-35-turbo-instruct'
-
-# Common code to get response from OpenAI
-def generate_response(prompt):
-    # Generate the completion
-    response = client.completions.create(model=deployment_name, prompt=prompt, max_tokens=200)
-    return response.choices[0].text
 
 text = (
     "Generative AI is a type of artificial intelligence that can create new content, "
@@ -22,4 +21,4 @@ text = (
 )
 
 print("Summarization Example:")
-print(generate_response(text))
\ No newline at end of file
+print(client.generate_response(text))
\ No newline at end of file
@@ -1,18 +1,23 @@
 import os
-from openai import AzureOpenAI
+import sys
 
-client = AzureOpenAI(
-    api_key=os.environ.get("AZURE_OPENAI_API_KEY"),  
+# Shared completion client (pooled HTTP connections, batch helpers)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from genai_common.azure import AzureDeployment, RateLimitedAzureClient
+from genai_common.tokens import PromptBudget
+
+deployment_name='gpt-35-turbo-instruct'
+# Requests are paced to the deployment's quota (tokens and requests per minute) and
+# 429 responses are retried after the Retry-After delay instead of crashing the script.
+# Add more AzureDeployment entries to spread the load over several deployments.
+client = RateLimitedAzureClient(
+    [AzureDeployment(deployment_name, tpm=120_000, rpm=720)],
+    azure_endpoint="https://rk-aiworks.openai.azure.com/",
     api_version="2024-02-01",
-    azure_endpoint = "https://rk-aiworks.openai.azure.com/"
+    max_tokens=200,
+    # Count the prompt locally and lower max_tokens to what the context window has left
+    fit_max_tokens=True,
     )
-deployment_name='gpt-35-turbo-instruct'
-
-# Common code to get response from OpenAI
-def generate_response(prompt):
-     # Generate the completion
-    response = client.completions.create(model=deployment_name, prompt=prompt, max_tokens=200)
-    return response.choices[0].text
 
 context = (
     "Generative AI is a type of artificial intelligence that can create new content, "
@@ -20,10 +25,22 @@ context = (
     "that is similar to the data it was trained on. This technology has a wide range of "
     "applications, including content creation, data augmentation, and more."
 )
-question = "What is Generative AI?"
+questions = [
+    "What is Generative AI?",
+    "What are the applications of Generative AI?",
+]
+
+# Trim the context if it would not leave room for the questions and a 200 token answer
+budget = PromptBudget(deployment_name, completion_tokens=client.max_tokens)
+question_tokens = max(budget.count(f"Context: \nQuestion: {question}\nAnswer:") for question in questions)
+context = budget.fit(context, reserve=question_tokens)
+
+prompts = [f"Context: {context}\nQuestion: {question}\nAnswer:" for question in questions]
 
-prompt = f"Context: {context}\nQuestion: {question}\nAnswer:"
+# Answer all the questions concurrently, results come back in the same order
+answers = client.generate_many(prompts, concurrency=4)
 
 print("\nQuestion and Answering Example:")
-print(f"Question: {question}")
-print(f"Answer: {generate_response(prompt)}")
\ No newline at end of file
+for question, answer in zip(questions, answers):
+    print(f"Question: {question}")
+    print(f"Answer: {answer}")
\ No newline at end of file
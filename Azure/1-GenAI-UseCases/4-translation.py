@@ -1,28 +1,21 @@
-import openai
 import os
+import sys
 
-# Set up your OpenAI API credentials
-openai.api_key = os.environ.get("OPENAI_API_KEY")
+# Shared completion client (pooled HTTP connections, batch helpers)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from genai_common.completion import CompletionClient
 
-# Common code to get response from OpenAI
-def generate_response(prompt):
-    response = openai.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=500,
-        n=1,
-        stop=None,
-        temperature=0.3
-    )
-    return response.choices[0].message.content.strip()
+# Set up your OpenAI API credentials (read from OPENAI_API_KEY)
+client = CompletionClient(model="gpt-3.5-turbo", max_tokens=500, temperature=0.3)
 
 text = "Generative AI can create new content such as text, images, and music."
-target_language = "Hindi"
-prompt=f"Translate the following text to {target_language}:\n\n{text}"
+target_languages = ["Hindi", "French", "Spanish"]
+prompts = [f"Translate the following text to {target_language}:\n\n{text}" for target_language in target_languages]
+
+# Translate to every language concurrently, results come back in the same order
+translations = client.generate_many(prompts, concurrency=4)
 
 print("\nTranslation Example:")
 print(f"Original Text: {text}")
-print(f"Translated Text: {generate_response(prompt)}")
\ No newline at end of file
+for target_language, translation in zip(target_languages, translations):
+    print(f"Translated Text ({target_language}): {translation}")
\ No newline at end of file
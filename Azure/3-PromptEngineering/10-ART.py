@@ -1,30 +1,29 @@
 import os
-from openai import AzureOpenAI
+import sys
 
-client = AzureOpenAI(
-    api_key=os.environ.get("AZURE_OPENAI_API_KEY"),  
-    api_version="2024-02-01",
-    azure_endpoint = "https://rk-aiworks.openai.azure.com/"
-    )
-deployment_name='gpt-35-turbo-instruct'
+# Shared completion client (pooled HTTP connections, batch helpers)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from genai_common.completion import CompletionClient
+from genai_common.tools import ExpressionError, ToolRegistry
 
+deployment_name='gpt-35-turbo-instruct'
 # Common code to get response from Azure OpenAI
-def generate_response(prompt):
-    # Generate the completion
-    response = client.completions.create(model=deployment_name, prompt=prompt, max_tokens=500)
-    return response.choices[0].text
+client = CompletionClient.azure(
+    deployment_name,
+    azure_endpoint="https://rk-aiworks.openai.azure.com/",
+    api_version="2024-02-01",
+    max_tokens=500,
+    )
+generate_response = client.generate_response
 
 # Example for Automatic Reasoning and Tool-Use (ART)
 
-# Function to simulate using a tool based on the reasoning step
+# Tools the reasoning steps can use (e.g., a calculator, web search, etc.)
+# The calculator parses the expression into an AST and only allows arithmetic, so model output is never run with eval().
+tools = ToolRegistry.with_defaults()
+
 def use_tool(tool_name, input_data):
-    # Simulate tool usage (e.g., a calculator, web search, etc.)
-    if tool_name == "calculator":
-        return eval(input_data)
-    elif tool_name == "web_search":
-        return f"Results for '{input_data}'"
-    else:
-        return "Tool not recognized"
+    return tools.use_tool(tool_name, input_data)
 
 # Initial task
 initial_prompt = "Calculate the sum of the first 10 prime numbers."
@@ -36,7 +35,26 @@ tool_prompt = "Use a calculator to find the sum of the first 10 prime numbers."
 tool_result = use_tool("calculator", "2 + 3 + 5 + 7 + 11 + 13 + 17 + 19 + 23 + 29")
 print("Tool Result:", tool_result)
 
+# A reasoning step can ask for several tools at once; they run concurrently
+check_results = tools.use_tools([
+    ("calculator", "sum(2, 3, 5, 7, 11, 13, 17, 19, 23, 29) / 10"),
+    ("web_search", "first 10 prime numbers"),
+])
+print("Average of the primes:", check_results[0])
+print("Search Result:", check_results[1])
+
+# Expressions that would run for minutes or exhaust memory are rejected, not evaluated
+for expression in ("(9 ** 4096) ** 4096", "round(1, -10**8)"):
+    try:
+        use_tool("calculator", expression)
+    except ExpressionError as exc:
+        print(f"Rejected {expression!r}: {exc}")
+
 # Integrate the tool result into the final response
 final_prompt = f"Based on the tool result ({tool_result}), provide the final answer to the task: {initial_prompt}"
 final_response = generate_response(final_prompt)
-print("Final Response:", final_response)
\ No newline at end of file
+print("Final Response:", final_response)
+
+# Which tool took the most time
+for tool_name, histogram in tools.latency_histograms().items():
+    print(f"{tool_name}: {histogram['count']} calls, mean {histogram['mean'] * 1000:.3f} ms")
\ No newline at end of file
@@ -1,33 +1,55 @@
 import os
-from openai import AzureOpenAI
+import sys
 
-client = AzureOpenAI(
-    api_key=os.environ.get("AZURE_OPENAI_API_KEY"),  
+# Shared completion client (pooled HTTP connections, batch helpers)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from genai_common import telemetry
+from genai_common.chain import Stage, StreamingChain
+from genai_common.completion import CompletionClient
+
+deployment_name='gpt-35-turbo-instruct'
+# Common code to get response from Azure OpenAI
+client = CompletionClient.azure(
+    deployment_name,
+    azure_endpoint="https://rk-aiworks.openai.azure.com/",
     api_version="2024-02-01",
-    azure_endpoint = "https://rk-aiworks.openai.azure.com/"
+    max_tokens=200,
     )
-deployment_name='gpt-35-turbo-instruct'
-
-# Common code to get response from OpenAI
-def generate_response(prompt):
-    # Generate the completion
-    response = client.completions.create(model=deployment_name, prompt=prompt, max_tokens=200)
-    return response.choices[0].text
 
 # Example 8: Prompt Chaining - Prompt chaining is a technique that involves using the output of one prompt as the input for the next prompt.
-# Initial prompt
-initial_prompt = "Write an outline for a blog post about the benefits of AI in healthcare."
+# Each stage streams its output as it is generated, so the first words show up after one time-to-first-token
+# instead of after three full completions, and a stage is sent the moment the stage it depends on has finished.
+chain = StreamingChain(client, [
+    # Initial prompt
+    Stage("Outline", "Write an outline for a blog post about the benefits of AI in healthcare."),
+    # Use the outline to generate the introduction
+    Stage(
+        "Introduction",
+        "Using the following outline, write an introduction for the blog post:\n\n{Outline}\n\nIntroduction:",
+        depends_on=["Outline"],
+    ),
+    # Use the introduction to generate the first section
+    Stage(
+        "First Section",
+        "Using the following introduction, write the first section of the blog post:\n\n{Introduction}\n\nFirst Section:",
+        depends_on=["Introduction"],
+    ),
+])
 
-# Generate the outline
-outline = generate_response(initial_prompt)
-print("Outline:", outline)
+result = chain.run(on_stage=lambda stage: print(f"\n{stage.name}:", end=" ", flush=True))
 
-# Use the outline to generate the introduction
-intro_prompt = f"Using the following outline, write an introduction for the blog post:\n\n{outline}\n\nIntroduction:"
-introduction = generate_response(intro_prompt)
-print("Introduction:", introduction)
+print("\n")
+for name, timing in result.timings.items():
+    # A stage that streamed no tokens has no time to first token
+    first_token = "-" if timing.time_to_first_token is None else f"{timing.time_to_first_token:.2f}s"
+    print(f"{name}: time to first token {first_token}, total {timing.duration:.2f}s")
+print(f"Whole chain: {result.total_time:.2f}s")
 
-# Use the introduction to generate the first section
-section_prompt = f"Using the following introduction, write the first section of the blog post:\n\n{introduction}\n\nFirst Section:"
-first_section = generate_response(section_prompt)
-print("First Section:", first_section)
\ No newline at end of file
+# With GENAI_TELEMETRY_JSONL or GENAI_METRICS_PORT set, show which stage used the most time and tokens
+recorder = telemetry.get_recorder()
+if recorder is not None:
+    for (script, stage, model), totals in recorder.summary().items():
+        print(
+            f"{stage or '-'}: {totals['calls']} calls, {totals['wall_time']:.2f}s, "
+            f"{totals['prompt_tokens']} prompt + {totals['completion_tokens']} completion tokens"
+        )
@@ -1,36 +1,37 @@
 import os
-from openai import AzureOpenAI
+import sys
 
-client = AzureOpenAI(
-    api_key=os.environ.get("AZURE_OPENAI_API_KEY"),  
-    api_version="2024-02-01",
-    azure_endpoint = "https://rk-aiworks.openai.azure.com/"
-    )
-deployment_name='gpt-35-turbo-instruct'
+# Shared completion client (pooled HTTP connections, batch helpers)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from genai_common.completion import CompletionClient
+from genai_common.tree_of_thoughts import ThoughtNode, TreeOfThoughts
 
+deployment_name='gpt-35-turbo-instruct'
 # Common code to get response from Azure OpenAI
-def generate_response(prompt):
-    # Generate the completion
-    response = client.completions.create(model=deployment_name, prompt=prompt, max_tokens=500)
-    return response.choices[0].text
-
+client = CompletionClient.azure(
+    deployment_name,
+    azure_endpoint="https://rk-aiworks.openai.azure.com/",
+    api_version="2024-02-01",
+    max_tokens=500,
+    )
+generate_response = client.generate_response
 
-# In this example: ThoughtNode Class: Represents a node in the Tree of Thoughts, with each node containing a thought and references to its parent and children. 
-# generate_response Function: Uses OpenAI’s API to generate responses based on the given prompt. 
-# Tree Expansion: Starts with an initial thought and expands the tree by generating new thoughts based on the previous ones.
-# Class to represent a node in the thought tree
 
-class ThoughtNode:
-    def __init__(self, thought, parent=None):
-        self.thought = thought
-        self.parent = parent
-        self.children = []
+# In this example: ThoughtNode Class: Represents a node in the Tree of Thoughts, with each node containing a thought, its score and references to its parent and children. 
+# generate_response: the shared client's blocking call, used for the root thought and to score every new thought.
+# Tree Expansion: TreeOfThoughts starts with an initial thought and expands the tree level by level. Every node in the beam gets
+# branching_factor new thoughts, each new thought is scored by the model, and only the beam_width best ones are expanded further.
+# All thoughts of one level are generated at the same time, so the run takes `depth` rounds of calls however wide the tree is.
+# generate_candidates asks for all the children of a node in one request (n=branching_factor) instead of repeating the same prompt.
 
-    def add_child(self, child_thought):
-        child_node = ThoughtNode(child_thought, parent=self)
-        self.children.append(child_node)
-        return child_node
-    
+tree_of_thoughts = TreeOfThoughts(
+    generate_response,
+    generate_candidates=client.generate_candidates,
+    branching_factor=2,
+    depth=2,
+    beam_width=2,
+    expand_prompt="Expand on the idea: {thought}",
+)
 
 # Initial thought
 initial_prompt = "Generate ideas for a new AI project."
@@ -38,15 +39,12 @@ root = ThoughtNode(generate_response(initial_prompt))
 print("Root Thought:", root.thought)
 
 # Expand the tree with new thoughts
-first_child = root.add_child(generate_response(f"Expand on the idea: {root.thought}"))
-print("First Child Thought:", first_child.thought)
-
-second_child = root.add_child(generate_response(f"Expand on the idea: {root.thought}"))
-print("Second Child Thought:", second_child.thought)
+best = tree_of_thoughts.search(root)
 
-# Further expand the tree
-first_grandchild = first_child.add_child(generate_response(f"Expand on the idea: {first_child.thought}"))
-print("First Grandchild Thought:", first_grandchild.thought)
+for node in root.walk():
+    if node is not root:
+        print(f"{'  ' * node.depth}Depth {node.depth} Thought (score {node.score}):", node.thought)
 
-second_grandchild = second_child.add_child(generate_response(f"Expand on the idea: {second_child.thought}"))
-print("Second Grandchild Thought:", second_grandchild.thought)
\ No newline at end of file
+print("Best Thought Path:")
+for depth, thought in enumerate(best.path()):
+    print(f"{'  ' * depth}{thought}")
\ No newline at end of file
@@ -1,11 +1,19 @@
-from langchain_openai import AzureOpenAI
+from langchain_openai import AzureOpenAI, AzureOpenAIEmbeddings
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.globals import set_llm_cache
 
 import streamlit as st
 import os
+import sys
 from dotenv import load_dotenv
 
+# Per-call latency and token usage (enabled by GENAI_TELEMETRY_JSONL / GENAI_METRICS_PORT)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+from genai_common import telemetry
+from genai_common.llm_cache import SQLiteLLMCache
+from genai_common.semantic_cache import SemanticLLMCache
+
 load_dotenv()
 os.environ["AZURE_OPENAI_API_KEY"]=os.getenv('AZURE_OPENAI_API_KEY')
 os.environ["AZURE_OPENAI_ENDPOINT"]=os.getenv('AZURE_OPENAI_ENDPOINT')
@@ -23,6 +31,15 @@ prompt=ChatPromptTemplate.from_messages(
     ]
 )
 
+## One response cache per process, shared by every session: repeated and rephrased questions skip the API
+## Only the question is embedded; the system message must match exactly. Check the threshold for the
+## embedding model with benchmarks/bench_semantic_cache.py --embeddings <model> before lowering it.
+@st.cache_resource
+def llm_cache():
+    return SemanticLLMCache(AzureOpenAIEmbeddings(azure_deployment="text-embedding-3-large"), threshold=0.95, exact_cache=SQLiteLLMCache())
+
+set_llm_cache(llm_cache())
+
 ## streamlit framework
 
 st.title('Langchain Demo With OPENAI API')
@@ -34,4 +51,4 @@ output_parser=StrOutputParser()
 chain=prompt|llm|output_parser
 
 if input_text:
-    st.write(chain.invoke({'question':input_text}))
\ No newline at end of file
+    st.write(chain.invoke({'question':input_text}, config={"callbacks": [telemetry.langchain_callback("app")]}))
\ No newline at end of file
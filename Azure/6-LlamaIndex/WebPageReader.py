@@ -1,13 +1,22 @@
 import os
+import sys
 from dotenv import load_dotenv
 from llama_index.readers.web import SimpleWebPageReader
-from llama_index.core import VectorStoreIndex
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from genai_common.mmap_vector_store import load_or_build_index
+
+PERSIST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "storage-webpage")
 
 
 def ragllm():
-    documents = SimpleWebPageReader(html_to_text=True).load_data(["https://paulgraham.com/worked.html"])
-    print(documents[0].text)
-    index = VectorStoreIndex.from_documents(documents)
+    def load_documents():
+        documents = SimpleWebPageReader(html_to_text=True).load_data(["https://paulgraham.com/worked.html"])
+        print(documents[0].text)
+        return documents
+
+    # Embeds the page on the first run only; later runs memory-map the stored index.
+    index = load_or_build_index(PERSIST_DIR, load_documents)
     query_engine = index.as_query_engine()
     response = query_engine.query("What is this page about?")
     print(response)
@@ -1,6 +1,7 @@
 from crewai import Crew,Process
 from tasks import research_task,write_task
 from agents import news_researcher,news_writer
+from genai_common import telemetry
 
 ## Forming the tech focused crew with some enhanced configuration
 crew=Crew(
@@ -12,5 +13,6 @@ crew=Crew(
 
 ## starting the task execution process wiht enhanced feedback
 
-result=crew.kickoff(inputs={'topic':'AI in healthcare'})
+with telemetry.stage("crew.kickoff"):
+    result=crew.kickoff(inputs={'topic':'AI in healthcare'})
 print(result)
\ No newline at end of file
@@ -1,16 +1,22 @@
 import os
-from openai import AzureOpenAI
+import sys
 
-client = AzureOpenAI(
-    api_key=os.environ.get("AZURE_OPENAI_API_KEY"),  
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from genai_common.azure import AzureDeployment, RateLimitedAzureClient
+
+deployment_name='gpt-35-turbo-instruct'
+# Keep-alive connections, client-side pacing to the deployment quota and
+# Retry-After aware retries when Azure answers 429
+client = RateLimitedAzureClient(
+    [AzureDeployment(deployment_name, tpm=120_000, rpm=720)],
     api_version="2024-02-01",
-    azure_endpoint = "https://rk-aiworks.openai.azure.com/"
+    azure_endpoint = "https://rk-aiworks.openai.azure.com/",
+    max_tokens=10,
     )
-deployment_name='gpt-35-turbo-instruct'
     
 # Send a completion call to generate an answer
 print('Sending a test completion job')
 start_phrase = 'Write a tagline for an ice cream shop. '
-response = client.completions.create(model=deployment_name, prompt=start_phrase, max_tokens=10)
+response = client.generate_response(start_phrase)
 
-print(start_phrase+response.choices[0].text)
\ No newline at end of file
+print(start_phrase+response)
\ No newline at end of file
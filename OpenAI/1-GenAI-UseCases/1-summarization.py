@@ -1,23 +1,12 @@
-import openai
 import os
+import sys
 
-# Set up your OpenAI API credentials
-openai.api_key = os.environ.get("OPENAI_API_KEY")
-openai.api_type = 'openai'
-# Common code to get response from OpenAI
-def generate_response(prompt):
-    response = openai.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=500,
-        n=1,
-        stop=None,
-        temperature=0.3
-    )
-    return response.choices[0].message.content.strip()
+# Shared completion client (pooled HTTP connections, batch helpers)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from genai_common.completion import CompletionClient
+
+# Set up your OpenAI API credentials (read from OPENAI_API_KEY)
+client = CompletionClient(model="gpt-3.5-turbo", max_tokens=500, temperature=0.3)
 
 text = (
     "Generative AI is a type of artificial intelligence that can create new content, "
@@ -27,4 +16,4 @@ text = (
 )
 
 print("Summarization Example:")
-print(generate_response(text))
\ No newline at end of file
+print(client.generate_response(text))
\ No newline at end of file
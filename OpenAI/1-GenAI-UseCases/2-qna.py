@@ -1,24 +1,20 @@
-import openai
 import os
+import sys
 
-# Set up your OpenAI API credentials
-openai.api_key = os.environ.get("OPENAI_API_KEY")
-openai.api_type = 'openai'
+# Shared completion client (pooled HTTP connections, batch helpers)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from genai_common.completion import CompletionClient
+from genai_common.tokens import PromptBudget
 
-# Common code to get response from OpenAI
-def generate_response(prompt):
-    response = openai.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You wil answer the question from the given context only"},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=500,
-        n=1,
-        stop=None,
-        temperature=0.3
-    )
-    return response.choices[0].message.content.strip()
+# Set up your OpenAI API credentials (read from OPENAI_API_KEY)
+client = CompletionClient(
+    model="gpt-3.5-turbo",
+    max_tokens=500,
+    temperature=0.3,
+    system_prompt="You wil answer the question from the given context only",
+    # Count the prompt locally and lower max_tokens to what the context window has left
+    fit_max_tokens=True,
+)
 
 context = (
     "Generative AI is a type of artificial intelligence that can create new content, "
@@ -26,10 +22,22 @@ context = (
     "that is similar to the data it was trained on. This technology has a wide range of "
     "applications, including content creation, data augmentation, and more."
 )
-question = "What is Generative AI?"
+questions = [
+    "What is Generative AI?",
+    "What are the applications of Generative AI?",
+]
+
+# Trim the context if it would not leave room for the questions and a 500 token answer
+budget = PromptBudget(client.model, completion_tokens=client.max_tokens, system_prompt=client.system_prompt)
+question_tokens = max(budget.count(f"Context: \nQuestion: {question}\nAnswer:") for question in questions)
+context = budget.fit(context, reserve=question_tokens)
+
+prompts = [f"Context: {context}\nQuestion: {question}\nAnswer:" for question in questions]
 
-prompt = f"Context: {context}\nQuestion: {question}\nAnswer:"
+# Answer all the questions concurrently, results come back in the same order
+answers = client.generate_many(prompts, concurrency=4)
 
 print("\nQuestion and Answering Example:")
-print(f"Question: {question}")
-print(f"Answer: {generate_response(prompt)}")
\ No newline at end of file
+for question, answer in zip(questions, answers):
+    print(f"Question: {question}")
+    print(f"Answer: {answer}")
\ No newline at end of file
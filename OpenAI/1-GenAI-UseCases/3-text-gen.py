@@ -1,26 +1,14 @@
-import openai
 import os
+import sys
 
-# Set up your OpenAI API credentials
-openai.api_key = os.environ.get("OPENAI_API_KEY")
-openai.api_type = 'openai'
+# Shared completion client (pooled HTTP connections, batch helpers)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from genai_common.completion import CompletionClient
 
-# Common code to get response from OpenAI
-def generate_response(prompt):
-    response = openai.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=500,
-        n=1,
-        stop=None,
-        temperature=0.3
-    )
-    return response.choices[0].message.content.strip()
+# Set up your OpenAI API credentials (read from OPENAI_API_KEY)
+client = CompletionClient(model="gpt-3.5-turbo", max_tokens=500, temperature=0.3)
 
 prompt = "Once upon a time, in a land far, far away,"
 
 print("\nText Generation Example:")
-print(generate_response(prompt))
\ No newline at end of file
+print(client.generate_response(prompt))
\ No newline at end of file
@@ -1,40 +1,31 @@
-import openai
 import os
+import sys
 
-# Set up your OpenAI API credentials
-openai.api_key = os.environ.get("OPENAI_API_KEY")
-openai.api_type = 'openai'
+# Shared completion client (pooled HTTP connections, batch helpers)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from genai_common.completion import CompletionClient
+from genai_common.tree_of_thoughts import ThoughtNode, TreeOfThoughts
+
+# Set up your OpenAI API credentials (read from OPENAI_API_KEY)
 # Common code to get response from OpenAI
-def generate_response(prompt):
-    response = openai.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=300,
-        n=1,
-        stop=None,
-        temperature=0.3
-    )
-    return response.choices[0].message.content.strip()
-
-# In this example: ThoughtNode Class: Represents a node in the Tree of Thoughts, with each node containing a thought and references to its parent and children. 
-# generate_response Function: Uses OpenAI’s API to generate responses based on the given prompt. 
-# Tree Expansion: Starts with an initial thought and expands the tree by generating new thoughts based on the previous ones.
-# Class to represent a node in the thought tree
-
-class ThoughtNode:
-    def __init__(self, thought, parent=None):
-        self.thought = thought
-        self.parent = parent
-        self.children = []
-
-    def add_child(self, child_thought):
-        child_node = ThoughtNode(child_thought, parent=self)
-        self.children.append(child_node)
-        return child_node
-    
+client = CompletionClient(model="gpt-3.5-turbo", max_tokens=300, temperature=0.3)
+generate_response = client.generate_response
+
+# In this example: ThoughtNode Class: Represents a node in the Tree of Thoughts, with each node containing a thought, its score and references to its parent and children. 
+# generate_response: the shared client's blocking call, used for the root thought and to score every new thought.
+# Tree Expansion: TreeOfThoughts starts with an initial thought and expands the tree level by level. Every node in the beam gets
+# branching_factor new thoughts, each new thought is scored by the model, and only the beam_width best ones are expanded further.
+# All thoughts of one level are generated at the same time, so the run takes `depth` rounds of calls however wide the tree is.
+# generate_candidates asks for all the children of a node in one request (n=branching_factor) instead of repeating the same prompt.
+
+tree_of_thoughts = TreeOfThoughts(
+    generate_response,
+    generate_candidates=client.generate_candidates,
+    branching_factor=2,
+    depth=2,
+    beam_width=2,
+    expand_prompt="Expand on the idea: {thought}",
+)
 
 # Initial thought
 initial_prompt = "Generate ideas for a new AI project."
@@ -42,15 +33,12 @@ root = ThoughtNode(generate_response(initial_prompt))
 print("Root Thought:", root.thought)
 
 # Expand the tree with new thoughts
-first_child = root.add_child(generate_response(f"Expand on the idea: {root.thought}"))
-print("First Child Thought:", first_child.thought)
-
-second_child = root.add_child(generate_response(f"Expand on the idea: {root.thought}"))
-print("Second Child Thought:", second_child.thought)
+best = tree_of_thoughts.search(root)
 
-# Further expand the tree
-first_grandchild = first_child.add_child(generate_response(f"Expand on the idea: {first_child.thought}"))
-print("First Grandchild Thought:", first_grandchild.thought)
+for node in root.walk():
+    if node is not root:
+        print(f"{'  ' * node.depth}Depth {node.depth} Thought (score {node.score}):", node.thought)
 
-second_grandchild = second_child.add_child(generate_response(f"Expand on the idea: {second_child.thought}"))
-print("Second Grandchild Thought:", second_grandchild.thought)
\ No newline at end of file
+print("Best Thought Path:")
+for depth, thought in enumerate(best.path()):
+    print(f"{'  ' * depth}{thought}")
\ No newline at end of file
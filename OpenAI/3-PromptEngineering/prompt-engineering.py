@@ -1,23 +1,25 @@
 # Importing necessary libraries
 import os
-from openai import OpenAI
+import sys
 
-client = OpenAI(
-    # This is the default and can be omitted
-    api_key=os.environ.get("OPENAI_API_KEY"),
+# Shared completion client (pooled HTTP connections, response cache)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from genai_common.cache import ResponseCache
+from genai_common.completion import CompletionClient
+
+client = CompletionClient(
+    # The API key is read from OPENAI_API_KEY
+    model="gpt-4",
+    max_tokens=150,
+    temperature=None,  # the API's default sampling
+    cache=ResponseCache(ttl=24 * 3600),
 )
 
-# Function to demonstrate different prompt engineering techniques
-def get_answer(prompt, model="gpt-4"):
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=150
-    )
-    return response.choices[0].message['content'].strip()
+# Function to demonstrate different prompt engineering techniques.
+# Only deterministic calls, get_answer(prompt, temperature=0), are cached on
+# disk and answered locally when rerun; the examples below sample as usual.
+def get_answer(prompt, model="gpt-4", temperature=None):
+    return client.generate_response(prompt, model=model, temperature=temperature)
 
 # Example 1: Zero-shot learning
 zero_shot_prompt = "Translate the following English text to French: 'Hello, how are you?'"
@@ -63,4 +65,6 @@ Solve the following math problem step by step:
 If a train travels at a speed of 60 miles per hour and it takes 2 hours to reach its destination, how far did the train travel?
 """
 chain_of_thought_response = get_answer(chain_of_thought_prompt)
-print("Chain of thought prompting response:", chain_of_thought_response)
\ No newline at end of file
+print("Chain of thought prompting response:", chain_of_thought_response)
+
+print("Response cache:", client.cache.stats())
\ No newline at end of file
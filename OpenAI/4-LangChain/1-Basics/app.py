@@ -1,11 +1,19 @@
-from langchain_openai import ChatOpenAI
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.globals import set_llm_cache
 
 import streamlit as st
 import os
+import sys
 from dotenv import load_dotenv
 
+# Per-call latency and token usage (enabled by GENAI_TELEMETRY_JSONL / GENAI_METRICS_PORT)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+from genai_common import telemetry
+from genai_common.llm_cache import SQLiteLLMCache
+from genai_common.semantic_cache import SemanticLLMCache
+
 load_dotenv()
 os.environ["OPENAI_API_KEY"]=os.getenv('OPENAI_API_KEY')
 ## Langmith tracking
@@ -21,6 +29,15 @@ prompt=ChatPromptTemplate.from_messages(
     ]
 )
 
+## One response cache per process, shared by every session: repeated and rephrased questions skip the API
+## Only the question is embedded; the system message must match exactly. Check the threshold for the
+## embedding model with benchmarks/bench_semantic_cache.py --embeddings <model> before lowering it.
+@st.cache_resource
+def llm_cache():
+    return SemanticLLMCache(OpenAIEmbeddings(), threshold=0.95, exact_cache=SQLiteLLMCache())
+
+set_llm_cache(llm_cache())
+
 ## streamlit framework
 
 st.title('Langchain Demo With OPENAI API')
@@ -32,4 +49,4 @@ output_parser=StrOutputParser()
 chain=prompt|llm|output_parser
 
 if input_text:
-    st.write(chain.invoke({'question':input_text}))
\ No newline at end of file
+    st.write(chain.invoke({'question':input_text}, config={"callbacks": [telemetry.langchain_callback("app")]}))
\ No newline at end of file
@@ -4,13 +4,19 @@ from dotenv import load_dotenv
 load_dotenv()
 from langchain_google_genai import ChatGoogleGenerativeAI
 import os
+import sys
+
+# Per-call latency and token usage (enabled by GENAI_TELEMETRY_JSONL / GENAI_METRICS_PORT)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+from genai_common import telemetry
 
 
 ## call the gemini models
 llm=ChatGoogleGenerativeAI(model="gemini-1.5-flash",
                            verbose=True,
                            temperature=0.5,
-                           google_api_key=os.getenv("GOOGLE_API_KEY"))
+                           google_api_key=os.getenv("GOOGLE_API_KEY"),
+                           callbacks=[telemetry.langchain_callback()])
 
 # Creating a senior researcher agent with memory and verbose mode
 
@@ -0,0 +1,52 @@
+"""Drive RateLimitedAzureClient against a fake deployment that answers 429s.
+
+Every N-th request to the fake server is rejected with ``Retry-After``; the
+run shows how many retries that cost and how the load was spread over the
+deployments:
+
+    python benchmarks/bench_azure_rate_limit.py --requests 200 --rate-limit-every 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from genai_common.azure import AzureDeployment, RateLimitedAzureClient
+from genai_common.fake_server import FakeOpenAIServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--deployments", type=int, default=2)
+    parser.add_argument("--rpm", type=int, default=6000, help="client-side RPM quota per deployment")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--rate-limit-every", type=int, default=5)
+    parser.add_argument("--retry-after", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(
+        latency=args.latency,
+        rate_limit_every=args.rate_limit_every,
+        retry_after=args.retry_after,
+    ) as server:
+        client = RateLimitedAzureClient(
+            [AzureDeployment(f"deployment-{i}", rpm=args.rpm) for i in range(args.deployments)],
+            azure_endpoint=server.endpoint,
+            api_key="test",
+        )
+        start = time.perf_counter()
+        answers = client.generate_many([f"Prompt {i}" for i in range(args.requests)], concurrency=args.concurrency)
+        elapsed = time.perf_counter() - start
+
+    print(f"{len(answers)} answers in {elapsed:.2f}s ({len(answers) / elapsed:.1f} req/s)")
+    print(f"429s from server: {server.rate_limited_count}, client retries: {client.stats()['retries']}")
+    for name, counts in client.stats()["deployments"].items():
+        print(f"  {name}: sent {counts['sent']}, throttled {counts['throttled']}")
+
+
+if __name__ == "__main__":
+    main()
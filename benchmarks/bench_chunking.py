@@ -0,0 +1,60 @@
+"""Throughput of token chunking, in-process and across worker processes.
+
+Builds ``--docs`` documents from the paragraphs of state_of_the_union.txt,
+then chunks them with one LangChain splitter in a loop and with
+genai_common.chunking.TokenChunker at each ``--processes`` level:
+
+    python benchmarks/bench_chunking.py --docs 20000 --method recursive --processes 1,2,4,8
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+from genai_common.chunking import METHODS, TokenChunker, build_splitter
+
+DEFAULT_FILE = os.path.join(ROOT, "OpenAI", "5-RAG", "example_data", "state_of_the_union.txt")
+
+
+def report(label, elapsed, docs, chunks, baseline=None):
+    speedup = f"  {baseline / elapsed:5.2f}x" if baseline else ""
+    print(f"{label:<28} {elapsed:7.2f}s  {docs / elapsed:9.0f} docs/s  {chunks:>9,} chunks{speedup}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", default=DEFAULT_FILE)
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--method", choices=METHODS, default="recursive")
+    parser.add_argument("--chunk-size", type=int, default=100)
+    parser.add_argument("--chunk-overlap", type=int, default=0)
+    parser.add_argument("--processes", default=f"1,2,4,{os.cpu_count() or 1}", help="comma-separated pool sizes")
+    parser.add_argument("--batch-size", type=int, default=64, help="documents per task sent to a worker")
+    args = parser.parse_args()
+
+    with open(args.file, encoding="utf-8") as f:
+        paragraphs = [p for p in f.read().split("\n\n") if p.strip()]
+    documents = [paragraphs[i % len(paragraphs)] for i in range(args.docs)]
+    options = {"chunk_size": args.chunk_size, "chunk_overlap": args.chunk_overlap}
+    print(f"{len(documents):,} documents, method={args.method}, {os.cpu_count()} CPUs")
+
+    splitter = build_splitter(args.method, **options)
+    start = time.perf_counter()
+    chunks = sum(len(splitter.split_text(text)) for text in documents)
+    baseline = time.perf_counter() - start
+    report("langchain split_text loop", baseline, len(documents), chunks)
+
+    for processes in sorted({int(level) for level in args.processes.split(",")}):
+        with TokenChunker(args.method, processes=processes, batch_size=args.batch_size, **options) as chunker:
+            chunker.split_texts(documents[: args.batch_size * processes], parallel=True)  # start the workers
+            start = time.perf_counter()
+            chunks = sum(len(c) for c in chunker.split_texts(documents, parallel=True))
+            elapsed = time.perf_counter() - start
+        report(f"TokenChunker processes={processes}", elapsed, len(documents), chunks, baseline)
+
+
+if __name__ == "__main__":
+    main()
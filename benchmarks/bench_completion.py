@@ -0,0 +1,56 @@
+"""Compare one-at-a-time generate_response calls with generate_many.
+
+Runs against the local fake server, so no API key is needed:
+
+    python benchmarks/bench_completion.py --prompts 64 --latency 0.05 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from genai_common.completion import CompletionClient
+from genai_common.fake_server import FakeOpenAIServer
+
+
+def timed(label, count, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.3f}s  {count / elapsed:8.1f} req/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--prompts", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added by the fake server")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    prompts = [f"Summarize item {i}" for i in range(args.prompts)]
+    with FakeOpenAIServer(latency=args.latency) as server:
+        client = CompletionClient(base_url=server.base_url, api_key="test")
+        # Warm the pool so connection setup is not counted against either mode.
+        client.generate_response("warm up")
+
+        sequential = timed("sequential", len(prompts), lambda: [client.generate_response(p) for p in prompts])
+        threaded = timed(
+            f"generate_many({args.concurrency})",
+            len(prompts),
+            lambda: client.generate_many(prompts, concurrency=args.concurrency),
+        )
+        timed(
+            f"agenerate_many({args.concurrency})",
+            len(prompts),
+            lambda: asyncio.run(client.agenerate_many(prompts, concurrency=args.concurrency)),
+        )
+        client.close()
+    print(f"speed-up (threads vs sequential): {sequential / threaded:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Cold and warm indexing through the embedding cache.
+
+Embeds ``--chunks`` chunks (state_of_the_union.txt split into 1000-character
+pieces, numbered so that every chunk is distinct) against the fake server's
+embeddings endpoint, then again with a fresh ``CachedEmbeddings`` on the
+same cache directory, as a notebook rebuilding its vector store would:
+
+    python benchmarks/bench_embedding_cache.py --chunks 20000 --latency 0.2
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+from bench_semantic import CountingEmbeddings
+from genai_common.completion import CompletionClient
+from genai_common.embedding_cache import CachedEmbeddings
+from genai_common.fake_server import FakeOpenAIServer
+from genai_common.splitters import StreamingRecursiveSplitter
+
+DEFAULT_FILE = os.path.join(ROOT, "OpenAI", "5-RAG", "example_data", "state_of_the_union.txt")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", default=DEFAULT_FILE)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds added to every embeddings request")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with open(args.file, encoding="utf-8") as f:
+        pieces = StreamingRecursiveSplitter(chunk_size=1000, chunk_overlap=0).split_text(f.read())
+    chunks = [f"[{i}] {pieces[i % len(pieces)]}" for i in range(args.chunks)]
+
+    with FakeOpenAIServer(latency=args.latency, embedding_dimensions=args.dimensions) as server, \
+            tempfile.TemporaryDirectory() as cache_dir:
+        client = CompletionClient(base_url=server.endpoint + "/v1", api_key="test").client
+        for label in ("cold", "warm"):
+            upstream = CountingEmbeddings(client)
+            embeddings = CachedEmbeddings(upstream, cache_dir=cache_dir, batch_size=args.batch_size)
+            start = time.perf_counter()
+            vectors = embeddings.embed_documents(chunks)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{label}: {elapsed:6.2f}s  {upstream.requests:>3} API requests  {upstream.texts:>6} texts sent  "
+                f"{len(vectors):,} vectors"
+            )
+        size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(cache_dir) for name in names)
+        print(f"cache size: {size / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Embedding throughput: fixed sequential batches vs EmbeddingExecutor.
+
+The baseline does what ``OpenAIEmbeddings.embed_documents`` does by default:
+batches of 1000 texts sent one after the other, every vector parsed into a
+list of floats. EmbeddingExecutor packs token-bounded batches, keeps
+several in flight and decodes straight into a float32 matrix. The fake
+server runs in its own process with ``--latency`` seconds per request, and
+can answer every N-th request with a 429:
+
+    python benchmarks/bench_embedding_executor.py --chunks 20000 --latency 0.3 --rate-limit-every 0
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+from genai_common.completion import CompletionClient
+from genai_common.embedding_executor import EmbeddingExecutor
+from genai_common.splitters import StreamingRecursiveSplitter
+
+DEFAULT_FILE = os.path.join(ROOT, "OpenAI", "5-RAG", "example_data", "state_of_the_union.txt")
+
+
+def start_server(args):
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "genai_common.fake_server",
+            "--latency", str(args.latency),
+            "--rate-limit-every", str(args.rate_limit_every),
+            "--retry-after", "0.5",
+            "--embedding-dimensions", str(args.dimensions),
+        ],
+        cwd=ROOT,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    endpoint = process.stdout.readline().strip()
+    if not endpoint:
+        process.kill()
+        raise RuntimeError("fake server did not start")
+    return process, endpoint
+
+
+def sequential(client, chunks, batch_size=1000):
+    vectors = []
+    for i in range(0, len(chunks), batch_size):
+        response = client.client.embeddings.create(model="text-embedding-3-small", input=chunks[i:i + batch_size])
+        vectors.extend(item.embedding for item in response.data)
+    return np.array(vectors, dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", default=DEFAULT_FILE)
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--chunk-size", type=int, default=1000, help="characters per chunk")
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds added to every request")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every N-th request with 429")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    args = parser.parse_args()
+
+    with open(args.file, encoding="utf-8") as f:
+        pieces = StreamingRecursiveSplitter(chunk_size=args.chunk_size, chunk_overlap=0).split_text(f.read())
+    chunks = [f"[{i}] {pieces[i % len(pieces)]}" for i in range(args.chunks)]
+
+    server, endpoint = start_server(args)
+    try:
+        client = CompletionClient(base_url=endpoint + "/v1", api_key="test", max_retries=8)
+        cpu, start = time.process_time(), time.perf_counter()
+        expected = sequential(client, chunks)
+        elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu
+        print(f"sequential batches of 1000  {elapsed:7.2f}s  {len(chunks) / elapsed:8.0f} chunks/s  client CPU {cpu:6.2f}s")
+
+        executor = EmbeddingExecutor(client)
+        cpu, start = time.process_time(), time.perf_counter()
+        matrix = executor.embed_array(chunks)
+        elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu
+        print(f"EmbeddingExecutor           {elapsed:7.2f}s  {len(chunks) / elapsed:8.0f} chunks/s  client CPU {cpu:6.2f}s")
+        print(f"  {executor.stats()}")
+        executor.close()
+        print(f"same vectors: {np.array_equal(expected, matrix)}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
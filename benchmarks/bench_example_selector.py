@@ -0,0 +1,154 @@
+"""Few-shot prompt formatting with thousands of examples: LangChain selectors vs NumpyExampleSelector.
+
+Builds ``--examples`` antonym examples with random ``--dimensions``-dimensional
+embeddings (an embeddings stub with a fixed vector per text, so no API is
+called and the query embedding costs nothing), and for the similarity and
+MMR selectors reports:
+
+* start-up: ``from_examples`` with an empty embedding cache and again with a
+  warm one, and the embedding calls each made;
+* ``FewShotPromptTemplate.format`` latency (mean and p99), which is what the
+  notebooks run for every input, and the mean cost of the query embedding
+  within it (the stub, through CachedEmbeddings for the NumPy selectors), so
+  that ``format - embed`` is the selection and formatting alone.
+
+Scoring reads the whole ``examples x dimensions`` float32 matrix once per
+input, so its time grows with the matrix size and memory bandwidth.
+
+The contenders are ``SemanticSimilarityExampleSelector`` and
+``MaxMarginalRelevanceExampleSelector`` over ``InMemoryVectorStore`` (and
+over FAISS or Chroma, as in the notebooks, when installed), and
+genai_common.example_selector's NumPy selectors.
+
+::
+
+    python benchmarks/bench_example_selector.py --examples 2000 --queries 200
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+import zlib
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+from langchain_core.embeddings import Embeddings
+from langchain_core.example_selectors import MaxMarginalRelevanceExampleSelector, SemanticSimilarityExampleSelector
+from langchain_core.prompts import FewShotPromptTemplate, PromptTemplate
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from genai_common.example_selector import NumpyExampleSelector, NumpyMMRExampleSelector
+
+try:
+    from langchain_community.vectorstores import FAISS
+    import faiss  # noqa: F401
+except ImportError:
+    FAISS = None
+try:
+    from langchain_chroma import Chroma
+except ImportError:
+    Chroma = None
+
+
+class StubEmbeddings(Embeddings):
+    """A fixed random vector per text, counting ``embed_documents`` calls."""
+
+    def __init__(self, dimensions):
+        self.dimensions = dimensions
+        self.calls = 0
+
+    def _vector(self, text):
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        return rng.standard_normal(self.dimensions, dtype=np.float32)
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [self._vector(text).tolist() for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text).tolist()
+
+
+def latencies(call, queries):
+    """ms of ``call(query)`` for every query."""
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        call(query)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--examples", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--k", type=int, default=2)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    examples = [{"input": f"word{i}", "output": f"antonym{i}"} for i in range(args.examples)]
+    queries = [f"query{i}" for i in range(args.queries)]
+    example_prompt = PromptTemplate.from_template("Input: {input}\nOutput: {output}")
+
+    stores = {"InMemoryVectorStore": InMemoryVectorStore, "FAISS": FAISS, "Chroma": Chroma}
+    missing = [name for name, store in stores.items() if store is None]
+    if missing:
+        print(f"{', '.join(missing)} not installed; skipping")
+    contenders = []
+    for name, store in stores.items():
+        if store is None:
+            continue
+        contenders.append((f"Semantic, {name}", lambda e, d, s=store: SemanticSimilarityExampleSelector.from_examples(
+            examples, e, s, k=args.k)))
+        contenders.append((f"MMR, {name}", lambda e, d, s=store: MaxMarginalRelevanceExampleSelector.from_examples(
+            examples, e, s, k=args.k, fetch_k=args.fetch_k)))
+    contenders.append(("NumpyExampleSelector", lambda e, d: NumpyExampleSelector.from_examples(
+        examples, e, k=args.k, cache_dir=d)))
+    contenders.append(("NumpyMMRExampleSelector", lambda e, d: NumpyMMRExampleSelector.from_examples(
+        examples, e, k=args.k, fetch_k=args.fetch_k, cache_dir=d)))
+
+    print(f"{args.examples} examples, {args.dimensions} dimensions, k={args.k}, fetch_k={args.fetch_k}")
+    print(f"{'':<32} {'cold start s':>12} {'warm start s':>12} {'calls':>7} {'format ms':>10} {'p99 ms':>8} {'embed ms':>9}")
+    for name, make in contenders:
+        cache_dir = tempfile.mkdtemp()
+        try:
+            embeddings = StubEmbeddings(args.dimensions)
+            start = time.perf_counter()
+            make(embeddings, cache_dir)
+            cold = time.perf_counter() - start
+            cold_calls = embeddings.calls
+            start = time.perf_counter()
+            selector = make(embeddings, cache_dir)
+            warm = time.perf_counter() - start
+            warm_calls = embeddings.calls - cold_calls
+            prompt = FewShotPromptTemplate(
+                example_selector=selector,
+                example_prompt=example_prompt,
+                prefix="Give the antonym of every input",
+                suffix="Input: {adjective}\nOutput:",
+                input_variables=["adjective"],
+            )
+            format_ = lambda query: prompt.format(adjective=query)
+            latencies(format_, queries[:10])
+            formats = latencies(format_, queries)
+            p99 = statistics.quantiles(formats, n=100)[98]
+            # The selector's own embeddings, on queries it has not seen.
+            embed = latencies(getattr(selector, "embeddings", embeddings).embed_query, [f"other {q}" for q in queries])
+            print(f"{name:<32} {cold:>12.2f} {warm:>12.2f} {f'{cold_calls}+{warm_calls}':>7} "
+                  f"{statistics.fmean(formats):>10.3f} {p99:>8.3f} {statistics.fmean(embed):>9.3f}")
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Hybrid keyword + vector search latency: LanceDB + LinearCombinationReranker vs HybridVectorStore.
+
+Splits the State of the Union text as the LanceDB notebook does, repeats the
+chunks up to ``--docs`` rows, and times keyword queries ("Ketanji Brown
+Jackson") and questions through:
+
+* the table of the LangChain ``LanceDB`` store, queried with
+  ``query_type="hybrid"`` and reranked by ``LinearCombinationReranker(weight)``.
+  ``LanceDB.similarity_search_with_score`` builds the full-text index on the
+  first hybrid query, refuses later ones, and passes a ``(vector, text)``
+  tuple that current lancedb rejects, so the benchmark builds the index once
+  and runs lancedb's hybrid query builder itself;
+* genai_common.hybrid_search.HybridVectorStore, fused by weighted sum and by RRF.
+
+The embedding model is a local hashed bag of words that sleeps
+``--embed-latency`` seconds per query, like a round trip to the API:
+
+    python benchmarks/bench_hybrid.py --docs 10000 --embed-latency 0.1
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+from langchain_community.document_loaders import TextLoader
+from langchain_text_splitters import CharacterTextSplitter
+
+from genai_common.hybrid_search import HybridVectorStore, tokenize
+
+try:
+    from langchain_community.vectorstores import LanceDB
+    from lancedb.rerankers import LinearCombinationReranker
+except ImportError:
+    LanceDB = None
+
+DEFAULT_FILE = os.path.join(ROOT, "OpenAI", "5-RAG", "example_data", "state_of_the_union.txt")
+KEYWORD_QUERIES = ["Ketanji Brown Jackson", "Intel Ohio", "NATO allies", "COVID vaccines"]
+QUESTIONS = [
+    "What did the president say about Ketanji Brown Jackson",
+    "How will the plan lower costs for American families?",
+    "What is being done to help Ukraine?",
+    "What did he say about police funding?",
+]
+
+
+class HashedEmbeddings:
+    """Hashed bag-of-words vectors, ``latency`` seconds per query, and a count of query embeddings."""
+
+    def __init__(self, dimensions, latency):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.queries = 0
+
+    def _vector(self, text):
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in tokenize(text):
+            vector[zlib.crc32(token.encode()) % self.dimensions] += 1
+        return (vector / max(np.linalg.norm(vector), 1.0)).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        time.sleep(self.latency)
+        self.queries += 1
+        return self._vector(text)
+
+
+def timed(search, queries, embeddings):
+    embeddings.queries = 0
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), embeddings.queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", default=DEFAULT_FILE)
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--weight", type=float, default=0.3, help="vector weight, as in the LanceDB notebook")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--embed-latency", type=float, default=0.1, help="seconds per query embedding")
+    args = parser.parse_args()
+
+    chunks = CharacterTextSplitter().split_documents(TextLoader(args.file).load())
+    texts = [f"{chunks[i % len(chunks)].page_content}\n(copy {i // len(chunks)})" for i in range(args.docs)]
+    embeddings = HashedEmbeddings(args.dimensions, args.embed_latency)
+
+    stores = {}
+    workdir = tempfile.mkdtemp()
+    try:
+        if LanceDB is None:
+            print("lancedb is not installed; timing HybridVectorStore only")
+        else:
+            reranker = LinearCombinationReranker(weight=args.weight)
+            lance = LanceDB.from_texts(texts, embeddings, uri=workdir, reranker=reranker)
+            table = lance.get_table()
+            table.create_fts_index("text", replace=True)
+
+            def lance_search(query):
+                results = (
+                    table.search(query_type="hybrid")
+                    .vector(embeddings.embed_query(query))
+                    .text(query)
+                    .limit(args.k)
+                    .rerank(reranker)
+                    .to_arrow()
+                )
+                return lance.results_to_docs(results, score=True)
+
+            stores["LanceDB + reranker"] = lance_search
+        for fusion in ("weighted", "rrf"):
+            store = HybridVectorStore.from_texts(texts, embeddings, fusion=fusion, weight=args.weight)
+            stores[f"HybridVectorStore {fusion}"] = lambda query, store=store: store.similarity_search_with_score(query, args.k)
+
+        print(f"{args.docs} chunks, {args.embed_latency * 1000:.0f} ms per query embedding; median ms per query")
+        print(f"{'':<28} {'keywords ms':>11} {'embeds':>6} {'questions ms':>12} {'embeds':>6}")
+        for name, search in stores.items():
+            search(QUESTIONS[0])  # warm up
+            keyword_ms, keyword_embeds = timed(search, KEYWORD_QUERIES, embeddings)
+            question_ms, question_embeds = timed(search, QUESTIONS, embeddings)
+            print(f"{name:<28} {keyword_ms:>11.1f} {keyword_embeds:>6} {question_ms:>12.1f} {question_embeds:>6}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
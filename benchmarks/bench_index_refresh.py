@@ -0,0 +1,109 @@
+"""Keeping a LlamaIndex index current: full rebuild vs refresh_index.
+
+Writes ``--files`` text files (slices of the Paul Graham essay) to a
+temporary data folder and indexes them. Then it changes ``--changed`` of
+them, adds and removes one, and brings the index up to date twice: once by
+rebuilding from scratch, as the starter notebook does, and once with
+genai_common.index_refresh.refresh_index. The embedding model is a local
+stand-in that sleeps ``--embed-latency`` seconds per batch, like a round
+trip to the API:
+
+    python benchmarks/bench_index_refresh.py --files 500 --changed 5 --embed-latency 0.2
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+from llama_index.core import Settings, SimpleDirectoryReader, StorageContext, VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+
+from genai_common.index_refresh import refresh_index
+from genai_common.mmap_vector_store import MmapVectorStore
+
+DEFAULT_FILE = os.path.join(ROOT, "OpenAI", "6-LlamaIndex", "data", "essay.txt")
+
+
+class SlowEmbedding(MockEmbedding):
+    """Random vectors, one ``latency`` sleep per batch, and a count of embedded texts."""
+
+    latency: float = 0.0
+    embedded: int = 0
+
+    def _vectors(self, texts):
+        time.sleep(self.latency)
+        self.embedded += len(texts)
+        return np.random.default_rng(len(texts)).standard_normal((len(texts), self.embed_dim)).tolist()
+
+    def _get_text_embedding(self, text):
+        return self._vectors([text])[0]
+
+    def _get_text_embeddings(self, texts):
+        return self._vectors(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", default=DEFAULT_FILE)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--changed", type=int, default=5)
+    parser.add_argument("--embed-latency", type=float, default=0.2, help="seconds per embedding batch")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    args = parser.parse_args()
+
+    with open(args.file, encoding="utf-8") as f:
+        paragraphs = [p for p in f.read().split("\n\n") if p.strip()]
+    embed_model = SlowEmbedding(embed_dim=args.dimensions, latency=args.embed_latency)
+    Settings.embed_model = embed_model
+
+    workdir = tempfile.mkdtemp()
+    try:
+        data = os.path.join(workdir, "data")
+        os.makedirs(data)
+        for i in range(args.files):
+            with open(os.path.join(data, f"doc{i:05d}.txt"), "w", encoding="utf-8") as f:
+                f.write(f"Document {i}.\n\n" + "\n\n".join(paragraphs[(i + k) % len(paragraphs)] for k in range(3)))
+        storage = os.path.join(workdir, "storage")
+        start = time.perf_counter()
+        refresh_index(storage, data)
+        print(f"initial build       {time.perf_counter() - start:7.2f}s  {embed_model.embedded:6d} chunks embedded")
+
+        for i in range(args.changed):
+            with open(os.path.join(data, f"doc{i:05d}.txt"), "a", encoding="utf-8") as f:
+                f.write("\n\nAn edit made after the index was built.")
+        os.remove(os.path.join(data, f"doc{args.files - 1:05d}.txt"))
+        with open(os.path.join(data, "new.txt"), "w", encoding="utf-8") as f:
+            f.write(paragraphs[0])
+
+        embed_model.embedded = 0
+        start = time.perf_counter()
+        storage_context = StorageContext.from_defaults(vector_store=MmapVectorStore())
+        index = VectorStoreIndex.from_documents(SimpleDirectoryReader(data).load_data(), storage_context=storage_context)
+        index.storage_context.persist(persist_dir=os.path.join(workdir, "rebuilt"))
+        print(f"full rebuild        {time.perf_counter() - start:7.2f}s  {embed_model.embedded:6d} chunks embedded")
+
+        embed_model.embedded = 0
+        start = time.perf_counter()
+        _, changes = refresh_index(storage, data)
+        elapsed = time.perf_counter() - start
+        print(f"refresh_index       {elapsed:7.2f}s  {embed_model.embedded:6d} chunks embedded")
+        print(f"  added {len(changes['added'])}, changed {len(changes['changed'])}, "
+              f"removed {len(changes['removed'])}, unchanged {changes['unchanged']}")
+
+        embed_model.embedded = 0
+        start = time.perf_counter()
+        refresh_index(storage, data)
+        print(f"refresh, no changes {time.perf_counter() - start:7.2f}s  {embed_model.embedded:6d} chunks embedded")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
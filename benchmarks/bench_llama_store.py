@@ -0,0 +1,115 @@
+"""Cold start of a persisted LlamaIndex index: JSON vs memory-mapped storage.
+
+For each ``--nodes`` size, builds an index of synthetic nodes with random
+embeddings, persists it once with the default ``SimpleVectorStore`` (JSON)
+and once with genai_common.mmap_vector_store.MmapVectorStore, then loads
+each in a fresh process and runs one query, reporting time and peak
+memory of that process:
+
+    python benchmarks/bench_llama_store.py --nodes 1000,10000,50000 --dimensions 1536
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+
+
+def build(persist_dir, kind, nodes, dimensions):
+    import numpy as np
+    from llama_index.core import StorageContext, VectorStoreIndex
+    from llama_index.core.embeddings import MockEmbedding
+    from llama_index.core.schema import TextNode
+
+    from genai_common.mmap_vector_store import MmapVectorStore
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((nodes, dimensions), dtype=np.float32)
+    text = "What I worked on. Before college the two main things I worked on were writing and programming. " * 4
+    batch = [
+        TextNode(text=f"{i} {text}", embedding=vectors[i].tolist(), metadata={"chunk": i}) for i in range(nodes)
+    ]
+    if kind == "mmap":
+        storage_context = StorageContext.from_defaults(vector_store=MmapVectorStore())
+    else:
+        storage_context = StorageContext.from_defaults()
+    index = VectorStoreIndex(batch, storage_context=storage_context, embed_model=MockEmbedding(embed_dim=dimensions))
+    index.storage_context.persist(persist_dir=persist_dir)
+
+
+def peak_rss_mb():
+    # ru_maxrss survives exec on Linux, so a child would report the parent's peak.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load(persist_dir, kind, dimensions):
+    """Runs in a child process; prints the load and query time as JSON."""
+    start = time.perf_counter()
+    from llama_index.core import StorageContext, load_index_from_storage
+    from llama_index.core.embeddings import MockEmbedding
+
+    from genai_common.mmap_vector_store import MmapVectorStore
+
+    imported = time.perf_counter()
+    embed_model = MockEmbedding(embed_dim=dimensions)
+    if kind == "mmap":
+        storage_context = StorageContext.from_defaults(
+            persist_dir=persist_dir, vector_store=MmapVectorStore.from_persist_dir(persist_dir)
+        )
+    else:
+        storage_context = StorageContext.from_defaults(persist_dir=persist_dir)
+    index = load_index_from_storage(storage_context, embed_model=embed_model)
+    loaded = time.perf_counter()
+    index.as_retriever(similarity_top_k=4).retrieve("What did the author work on?")
+    queried = time.perf_counter()
+    print(json.dumps({
+        "load_seconds": loaded - imported,
+        "query_seconds": queried - loaded,
+        "import_seconds": imported - start,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", default="1000,10000,50000", help="comma-separated index sizes")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--load", nargs=2, metavar=("DIR", "KIND"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.load:
+        load(args.load[0], args.load[1], args.dimensions)
+        return
+
+    print(f"{'nodes':>8} {'storage':<6} {'on disk MB':>10} {'load s':>8} {'query s':>8} {'peak RSS MB':>12}")
+    for nodes in (int(n) for n in args.nodes.split(",")):
+        for kind in ("json", "mmap"):
+            with tempfile.TemporaryDirectory() as persist_dir:
+                build(persist_dir, kind, nodes, args.dimensions)
+                size = sum(os.path.getsize(os.path.join(persist_dir, name)) for name in os.listdir(persist_dir))
+                output = subprocess.run(
+                    [sys.executable, __file__, "--dimensions", str(args.dimensions), "--load", persist_dir, kind],
+                    capture_output=True, text=True, check=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(
+                    f"{nodes:>8} {kind:<6} {size / 1e6:>10.1f} {result['load_seconds']:>8.3f} "
+                    f"{result['query_seconds']:>8.3f} {result['peak_rss_mb']:>12.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
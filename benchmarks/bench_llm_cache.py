@@ -0,0 +1,180 @@
+"""LLM cache lookups at scale: LangChain's SQLiteCache vs SQLiteLLMCache.
+
+Fills both caches with ``--entries`` responses, then reports:
+
+* lookup latency (median and p99) for hits and misses. SQLiteLLMCache is
+  measured twice: once with a cold memory tier, so every hit reads SQLite,
+  and once for hits on its in-memory LRU;
+* ``alookup`` on memory hits, answered on the event loop, against the
+  default ``BaseCache.alookup``, which hops to a thread for every lookup;
+* ``--threads`` threads, standing in for Streamlit sessions, that look up
+  random entries and add a new one ``--write-ratio`` of the time for
+  ``--seconds``. This reports throughput, the worst stall and the count of
+  "database is locked" errors.
+
+SQLiteCache is filled with one bulk insert into its table, because filling
+it through ``update`` takes one transaction per entry:
+
+    python benchmarks/bench_llm_cache.py --entries 1000000 --threads 16
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps
+from langchain_core.outputs import Generation
+
+from genai_common.llm_cache import SQLiteLLMCache
+
+try:
+    from langchain_community.cache import SQLiteCache
+except ImportError:
+    SQLiteCache = None
+
+LLM_STRING = '{"lc": 1, "type": "constructor", "id": ["langchain", "chat_models", "openai", "ChatOpenAI"], ' \
+             '"kwargs": {"model_name": "gpt-3.5-turbo", "temperature": 0.7}}---[(\'stop\', None)]'
+
+
+def prompt(i):
+    return '[{"lc": 1, "type": "constructor", "id": ["langchain", "schema", "messages", "HumanMessage"], ' \
+           f'"kwargs": {{"content": "Tell me joke number {i}", "type": "human"}}}}]'
+
+
+def response(i):
+    return [Generation(text=f"Joke {i}: why did the chicken cross the road? To get to the other side.")]
+
+
+def latencies(function, keys):
+    times = []
+    for key in keys:
+        start = time.perf_counter()
+        function(key)
+        times.append((time.perf_counter() - start) * 1e6)
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.99)]
+
+
+def fill_sqlite_cache(path, entries, batch=100000):
+    data = dumps(response(0)[0])
+    with sqlite3.connect(path) as conn:
+        for start in range(0, entries, batch):
+            conn.executemany(
+                "INSERT INTO full_llm_cache (prompt, llm, idx, response) VALUES (?, ?, 0, ?)",
+                ((prompt(i), LLM_STRING, data) for i in range(start, min(entries, start + batch))),
+            )
+
+
+def hammer(cache, entries, threads, seconds, write_ratio):
+    """``(operations, worst stall in ms, locked errors)`` for ``threads`` threads over ``seconds``."""
+    counts, stalls, errors = [0] * threads, [0.0] * threads, [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def work(t):
+        rng = random.Random(t)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                if rng.random() < write_ratio:
+                    i = entries + t * 10**7 + counts[t]
+                    cache.update(prompt(i), LLM_STRING, response(i))
+                else:
+                    cache.lookup(prompt(rng.randrange(entries)), LLM_STRING)
+            except sqlite3.OperationalError:
+                errors[t] += 1
+            except Exception as error:  # SQLAlchemy wraps the sqlite3 error
+                if "locked" not in str(error):
+                    raise
+                errors[t] += 1
+            stalls[t] = max(stalls[t], time.perf_counter() - start)
+            counts[t] += 1
+
+    workers = [threading.Thread(target=work, args=(t,)) for t in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(counts), max(stalls) * 1000, sum(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+    rng = random.Random(0)
+    hit_keys = [prompt(rng.randrange(args.entries)) for _ in range(args.lookups)]
+    miss_keys = [prompt(args.entries + i) for i in range(args.lookups)]
+
+    workdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(workdir, "llm-cache.sqlite")
+        options = dict(max_disk_bytes=1 << 40, ttl=None)
+        cache = SQLiteLLMCache(path, batch_size=10000, **options)
+        start = time.perf_counter()
+        for i in range(args.entries):
+            cache.update(prompt(i), LLM_STRING, response(i))
+        cache.flush()
+        elapsed = time.perf_counter() - start
+        print(f"filled SQLiteLLMCache with {args.entries} entries in {elapsed:.1f}s "
+              f"({args.entries / elapsed:.0f}/s), {os.path.getsize(path) / 1e6:.0f} MB")
+        caches = {"SQLiteLLMCache": SQLiteLLMCache(path, **options)}
+        if SQLiteCache is None:
+            print("langchain-community is not installed; timing SQLiteLLMCache only")
+        else:
+            baseline_path = os.path.join(workdir, "langchain.db")
+            baseline = SQLiteCache(database_path=baseline_path)
+            fill_sqlite_cache(baseline_path, args.entries)
+            caches = {"SQLiteCache": baseline, **caches}
+
+        print(f"\n{'lookup latency, us':<34} {'median':>8} {'p99':>8}")
+        for name, cache in caches.items():
+            miss = latencies(lambda key: cache.lookup(key, LLM_STRING), miss_keys)
+            hit = latencies(lambda key: cache.lookup(key, LLM_STRING), hit_keys)
+            label = "SQLiteLLMCache, disk" if name == "SQLiteLLMCache" else name
+            print(f"{label + ' hit':<34} {hit[0]:>8.1f} {hit[1]:>8.1f}")
+            print(f"{label + ' miss':<34} {miss[0]:>8.1f} {miss[1]:>8.1f}")
+        cache = SQLiteLLMCache(path, **dict(options, max_entries=1000))
+        recent = hit_keys[:1000]
+        for key in recent:
+            cache.lookup(key, LLM_STRING)
+        hit = latencies(lambda key: cache.lookup(key, LLM_STRING), recent * 10)
+        print(f"{'SQLiteLLMCache, memory hit':<34} {hit[0]:>8.1f} {hit[1]:>8.1f}")
+
+        async def alookups(lookup):
+            start = time.perf_counter()
+            await asyncio.gather(*(lookup(key, LLM_STRING) for key in recent * 10))
+            return (time.perf_counter() - start) / len(recent * 10) * 1e6
+
+        native = asyncio.run(alookups(cache.alookup))
+        executor = asyncio.run(alookups(lambda p, s: BaseCache.alookup(cache, p, s)))
+        print(f"{'alookup memory hit, native':<34} {native:>8.1f}")
+        print(f"{'alookup memory hit, via executor':<34} {executor:>8.1f}")
+
+        print(f"\n{args.threads} threads for {args.seconds:.0f}s, {args.write_ratio:.0%} writes")
+        print(f"{'':<16} {'ops/s':>8} {'worst stall ms':>15} {'locked errors':>14}")
+        for name, cache in caches.items():
+            operations, stall, errors = hammer(cache, args.entries, args.threads, args.seconds, args.write_ratio)
+            print(f"{name:<16} {operations / args.seconds:>8.0f} {stall:>15.1f} {errors:>14}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
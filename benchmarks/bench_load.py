@@ -0,0 +1,250 @@
+"""Load-test the course workloads offline and report latency percentiles.
+
+Each workload repeats what one of the course scripts does (the
+1-GenAI-UseCases prompts, the 3-PromptEngineering prompts, chain and Tree of
+Thoughts, a LangChain ``prompt | llm | parser`` chain, Azure, embeddings and
+Ollama) against the fake server, which runs in its own process with
+``--latency`` seconds added to every request. For every workload and
+concurrency level it prints p50/p95/p99 latency, requests per second and the
+client-side CPU time per request:
+
+    python benchmarks/bench_load.py --requests 200 --concurrency 1,8,32 --latency 0.05
+
+``--record run.jsonl`` also saves every response to a cassette; with
+``--replay run.jsonl`` no server is started and responses come from the
+cassette (see genai_common.replay). ``--json baseline.json`` keeps the
+results for comparing later runs.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from genai_common.chain import Stage, StreamingChain
+from genai_common.completion import CompletionClient
+from genai_common.replay import RecordReplayTransport
+from genai_common.tree_of_thoughts import ThoughtNode, TreeOfThoughts
+
+REPLAY_ENDPOINT = "http://replay.invalid/"
+
+CONTEXT = (
+    "Generative AI is a type of artificial intelligence that can create new content, "
+    "such as text, images, and music. It uses machine learning models to generate data "
+    "that is similar to the data it was trained on. This technology has a wide range of "
+    "applications, including content creation, data augmentation, and more."
+)
+USE_CASE_PROMPTS = [
+    CONTEXT,
+    f"Context: {CONTEXT}\nQuestion: What is Generative AI?\nAnswer:",
+    f"Context: {CONTEXT}\nQuestion: What are the applications of Generative AI?\nAnswer:",
+    "Once upon a time, in a land far, far away,",
+    "Translate the following text to French:\n\nGenerative AI can create new content such as text, images, and music.",
+]
+PROMPT_ENGINEERING_PROMPTS = [
+    "Translate the following English text to French: 'Hello, how are you?'",
+    "\nTranslate the following English text to French:\nEnglish: 'Good morning'\nFrench: 'Bonjour'\n"
+    "English: 'Good night'\nFrench: 'Bonne nuit'\nEnglish: 'How are you?'\nFrench:\n",
+    "\nSolve the following math problem step by step:\nIf a train travels at a speed of 60 miles per hour "
+    "and it takes 2 hours to reach its destination, how far did the train travel?\n",
+]
+EMBEDDING_TEXTS = [f"{CONTEXT} (chunk {i})" for i in range(16)]
+
+
+class Target:
+    """Where the workloads send their requests."""
+
+    def __init__(self, endpoint, transport=None):
+        self.endpoint = endpoint
+        self.base_url = endpoint.rstrip("/") + "/v1"
+        self.transport = transport
+
+    def completion_client(self, **kwargs):
+        return CompletionClient(base_url=self.base_url, api_key="test", transport=self.transport, **kwargs)
+
+    def http_client(self):
+        return httpx.Client(base_url=self.endpoint, transport=self.transport)
+
+
+def use_cases(target):
+    client = target.completion_client(max_tokens=500, temperature=0.3)
+    return lambda i: client.generate_response(USE_CASE_PROMPTS[i % len(USE_CASE_PROMPTS)])
+
+
+def prompt_engineering(target):
+    client = target.completion_client(max_tokens=100, temperature=0.3)
+    return lambda i: client.generate_response(PROMPT_ENGINEERING_PROMPTS[i % len(PROMPT_ENGINEERING_PROMPTS)])
+
+
+def prompt_chain(target):
+    chain = StreamingChain(target.completion_client(max_tokens=1000, temperature=0.3), [
+        Stage("Outline", "Write an outline for a blog post about the benefits of AI in healthcare."),
+        Stage("Introduction", "Write an introduction from this outline:\n\n{Outline}", depends_on=["Outline"]),
+        Stage("First Section", "Write the first section after:\n\n{Introduction}", depends_on=["Introduction"]),
+    ])
+    return lambda i: chain.run(on_token=None)
+
+
+def tree_of_thoughts(target):
+    client = target.completion_client(max_tokens=300, temperature=0.3)
+    search = TreeOfThoughts(client.generate_response, generate_candidates=client.generate_candidates)
+    return lambda i: search.search(ThoughtNode("Generate ideas for a new AI project."))
+
+
+def langchain(target):
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_openai import ChatOpenAI
+
+    prompt = ChatPromptTemplate.from_messages(
+        [("system", "You are a helpful assistant. Please response to the user queries"), ("user", "Question:{question}")]
+    )
+    llm = ChatOpenAI(model="gpt-3.5-turbo", base_url=target.base_url, api_key="test", http_client=target.http_client())
+    chain = prompt | llm | StrOutputParser()
+    return lambda i: chain.invoke({"question": PROMPT_ENGINEERING_PROMPTS[i % len(PROMPT_ENGINEERING_PROMPTS)]})
+
+
+def azure(target):
+    client = CompletionClient.azure(
+        "gpt-35-turbo-instruct", azure_endpoint=target.endpoint, api_key="test", transport=target.transport
+    )
+    return lambda i: client.generate_response(USE_CASE_PROMPTS[i % len(USE_CASE_PROMPTS)])
+
+
+def embeddings(target):
+    client = target.completion_client().client
+    return lambda i: client.embeddings.create(model="text-embedding-3-small", input=EMBEDDING_TEXTS)
+
+
+def ollama(target):
+    client = target.http_client()
+
+    def generate(i):
+        prompt = USE_CASE_PROMPTS[i % len(USE_CASE_PROMPTS)]
+        response = client.post("/api/generate", json={"model": "llama3", "prompt": prompt, "stream": False})
+        response.raise_for_status()
+        return response.json()["response"]
+
+    return generate
+
+
+WORKLOADS = {
+    "use-cases": use_cases,
+    "prompt-engineering": prompt_engineering,
+    "prompt-chain": prompt_chain,
+    "tree-of-thoughts": tree_of_thoughts,
+    "langchain": langchain,
+    "azure": azure,
+    "embeddings": embeddings,
+    "ollama": ollama,
+}
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def run(call, requests, concurrency):
+    def timed(i):
+        start = time.perf_counter()
+        call(i)
+        return time.perf_counter() - start
+
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = sorted(executor.map(timed, range(requests)))
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": wall,
+        "requests_per_second": requests / wall,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "cpu_ms_per_request": cpu / requests * 1000,
+    }
+
+
+def start_server(latency):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "genai_common.fake_server", "--latency", str(latency)],
+        cwd=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."),
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    endpoint = process.stdout.readline().strip()
+    if not endpoint:
+        process.kill()
+        raise RuntimeError("fake server did not start")
+    return process, endpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help="comma-separated; default all")
+    parser.add_argument("--requests", type=int, default=100, help="requests per workload and concurrency level")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every response")
+    recording = parser.add_mutually_exclusive_group()
+    recording.add_argument("--record", metavar="CASSETTE", help="save every response to this JSONL file")
+    recording.add_argument("--replay", metavar="CASSETTE", help="serve responses from this JSONL file")
+    parser.add_argument("--json", metavar="PATH", help="write the results to this file")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.workloads.split(",") if name.strip()]
+    unknown = [name for name in names if name not in WORKLOADS]
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    server = None
+    if args.replay:
+        target = Target(REPLAY_ENDPOINT, RecordReplayTransport(args.replay, mode="replay", latency=args.latency))
+    else:
+        server, endpoint = start_server(args.latency)
+        transport = RecordReplayTransport(args.record, mode="record") if args.record else None
+        target = Target(endpoint, transport)
+
+    results = []
+    try:
+        print(f"{'workload':<20} {'conc':>4} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'cpu ms/req':>10}")
+        for name in names:
+            try:
+                call = WORKLOADS[name](target)
+            except ImportError as exc:
+                print(f"{name:<20} skipped: {exc}")
+                continue
+            call(0)  # connections, imports and lazy clients, outside the timings
+            for level in levels:
+                result = {"workload": name, **run(call, args.requests, level)}
+                results.append(result)
+                print(
+                    f"{name:<20} {level:>4} {result['requests_per_second']:>8.1f} {result['p50_ms']:>8.1f} "
+                    f"{result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['cpu_ms_per_request']:>10.2f}"
+                )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {"python": platform.python_version(), "latency": args.latency, "results": results}, f, indent=2
+            )
+
+
+if __name__ == "__main__":
+    main()
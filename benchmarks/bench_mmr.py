@@ -0,0 +1,102 @@
+"""MMR and score-threshold retrieval: LangChain's loops vs NumpyVectorStore.
+
+MMR: picks ``--k`` of ``fetch_k`` random candidates with
+``langchain_community.vectorstores.utils.maximal_marginal_relevance`` (used
+by the FAISS store) and with genai_common.vector_index.maximal_marginal_relevance,
+and checks they pick the same rows.
+
+Threshold: a ``similarity_score_threshold`` search over ``--docs`` documents
+with ``k=--threshold-k``, through the generic ``VectorStore`` path (builds
+every hit, then filters) and through NumpyVectorStore (filters the scores
+first):
+
+    python benchmarks/bench_mmr.py --fetch-k 20,100,1000,5000 --k 20 --dimensions 1536
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+from genai_common.vector_index import NumpyVectorStore, maximal_marginal_relevance
+
+try:
+    from langchain_community.vectorstores.utils import maximal_marginal_relevance as langchain_mmr
+except ImportError:
+    langchain_mmr = None
+
+
+class TableEmbeddings:
+    """Looks texts up in a fixed table, so the benchmark times search rather than embedding."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.vectors[int(text.split()[-1])].tolist()
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fetch-k", default="20,100,1000,5000", help="comma-separated candidate pool sizes")
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--lambda-mult", type=float, default=0.5)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--threshold-k", type=int, default=20000)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(f"{'fetch_k':>8} {'LangChain ms':>13} {'NumPy ms':>9}  same picks")
+    for fetch_k in (int(n) for n in args.fetch_k.split(",")):
+        candidates = rng.standard_normal((fetch_k, args.dimensions)).astype(np.float32)
+        query = candidates[:8].mean(axis=0)
+        repeat = max(1, 2000 // fetch_k)
+        ours_ms, ours = timed(lambda: maximal_marginal_relevance(query, candidates, args.lambda_mult, args.k), repeat)
+        if langchain_mmr is None:
+            print(f"{fetch_k:>8} {'n/a':>13} {ours_ms:>9.2f}  (langchain-community not installed)")
+            continue
+        theirs_ms, theirs = timed(lambda: langchain_mmr(query, candidates, args.lambda_mult, args.k), repeat)
+        print(f"{fetch_k:>8} {theirs_ms:>13.2f} {ours_ms:>9.2f}  {ours == theirs}")
+
+    # Half the documents sit near one topic, so a threshold keeps some and drops many.
+    topic = rng.standard_normal(args.dimensions)
+    vectors = rng.standard_normal((args.docs, args.dimensions)).astype(np.float32)
+    vectors[: args.docs // 2] += 1.2 * topic.astype(np.float32)
+    query = np.vstack([vectors, topic[None, :].astype(np.float32)])
+    embeddings = TableEmbeddings(query)
+    db = NumpyVectorStore(embeddings)
+    db.add_embeddings([f"document {i}" for i in range(args.docs)], vectors)
+    question = f"query {args.docs}"
+    generic = lambda: super(NumpyVectorStore, db).similarity_search_with_relevance_scores(  # noqa: E731
+        question, k=args.threshold_k, score_threshold=args.threshold
+    )
+    direct = lambda: db.similarity_search_with_relevance_scores(  # noqa: E731
+        question, k=args.threshold_k, score_threshold=args.threshold
+    )
+    generic_ms, generic_hits = timed(generic, 5)
+    direct_ms, direct_hits = timed(direct, 5)
+    print(f"\nscore threshold {args.threshold}, k={args.threshold_k}, {args.docs} docs: "
+          f"{len(direct_hits)} hits kept")
+    print(f"  VectorStore path {generic_ms:8.2f} ms")
+    print(f"  NumpyVectorStore {direct_ms:8.2f} ms  same hits: "
+          f"{[d.id for d, _ in generic_hits] == [d.id for d, _ in direct_hits]}")
+
+
+if __name__ == "__main__":
+    main()
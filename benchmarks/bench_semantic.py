@@ -0,0 +1,75 @@
+"""Compare the four semantic breakpoint strategies: re-embedding vs one pass.
+
+Runs the semantic-chunker notebook's comparison against the fake server's
+embeddings endpoint, first the way the notebook does it (a fresh splitter,
+and so a fresh embedding pass, per ``breakpoint_threshold_type``) and then
+with ``SemanticSplitter.split_all``:
+
+    python benchmarks/bench_semantic.py --latency 0.2 --batch-size 512
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+from genai_common.completion import CompletionClient
+from genai_common.fake_server import FakeOpenAIServer
+from genai_common.semantic import THRESHOLD_TYPES, SemanticSplitter
+
+DEFAULT_FILE = os.path.join(ROOT, "OpenAI", "5-RAG", "example_data", "state_of_the_union.txt")
+
+
+class CountingEmbeddings:
+    """``embed_documents`` over the OpenAI client, counting requests and texts."""
+
+    def __init__(self, client, model="text-embedding-3-small"):
+        self.client = client
+        self.model = model
+        self.requests = 0
+        self.texts = 0
+
+    def embed_documents(self, texts):
+        self.requests += 1
+        self.texts += len(texts)
+        response = self.client.embeddings.create(model=self.model, input=texts)
+        return [item.embedding for item in response.data]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", default=DEFAULT_FILE)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds added to every embeddings request")
+    parser.add_argument("--batch-size", type=int, default=512)
+    args = parser.parse_args()
+
+    with open(args.file, encoding="utf-8") as f:
+        text = f.read()
+
+    with FakeOpenAIServer(latency=args.latency) as server:
+        client = CompletionClient(base_url=server.endpoint + "/v1", api_key="test").client
+
+        embeddings = CountingEmbeddings(client)
+        start = time.perf_counter()
+        per_strategy = {}
+        for threshold_type in THRESHOLD_TYPES:
+            splitter = SemanticSplitter(embeddings, breakpoint_threshold_type=threshold_type, batch_size=args.batch_size)
+            per_strategy[threshold_type] = splitter.split_text(text)
+        separate = time.perf_counter() - start
+        print(f"one splitter per strategy  {separate:6.2f}s  {embeddings.requests:>3} requests  {embeddings.texts:>5} texts")
+
+        embeddings = CountingEmbeddings(client)
+        start = time.perf_counter()
+        together = SemanticSplitter(embeddings, batch_size=args.batch_size).split_all(text)
+        shared = time.perf_counter() - start
+        print(f"split_all                  {shared:6.2f}s  {embeddings.requests:>3} requests  {embeddings.texts:>5} texts")
+
+    for threshold_type in THRESHOLD_TYPES:
+        same = "same" if per_strategy[threshold_type] == together[threshold_type] else "DIFFERENT"
+        print(f"  {threshold_type:<20} {len(together[threshold_type]):>4} chunks ({same})")
+
+
+if __name__ == "__main__":
+    main()
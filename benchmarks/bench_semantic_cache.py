@@ -0,0 +1,193 @@
+"""Semantic vs exact-match LLM caching on near-duplicate questions.
+
+Generates a stream of ``--queries`` questions drawn from a set of base
+questions. Each question appears in one of several rephrasings (case,
+punctuation, "please", a "Quick question:" prefix). Different questions
+often differ in one word ("What is FAISS?", "What is Chroma?"). Runs use the
+deterministic HashingEmbeddings, so results repeat exactly, unless
+``--embeddings`` names an OpenAI embedding model (needs langchain-openai and
+an API key), which is how to pick a threshold for a real model.
+
+* Threshold sweep: hit rate and false-hit rate (answered with another
+  question's response) of SemanticLLMCache at each ``--thresholds`` value,
+  against an exact-match cache. The questions go in bare, and as the chat
+  messages of the 1-Basics app's prompt (a system message and
+  "Question:{question}").
+* End to end: a fake chat model that sleeps ``--llm-latency`` seconds per
+  call, with no cache, InMemoryCache and SemanticLLMCache. The semantic
+  cache's own ``seconds_saved`` is printed alongside.
+* Lookup cost: one lookup against a namespace of each ``--sizes`` entries
+  of ``--dimensions`` floats, with the embedding call excluded.
+
+    python benchmarks/bench_semantic_cache.py --queries 2000 --thresholds 0.7,0.8,0.9,0.95
+    python benchmarks/bench_semantic_cache.py --embeddings text-embedding-3-small --thresholds 0.85,0.9,0.95,0.97
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import warnings
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+from langchain_core.caches import InMemoryCache
+from langchain_core.globals import set_llm_cache
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.load import dumps
+from langchain_core.prompts import ChatPromptTemplate
+
+from genai_common.semantic_cache import HashingEmbeddings, SemanticLLMCache
+
+try:
+    from langchain_openai import OpenAIEmbeddings
+except ImportError:
+    OpenAIEmbeddings = None
+
+TOPICS = [
+    "LangChain", "a vector store", "FAISS", "Chroma", "LanceDB", "an embedding", "retrieval augmented generation",
+    "prompt engineering", "a text splitter", "LlamaIndex", "Streamlit", "a chat model", "tokenization",
+    "the context window", "few-shot prompting", "an output parser", "a retriever", "semantic chunking",
+    "maximal marginal relevance", "BM25", "Azure OpenAI", "function calling", "an agent", "a tool",
+]
+APP_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", "You are a helpful assistant. Please response to the user queries"),
+        ("user", "Question:{question}"),
+    ]
+)
+TEMPLATES = ["What is {}?", "How do I use {}?", "Explain {} in simple terms.", "What are the limits of {}?"]
+VARIANTS = [
+    lambda q: q,
+    lambda q: q.lower(),
+    lambda q: q[:-1] + " please" + q[-1],
+    lambda q: "Quick question: " + q,
+    lambda q: q[:-1] + "!",
+]
+
+
+def question_stream(count, seed=0):
+    """``(base id, question)`` pairs; popular base questions come up more often."""
+    rng = random.Random(seed)
+    bases = [template.format(topic) for template in TEMPLATES for topic in TOPICS]
+    weights = [1 / (rank + 1) for rank in range(len(bases))]
+    for _ in range(count):
+        base = rng.choices(range(len(bases)), weights)[0]
+        yield base, rng.choice(VARIANTS)(bases[base])
+
+
+class SlowChatModel(FakeListChatModel):
+    latency: float = 0.0
+
+    def _call(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return super()._call(*args, **kwargs)
+
+
+class MemoEmbeddings:
+    """Embeds each distinct text once, so a sweep with a real model makes one API call per text."""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.vectors = {}
+
+    def embed_query(self, text):
+        if text not in self.vectors:
+            self.vectors[text] = self.embeddings.embed_query(text)
+        return self.vectors[text]
+
+
+def app_prompt(question):
+    """The cache prompt LangChain passes for ``question`` through the app's chat prompt."""
+    return dumps(APP_PROMPT.invoke({"question": question}).to_messages())
+
+
+class FixedEmbeddings:
+    """Returns one precomputed vector, so lookup timing excludes embedding."""
+
+    def __init__(self, vector):
+        self.vector = vector
+
+    def embed_query(self, text):
+        return self.vector
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--thresholds", default="0.7,0.8,0.9,0.95")
+    parser.add_argument("--end-to-end-queries", type=int, default=300)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per simulated LLM call")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--embeddings", default="hashing", help="'hashing', or an OpenAI embedding model for the sweep")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+    embeddings = HashingEmbeddings()
+    if args.embeddings == "hashing":
+        sweep_embeddings = embeddings
+    elif OpenAIEmbeddings is None:
+        parser.error("--embeddings needs langchain-openai")
+    else:
+        sweep_embeddings = MemoEmbeddings(OpenAIEmbeddings(model=args.embeddings))
+    stream = list(question_stream(args.queries))
+
+    exact = set()
+    exact_hits = 0
+    for _, question in stream:
+        exact_hits += question in exact
+        exact.add(question)
+    print(f"{len(stream)} questions, {len(exact)} distinct strings, {len({b for b, _ in stream})} distinct questions")
+    print(f"{args.embeddings} embeddings")
+    print(f"{'cache':<26} {'bare: hit rate':>15} {'false hits':>11} {'app prompt: hit rate':>21} {'false hits':>11}")
+    print(f"{'exact match':<26} {exact_hits / len(stream):>15.1%} {0:>11.1%} {exact_hits / len(stream):>21.1%} {0:>11.1%}")
+    for threshold in (float(t) for t in args.thresholds.split(",")):
+        row = []
+        for wrap in (str, app_prompt):
+            cache = SemanticLLMCache(sweep_embeddings, threshold=threshold)
+            false_hits = 0
+            for base, question in stream:
+                prompt = wrap(question)
+                value = cache.lookup(prompt, "model")
+                if value is None:
+                    cache.update(prompt, "model", [base])
+                elif value != [base]:
+                    false_hits += 1
+            row.append((cache.stats()["hit_rate"], false_hits / len(stream)))
+        label = f"semantic, threshold {threshold}"
+        print(f"{label:<26} {row[0][0]:>15.1%} {row[0][1]:>11.1%} {row[1][0]:>21.1%} {row[1][1]:>11.1%}")
+
+    print(f"\n{args.end_to_end_queries} questions through a chat model taking {args.llm_latency * 1000:.0f} ms per call")
+    questions = [question for _, question in stream[: args.end_to_end_queries]]
+    semantic = SemanticLLMCache(embeddings, threshold=0.9)
+    for name, cache in [("no cache", None), ("InMemoryCache", InMemoryCache()), ("SemanticLLMCache 0.9", semantic)]:
+        set_llm_cache(cache)
+        llm = SlowChatModel(responses=["answer"], latency=args.llm_latency)
+        start = time.perf_counter()
+        for question in questions:
+            llm.invoke(question)
+        print(f"  {name:<22} {time.perf_counter() - start:7.2f}s")
+    set_llm_cache(None)
+    stats = semantic.stats()
+    print(f"  SemanticLLMCache stats: hit rate {stats['hit_rate']:.1%}, {stats['seconds_saved']:.2f}s saved, "
+          f"{stats['lookup_seconds']:.3f}s in lookups")
+
+    print(f"\nlookup against one namespace, embedding excluded ({args.dimensions} dimensions)")
+    rng = np.random.default_rng(0)
+    for size in (int(s) for s in args.sizes.split(",")):
+        cache = SemanticLLMCache(None, threshold=2.0, max_entries=size)
+        for i in range(size):
+            cache.embedding = FixedEmbeddings(rng.standard_normal(args.dimensions, dtype=np.float32))
+            cache.update(f"prompt {i}", "model", [i])
+        cache.embedding = FixedEmbeddings(rng.standard_normal(args.dimensions, dtype=np.float32))
+        start = time.perf_counter()
+        for i in range(100):
+            cache.lookup(f"new prompt {i}", "model")
+        print(f"  {size:>7} entries  {(time.perf_counter() - start) / 100 * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
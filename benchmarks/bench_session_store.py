@@ -0,0 +1,144 @@
+"""Load test for chat session stores: the chatbot notebook's dict vs SessionStore.
+
+Simulates ``--sessions`` users chatting at once: ``--threads`` threads play
+``--turns`` turns between them, each turn choosing a session (a few users
+are much more active than the rest) and doing what
+``RunnableWithMessageHistory`` does: read the history, then add a human
+message and an AI reply. Reports, for the notebook's ``store = {}`` of
+``InMemoryChatMessageHistory`` and for genai_common.session_store.SessionStore:
+
+* turns per second and the p99 turn latency;
+* Python heap held by the store after the run (from a second, traced run), and
+  the longest history handed to the model;
+* for SessionStore, the log size, and the time to reopen the log and load an
+  idle session after a restart.
+
+::
+
+    python benchmarks/bench_session_store.py --sessions 10000 --turns 100000 --threads 8
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import warnings
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+from langchain_core.chat_history import InMemoryChatMessageHistory
+from langchain_core.messages import AIMessage, HumanMessage
+
+from genai_common.session_store import SessionStore
+
+WORDS = (
+    "the a model chain prompt token history session user reply answer question vector index cache memory "
+    "latency budget summary message system human assistant retrieval document context window"
+).split()
+
+
+class NotebookStore:
+    """``get_session_history`` from the chatbot notebook."""
+
+    def __init__(self):
+        self.store = {}
+
+    def get_session_history(self, session_id):
+        if session_id not in self.store:
+            self.store[session_id] = InMemoryChatMessageHistory()
+        return self.store[session_id]
+
+
+def play(store, sessions, turns, threads, seed=0):
+    """Turn latencies in ms and the longest history read, over ``threads`` threads."""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(sessions)]
+    cumulative = []
+    total = 0.0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    picks = rng.choices(range(sessions), cum_weights=cumulative, k=turns)
+    human = [" ".join(rng.choices(WORDS, k=20)) for _ in range(64)]
+    ai = [" ".join(rng.choices(WORDS, k=60)) for _ in range(64)]
+    latencies = [[] for _ in range(threads)]
+    longest = [0] * threads
+
+    def work(t):
+        for turn in range(t, turns, threads):
+            start = time.perf_counter()
+            history = store.get_session_history(f"user-{picks[turn]}")
+            longest[t] = max(longest[t], len(history.messages))
+            history.add_messages([HumanMessage(human[turn % 64]), AIMessage(ai[turn % 64])])
+            latencies[t].append((time.perf_counter() - start) * 1000)
+
+    workers = [threading.Thread(target=work, args=(t,)) for t in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return [latency for thread in latencies for latency in thread], max(longest)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=100000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--max-sessions", type=int, default=1024, help="sessions SessionStore keeps in memory")
+    parser.add_argument("--max-tokens", type=int, default=2000, help="tokens before a session is summarized")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    workdir = tempfile.mkdtemp()
+    try:
+        contenders = {
+            "notebook dict": lambda run: NotebookStore(),
+            "SessionStore": lambda run: SessionStore(
+                os.path.join(workdir, f"{run}.log"), max_sessions=args.max_sessions, max_tokens=args.max_tokens
+            ),
+        }
+        print(f"{args.sessions} sessions, {args.turns} turns on {args.threads} threads")
+        print(f"{'':<16} {'turns/s':>8} {'p99 ms':>8} {'heap MB':>8} {'longest history':>16}")
+        stores = {}
+        for name, make in contenders.items():
+            store = stores[name] = make("timed")
+            start = time.perf_counter()
+            latencies, longest = play(store, args.sessions, args.turns, args.threads)
+            elapsed = time.perf_counter() - start
+            tracemalloc.start()
+            traced = make("traced")
+            play(traced, args.sessions, args.turns, args.threads)
+            heap = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            p99 = statistics.quantiles(latencies, n=100)[98]
+            print(f"{name:<16} {args.turns / elapsed:>8.0f} {p99:>8.2f} {heap / 1e6:>8.1f} {longest:>16}")
+            if isinstance(traced, SessionStore):
+                traced.close()
+            del traced
+
+        store = stores["SessionStore"]
+        stats = store.stats()
+        print(f"\nSessionStore: {stats['log_bytes'] / 1e6:.1f} MB log ({stats['live_bytes'] / 1e6:.1f} MB live), "
+              f"{stats['summaries']} summaries, {stats['vacuums']} vacuums, {stats['loads']} loads from the log")
+        store.close()
+        start = time.perf_counter()
+        reopened = SessionStore(os.path.join(workdir, "timed.log"), max_sessions=args.max_sessions, max_tokens=args.max_tokens)
+        reopen = time.perf_counter() - start
+        start = time.perf_counter()
+        reopened.messages(f"user-{args.sessions - 1}")
+        load = time.perf_counter() - start
+        print(f"restart: reopened in {reopen * 1000:.0f} ms, loaded an idle session in {load * 1000:.2f} ms")
+        reopened.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
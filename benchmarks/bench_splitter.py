@@ -0,0 +1,90 @@
+"""Throughput and peak memory of the recursive text splitters.
+
+Builds a corpus of ``--size-mb`` megabytes by repeating
+state_of_the_union.txt, then splits it with LangChain's
+``RecursiveCharacterTextSplitter.split_text`` (whole file in memory) and
+with genai_common.splitters.StreamingRecursiveSplitter reading the file
+block by block:
+
+    python benchmarks/bench_splitter.py --size-mb 200 --chunk-size 1000 --chunk-overlap 200
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+from genai_common.splitters import CJK_SEPARATORS, DEFAULT_SEPARATORS, StreamingRecursiveSplitter
+
+DEFAULT_FILE = os.path.join(ROOT, "OpenAI", "5-RAG", "example_data", "state_of_the_union.txt")
+
+
+def langchain_split(path, args, separators):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap, separators=separators
+    )
+    with open(path, encoding="utf-8") as f:
+        return len(splitter.split_text(f.read()))
+
+
+def streaming_split(path, args, separators):
+    splitter = StreamingRecursiveSplitter(
+        chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap, separators=separators
+    )
+    count = 0
+    for _ in splitter.split_file(path, block_size=args.block_size):
+        count += 1
+    return count
+
+
+def measure(label, func, path, args, separators, size):
+    start = time.perf_counter()
+    chunks = func(path, args, separators)
+    elapsed = time.perf_counter() - start
+    peak = ""
+    if args.memory:
+        tracemalloc.start()
+        func(path, args, separators)
+        peak = f"  peak {tracemalloc.get_traced_memory()[1] / 1e6:8.1f} MB"
+        tracemalloc.stop()
+    print(f"{label:<30} {elapsed:7.2f}s  {size / elapsed / 1e6:7.1f} MB/s  {chunks:>9,} chunks{peak}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", default=DEFAULT_FILE)
+    parser.add_argument("--size-mb", type=float, default=50)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--block-size", type=int, default=1 << 20, help="characters read per block")
+    parser.add_argument("--cjk", action="store_true", help="use the notebook's CJK separator list")
+    parser.add_argument("--memory", action="store_true", help="also run under tracemalloc for peak memory")
+    args = parser.parse_args()
+
+    with open(args.file, encoding="utf-8") as f:
+        text = f.read()
+    separators = CJK_SEPARATORS if args.cjk else DEFAULT_SEPARATORS
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "corpus.txt")
+        target = int(args.size_mb * 1e6)
+        with open(path, "w", encoding="utf-8") as f:
+            written = 0
+            while written < target:
+                written += f.write(text + "\n\n")
+        size = os.path.getsize(path)
+        print(f"corpus: {size / 1e6:.1f} MB, chunk_size={args.chunk_size}, chunk_overlap={args.chunk_overlap}")
+        try:
+            measure("langchain split_text", langchain_split, path, args, separators, size)
+        except ImportError:
+            print("langchain split_text             skipped: langchain-text-splitters is not installed")
+        measure("streaming split_file", streaming_split, path, args, separators, size)
+
+
+if __name__ == "__main__":
+    main()
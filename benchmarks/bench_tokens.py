@@ -0,0 +1,66 @@
+"""Encode throughput of tiktoken cl100k_base on state_of_the_union.txt.
+
+Compares looking the encoder up on every call (as the trim_messages notebook's
+``str_token_counter`` does) with the cached encoder in genai_common.tokens,
+and single-text encoding with the batch path:
+
+    python benchmarks/bench_tokens.py --repeat 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import tiktoken
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+from genai_common.tokens import count_tokens, count_tokens_batch, get_encoding
+
+DEFAULT_FILE = os.path.join(ROOT, "OpenAI", "5-RAG", "example_data", "state_of_the_union.txt")
+
+
+def report(label, seconds, size_bytes, tokens):
+    print(f"{label:<34} {seconds * 1000:9.2f} ms  {size_bytes / seconds / 1e6:7.2f} MB/s  {tokens / seconds / 1e6:6.2f} Mtok/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", default=DEFAULT_FILE)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with open(args.file, encoding="utf-8") as f:
+        text = f.read()
+    paragraphs = [p for p in text.split("\n\n") if p.strip()]
+    size = len(text.encode("utf-8")) * args.repeat
+    get_encoding()  # load the BPE ranks once, outside the timings
+    tokens = count_tokens(text) * args.repeat
+    print(f"{args.file}: {len(text):,} chars, {tokens // args.repeat:,} tokens, {len(paragraphs)} paragraphs")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for paragraph in paragraphs:
+            len(tiktoken.get_encoding("cl100k_base").encode(paragraph))
+    report("lookup encoder per call, encode()", time.perf_counter() - start, size, tokens)
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for paragraph in paragraphs:
+            count_tokens(paragraph)
+    report("cached encoder, encode_ordinary()", time.perf_counter() - start, size, tokens)
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        count_tokens_batch(paragraphs)
+    report("cached encoder, batch", time.perf_counter() - start, size, tokens)
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        count_tokens(text)
+    report("cached encoder, whole document", time.perf_counter() - start, size, tokens)
+
+
+if __name__ == "__main__":
+    main()
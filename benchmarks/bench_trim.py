@@ -0,0 +1,114 @@
+"""Per-turn cost of trimming a growing chat history: trim_messages vs MessageTrimmer.
+
+Builds a conversation from the paragraphs of state_of_the_union.txt
+(alternating human and AI messages after a system message), and at each
+``--lengths`` history length times one turn: append a message, then trim the
+history to ``--max-tokens`` with ``strategy="last"``, ``include_system`` and
+``start_on="human"``. The contenders are:
+
+* ``trim_messages`` with the notebook's ``tiktoken_counter``, which counts
+  every message of each candidate slice;
+* ``trim_messages`` with ``ChatOpenAI(model=...)`` as the counter, as in the
+  notebook (needs langchain-openai);
+* genai_common.message_trim.MessageTrimmer, both on a new trimmer (every
+  message counted once) and on the next turn of a trimmer that trimmed the
+  previous one.
+
+::
+
+    python benchmarks/bench_trim.py --lengths 100,1000,10000
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, trim_messages
+
+from genai_common.message_trim import MessageTrimmer
+from genai_common.tokens import encoding_for_model
+
+try:
+    from langchain_openai import ChatOpenAI
+except ImportError:
+    ChatOpenAI = None
+
+DEFAULT_FILE = os.path.join(ROOT, "OpenAI", "5-RAG", "example_data", "state_of_the_union.txt")
+
+
+def tiktoken_counter(model):
+    """The notebook's ``tiktoken_counter``, with the encoder looked up once."""
+    encoding = encoding_for_model(model)
+    roles = {"human": "user", "ai": "assistant", "system": "system"}
+
+    def count(messages):
+        tokens = 3
+        for message in messages:
+            tokens += 3 + len(encoding.encode(roles[message.type])) + len(encoding.encode(message.content))
+        return tokens
+
+    return count
+
+
+def per_turn(trim, history, start, turns):
+    """Mean ms of ``trim`` on ``history[:start + 1]`` ... ``history[:start + turns]``, grown in place.
+
+    ``history[:start]`` is trimmed once first, untimed, as the previous turn.
+    """
+    messages = list(history[:start])
+    trim(messages)
+    elapsed = 0.0
+    for message in history[start : start + turns]:
+        messages.append(message)
+        begin = time.perf_counter()
+        trim(messages)
+        elapsed += time.perf_counter() - begin
+    return elapsed / turns * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", default=DEFAULT_FILE)
+    parser.add_argument("--lengths", default="100,1000,10000", help="history lengths, in messages")
+    parser.add_argument("--max-tokens", type=int, default=2000)
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--turns", type=int, default=10, help="turns timed at each length")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    with open(args.file, encoding="utf-8") as f:
+        paragraphs = [p.strip() for p in f.read().split("\n\n") if p.strip()]
+    lengths = [int(n) for n in args.lengths.split(",")]
+    history = [SystemMessage("you're a good assistant, you always respond with a joke.")]
+    for i in range(max(lengths) + args.turns):
+        message = HumanMessage if i % 2 == 0 else AIMessage
+        history.append(message(paragraphs[i % len(paragraphs)]))
+    options = dict(max_tokens=args.max_tokens, strategy="last", include_system=True, start_on="human")
+
+    counters = {"trim_messages, tiktoken_counter": tiktoken_counter(args.model)}
+    if ChatOpenAI is None:
+        print("langchain-openai is not installed; skipping the ChatOpenAI counter")
+    else:
+        counters["trim_messages, ChatOpenAI"] = ChatOpenAI(model=args.model, api_key="unused")
+    encoding_for_model(args.model)  # load the BPE ranks outside the timings
+
+    print(f"ms per turn, trimming to {args.max_tokens} tokens")
+    print(f"{'history length':<36}" + "".join(f"{n:>10}" for n in lengths))
+    for name, counter in counters.items():
+        times = [per_turn(lambda m: trim_messages(m, token_counter=counter, **options), history, n, args.turns) for n in lengths]
+        print(f"{name:<36}" + "".join(f"{t:>10.2f}" for t in times))
+
+    cold, warm = [], []
+    for n in lengths:
+        cold.append(per_turn(lambda m: MessageTrimmer(model=args.model, **options)(m), history, n, args.turns))
+        warm.append(per_turn(MessageTrimmer(model=args.model, **options), history, n, args.turns))
+    print(f"{'MessageTrimmer, new trimmer':<36}" + "".join(f"{t:>10.2f}" for t in cold))
+    print(f"{'MessageTrimmer, next turn':<36}" + "".join(f"{t:>10.3f}" for t in warm))
+
+
+if __name__ == "__main__":
+    main()
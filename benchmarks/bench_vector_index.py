@@ -0,0 +1,87 @@
+"""Vector search on CPU: exact vs IVF-PQ, one query at a time vs batched.
+
+Generates clustered, embedding-like vectors (a low-rank latent mixture plus
+noise) at each ``--sizes`` count and reports queries per second for:
+
+* FlatIndex answering one query per call, as ``similarity_search`` does;
+* FlatIndex answering all ``--queries`` in one batched call;
+* IVFPQIndex batched, at each ``--nprobe``, with recall@k against exact.
+
+    python benchmarks/bench_vector_index.py --sizes 10000,100000,1000000 --dimensions 128 --k 10
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+from genai_common.vector_index import FlatIndex, IVFPQIndex
+
+
+def embedding_like(count, dimensions, rng, latent=32, clusters=1000):
+    """Vectors whose neighbours are well separated, as with real text embeddings."""
+    state = np.random.default_rng(0)
+    projection = state.standard_normal((latent, dimensions))
+    centers = state.standard_normal((clusters, latent))
+    vectors = np.empty((count, dimensions), dtype=np.float32)
+    for start in range(0, count, 100000):
+        n = min(100000, count - start)
+        z = centers[rng.integers(0, clusters, n)] + 0.5 * rng.standard_normal((n, latent))
+        vectors[start:start + n] = z @ projection + 0.5 * rng.standard_normal((n, dimensions))
+    return vectors
+
+
+def recall(found, expected):
+    k = expected.shape[1]
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(found.tolist(), expected.tolist())]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma-separated vector counts")
+    parser.add_argument("--dimensions", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--single-queries", type=int, default=100, help="queries timed one at a time")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", default="4,16", help="comma-separated IVF probe counts")
+    parser.add_argument("--m", type=int, default=None, help="PQ codes per vector (default: dimensions / 8)")
+    parser.add_argument("--refine", type=int, default=16)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    queries = embedding_like(args.queries, args.dimensions, rng)
+    print(f"{'vectors':>9}  {'method':<24} {'QPS':>9} {'recall@' + str(args.k):>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        index = IVFPQIndex(m=args.m, refine=args.refine)
+        index.add(embedding_like(size, args.dimensions, rng))
+
+        start = time.perf_counter()
+        for query in queries[:args.single_queries]:
+            FlatIndex.search(index, query, args.k)
+        qps = args.single_queries / (time.perf_counter() - start)
+        print(f"{size:>9}  {'exact, one per call':<24} {qps:>9.0f} {1.0:>9.3f}")
+
+        start = time.perf_counter()
+        _, expected = index.search(queries, args.k, exact=True)
+        qps = len(queries) / (time.perf_counter() - start)
+        print(f"{size:>9}  {'exact, batched':<24} {qps:>9.0f} {1.0:>9.3f}")
+
+        start = time.perf_counter()
+        index.train()
+        lists, m = len(index.centroids), index.codebooks.shape[0]
+        print(f"{size:>9}  train nlist={lists} m={m}: {time.perf_counter() - start:.1f}s")
+        for nprobe in (int(n) for n in args.nprobe.split(",")):
+            index.nprobe = nprobe
+            start = time.perf_counter()
+            _, found = index.search(queries, args.k)
+            qps = len(queries) / (time.perf_counter() - start)
+            label = f"IVF-PQ nprobe={nprobe}"
+            print(f"{size:>9}  {label:<24} {qps:>9.0f} {recall(found, expected):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+"""Shared helpers used by the OpenAI/ and Azure/ course scripts.
+
+The course scripts live in numbered folders that are not importable packages,
+so each script adds the repository root to ``sys.path`` before importing from
+here::
+
+    import os
+    import sys
+
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+    from genai_common.completion import generate_response
+"""
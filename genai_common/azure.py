@@ -0,0 +1,251 @@
+"""Rate-limit-aware client for Azure OpenAI deployments.
+
+Azure enforces a tokens-per-minute (TPM) and requests-per-minute (RPM) quota
+per deployment and answers with 429 and ``Retry-After`` once it is exceeded.
+:class:`RateLimitedAzureClient` keeps requests under the quota on the client
+side and spreads them over several deployments of the same model::
+
+    client = RateLimitedAzureClient(
+        [AzureDeployment("gpt-35-turbo-instruct", tpm=120_000, rpm=720),
+         AzureDeployment("gpt-35-turbo-instruct-2", tpm=120_000, rpm=720)],
+        azure_endpoint="https://rk-aiworks.openai.azure.com/",
+    )
+    answers = client.generate_many(prompts, concurrency=16)
+
+Each request goes to the deployment that can take it soonest. A 429 puts that
+deployment on cool-down for ``Retry-After`` seconds (plus jitter) and the
+request is retried, on another deployment if one is free.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+
+import openai
+
+from .completion import CompletionClient
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    """Refills at ``rate_per_minute`` and holds ``burst_seconds`` worth of it.
+
+    Azure checks quotas over short windows (RPM over 10 seconds), so the
+    default only lets a tenth of the per-minute quota out at once.
+    :meth:`reserve` takes what it needs straight away, going into debt if
+    necessary, and returns how long the caller must wait before sending;
+    reserving never races with another thread doing the same.
+    """
+
+    def __init__(self, rate_per_minute, burst_seconds=10):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount=1):
+        """Seconds until ``amount`` could be reserved without waiting."""
+        with self._lock:
+            self._refill(time.monotonic())
+            missing = min(amount, self.capacity) - self.tokens
+            return max(0.0, missing / self.rate)
+
+    def reserve(self, amount=1):
+        # A request bigger than the whole bucket still has to go out eventually.
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+
+class AzureDeployment:
+    """A deployment name with its TPM and RPM quota (``None`` means unlimited)."""
+
+    def __init__(self, name, tpm=None, rpm=None, burst_seconds=10):
+        self.name = name
+        self.tpm = tpm
+        self.rpm = rpm
+        self.tokens = TokenBucket(tpm, burst_seconds) if tpm else None
+        self.requests = TokenBucket(rpm, burst_seconds) if rpm else None
+        self.cooldown_until = 0.0
+        self.sent = 0
+        self.throttled = 0
+
+    def wait_time(self, tokens, now):
+        waits = [self.cooldown_until - now]
+        if self.requests is not None:
+            waits.append(self.requests.wait_time(1))
+        if self.tokens is not None:
+            waits.append(self.tokens.wait_time(tokens))
+        return max(0.0, *waits)
+
+    def reserve(self, tokens, now):
+        waits = [self.cooldown_until - now]
+        if self.requests is not None:
+            waits.append(self.requests.reserve(1))
+        if self.tokens is not None:
+            waits.append(self.tokens.reserve(tokens))
+        self.sent += 1
+        return max(0.0, *waits)
+
+    def __repr__(self):
+        return f"AzureDeployment({self.name!r}, tpm={self.tpm}, rpm={self.rpm})"
+
+
+def retry_after_seconds(error):
+    """Delay the server asked for, from ``retry-after-ms`` or ``retry-after``."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value) * scale
+        except ValueError:
+            continue
+    return None
+
+
+def estimate_tokens(request):
+    """Tokens Azure counts against TPM: roughly the prompt plus ``max_tokens`` per choice.
+
+    Uses four characters per token rather than a tokenizer, which is close
+    enough for pacing and keeps the hot path cheap.
+    """
+    if "messages" in request:
+        chars = sum(len(message.get("content") or "") for message in request["messages"])
+    else:
+        prompt = request.get("prompt") or ""
+        chars = len(prompt) if isinstance(prompt, str) else sum(map(len, prompt))
+    return chars // 4 + (request.get("max_tokens") or 16) * (request.get("n") or 1)
+
+
+class RateLimitedAzureClient(CompletionClient):
+    """:class:`CompletionClient` over several Azure deployments with client-side quotas.
+
+    Keeps the pooled keep-alive connections of the base class and turns off
+    the SDK's own retries; instead 429s, timeouts and 5xx responses are
+    retried here, up to ``max_attempts`` sends per request, honouring
+    ``Retry-After`` when present and otherwise backing off exponentially
+    from ``base_delay`` up to ``max_delay``, both with random jitter.
+    """
+
+    def __init__(
+        self,
+        deployments,
+        azure_endpoint,
+        api_version="2024-02-01",
+        api_key=None,
+        api="completions",
+        max_tokens=200,
+        temperature=None,
+        max_attempts=6,
+        base_delay=0.5,
+        max_delay=30.0,
+        jitter=0.2,
+        **kwargs,
+    ):
+        deployments = [d if isinstance(d, AzureDeployment) else AzureDeployment(d) for d in deployments]
+        if not deployments:
+            raise ValueError("At least one deployment is required")
+        super().__init__(
+            model=deployments[0].name,
+            api=api,
+            api_key=api_key or os.environ.get("AZURE_OPENAI_API_KEY"),
+            azure_endpoint=azure_endpoint,
+            api_version=api_version,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            max_retries=0,
+            **kwargs,
+        )
+        self.deployments = deployments
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retries = 0
+        self._route_lock = threading.Lock()
+        self._next = 0
+
+    def _choose(self, tokens):
+        """Pick and reserve the deployment that can send soonest; return it and the wait."""
+        with self._route_lock:
+            now = time.monotonic()
+            count = len(self.deployments)
+            # Start from a rotating offset so ties are spread evenly.
+            order = [self.deployments[(self._next + i) % count] for i in range(count)]
+            self._next = (self._next + 1) % count
+            deployment = min(order, key=lambda d: d.wait_time(tokens, now))
+            return deployment, deployment.reserve(tokens, now)
+
+    def _backoff(self, deployment, error, attempt):
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            delay = retry_after * (1 + random.uniform(0, self.jitter))
+        else:
+            # Full jitter: anywhere up to the exponential step.
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        with self._route_lock:
+            self.retries += 1
+            if isinstance(error, openai.RateLimitError):
+                deployment.throttled += 1
+                # Only this deployment is over quota; the others can keep going.
+                deployment.cooldown_until = max(deployment.cooldown_until, time.monotonic() + delay)
+                return 0.0
+        return delay
+
+    def _create(self, client, request):
+        tokens = estimate_tokens(request)
+        for attempt in range(self.max_attempts):
+            deployment, wait = self._choose(tokens)
+            if wait:
+                time.sleep(wait)
+            try:
+                return self._send(client, {**request, "model": deployment.name})
+            except RETRYABLE_ERRORS as error:
+                if attempt + 1 == self.max_attempts:
+                    raise
+                delay = self._backoff(deployment, error, attempt)
+                if delay:
+                    time.sleep(delay)
+
+    async def _acreate(self, client, request):
+        tokens = estimate_tokens(request)
+        for attempt in range(self.max_attempts):
+            deployment, wait = self._choose(tokens)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                return await self._send(client, {**request, "model": deployment.name})
+            except RETRYABLE_ERRORS as error:
+                if attempt + 1 == self.max_attempts:
+                    raise
+                delay = self._backoff(deployment, error, attempt)
+                if delay:
+                    await asyncio.sleep(delay)
+
+    def stats(self):
+        return {
+            "retries": self.retries,
+            "deployments": {
+                d.name: {"sent": d.sent, "throttled": d.throttled} for d in self.deployments
+            },
+        }
@@ -0,0 +1,219 @@
+"""Content-addressed response cache for completion calls.
+
+Entries are keyed on a SHA-256 of the full request (model, messages or
+prompt, max_tokens, temperature, ...), so rerunning the same prompt with the
+same settings is answered locally. Two tiers:
+
+* an in-memory LRU of at most ``max_entries`` responses;
+* an on-disk directory of one small JSON file per key, bounded to
+  ``max_disk_bytes`` by evicting the least recently used files.
+
+Every entry carries its own expiry time. By default only deterministic
+(``temperature == 0``) requests are cached, since sampling at a higher
+temperature is usually meant to give a different answer each time.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "genai-course", "responses")
+
+
+def request_key(request):
+    """Stable hex digest for a request dict (key order does not matter)."""
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier LRU cache with per-entry TTL and hit/miss counters.
+
+    ``ttl`` is the default lifetime in seconds (``None`` keeps entries until
+    they are evicted); :meth:`set` can override it per entry. Pass
+    ``cache_dir=None`` for a memory-only cache.
+    """
+
+    def __init__(
+        self,
+        cache_dir=DEFAULT_CACHE_DIR,
+        max_entries=1024,
+        max_disk_bytes=64 * 1024 * 1024,
+        ttl=7 * 24 * 3600,
+        deterministic_only=True,
+    ):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self.deterministic_only = deterministic_only
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def is_cacheable(self, request):
+        """Whether ``request`` should go through the cache at all."""
+        if not self.deterministic_only:
+            return True
+        return request.get("temperature") == 0
+
+    # Lookups
+
+    def get(self, key):
+        """Return the cached value for ``key`` or ``None``."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, entry["value"], entry["expires_at"])
+        return entry["value"]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else time.time() + ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+        self._write_disk(key, value, expires_at)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self.cache_dir is not None:
+                for path in self._disk_files():
+                    os.remove(path)
+                self._disk_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    # Memory tier (callers hold the lock)
+
+    def _remember(self, key, value, expires_at):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    # Disk tier
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def _disk_files(self):
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if name.endswith(".json"):
+                    yield os.path.join(root, name)
+
+    def _read_disk(self, key, now):
+        if self.cache_dir is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry["expires_at"] is not None and entry["expires_at"] <= now:
+            self._remove_disk(path)
+            return None
+        # Touch the file so disk eviction sees it as recently used. If another
+        # process evicted it meanwhile, count the lookup as a miss.
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return entry
+
+    def _write_disk(self, key, value, expires_at):
+        if self.cache_dir is None:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps({"expires_at": expires_at, "value": value}, ensure_ascii=False).encode("utf-8")
+        # Write then rename so concurrent readers never see a partial file.
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(os.path.getsize(p) for p in self._disk_files())
+            else:
+                # Overwriting a key replaces its old file rather than adding one.
+                self._disk_bytes += len(data) - replaced
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _remove_disk(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes -= size
+
+    def _evict_disk(self):
+        # Drop least recently used files until we are 10% under the limit,
+        # so a full cache does not rescan the directory on every write.
+        files = []
+        for path in self._disk_files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        target = self.max_disk_bytes * 0.9
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        self._disk_bytes = total
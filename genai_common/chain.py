@@ -0,0 +1,181 @@
+"""Streaming prompt-chain runner.
+
+A chain is a list of :class:`Stage` objects. Each stage streams its
+completion (``stream=True``) and starts as soon as the stages it declares in
+``depends_on`` have finished, so independent stages run side by side and a
+dependent stage is queued the moment its input is complete. Output is shown
+stage by stage in declaration order while later stages are already running::
+
+    chain = StreamingChain(client, [
+        Stage("outline", "Write an outline for a blog post about {topic}."),
+        Stage("introduction", "Write an introduction from this outline:\\n\\n{outline}",
+              depends_on=["outline"]),
+    ])
+    result = chain.run(topic="AI in healthcare")
+    print(result["introduction"], result.timings["introduction"].time_to_first_token)
+"""
+
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import telemetry
+
+_DONE = object()
+
+
+class Stage:
+    """One prompt in a chain.
+
+    ``prompt`` is either a format string whose fields are filled from the
+    outputs of ``depends_on`` stages (and the keyword arguments given to
+    :meth:`StreamingChain.run`), or a callable taking that same dict.
+    Remaining keyword arguments (``max_tokens``, ``temperature``, ...) are
+    passed through to the completion call.
+    """
+
+    def __init__(self, name, prompt, depends_on=(), **overrides):
+        self.name = name
+        self.prompt = prompt
+        self.depends_on = tuple(depends_on)
+        self.overrides = overrides
+
+    def render(self, values):
+        if callable(self.prompt):
+            return self.prompt(values)
+        return self.prompt.format(**values)
+
+
+class StageTiming:
+    """Timings for one stage, in seconds from the start of the run."""
+
+    def __init__(self):
+        self.started = None
+        self.first_token = None
+        self.finished = None
+
+    @property
+    def time_to_first_token(self):
+        """Seconds from the stage's request to its first streamed token."""
+        if self.started is None or self.first_token is None:
+            return None
+        return self.first_token - self.started
+
+    @property
+    def duration(self):
+        if self.started is None or self.finished is None:
+            return None
+        return self.finished - self.started
+
+    def __repr__(self):
+        return (
+            f"StageTiming(started={self.started}, time_to_first_token={self.time_to_first_token}, "
+            f"duration={self.duration})"
+        )
+
+
+class ChainResult(dict):
+    """Stage name -> output text, plus a ``timings`` dict of :class:`StageTiming`."""
+
+    def __init__(self, outputs, timings, total_time):
+        super().__init__(outputs)
+        self.timings = timings
+        self.total_time = total_time
+
+
+def print_tokens(stage, text):
+    """Default ``on_token``: write the text straight to stdout."""
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+class StreamingChain:
+    """Run :class:`Stage` objects over ``client.stream_response``.
+
+    ``client`` is anything with a ``stream_response(prompt, **overrides)``
+    generator, normally a :class:`~genai_common.completion.CompletionClient`.
+    A stage may only depend on stages declared before it, which rules out
+    cycles.
+    """
+
+    def __init__(self, client, stages):
+        names = set()
+        for stage in stages:
+            if stage.name in names:
+                raise ValueError(f"Duplicate stage name {stage.name!r}")
+            missing = [name for name in stage.depends_on if name not in names]
+            if missing:
+                raise ValueError(f"Stage {stage.name!r} depends on unknown or later stages: {missing}")
+            names.add(stage.name)
+        self.client = client
+        self.stages = list(stages)
+
+    def _run_stage(self, stage, inputs, outputs, errors, done, tokens, timing, start):
+        try:
+            for name in stage.depends_on:
+                done[name].wait()
+                if name in errors:
+                    raise RuntimeError(f"Stage {stage.name!r} skipped: dependency {name!r} failed") from errors[name]
+            values = dict(inputs)
+            values.update({name: outputs[name] for name in stage.depends_on})
+            prompt = stage.render(values)
+
+            timing.started = time.perf_counter() - start
+            pieces = []
+            with telemetry.stage(stage.name):
+                for text in self.client.stream_response(prompt, **stage.overrides):
+                    if timing.first_token is None:
+                        timing.first_token = time.perf_counter() - start
+                    pieces.append(text)
+                    tokens.put(text)
+            outputs[stage.name] = "".join(pieces).strip()
+            timing.finished = time.perf_counter() - start
+        except BaseException as exc:
+            errors[stage.name] = exc
+        finally:
+            # Release dependants before the printer, so the next stage's
+            # request is already on the wire while this one is displayed.
+            done[stage.name].set()
+            tokens.put(_DONE)
+
+    def run(self, on_stage=None, on_token=print_tokens, **inputs):
+        """Run every stage and return a :class:`ChainResult`.
+
+        ``on_stage(stage)`` is called before a stage's output is shown and
+        ``on_token(stage, text)`` for every streamed piece, in stage order.
+        Pass ``on_token=None`` to run silently.
+        """
+        start = time.perf_counter()
+        outputs, errors = {}, {}
+        done = {stage.name: threading.Event() for stage in self.stages}
+        tokens = {stage.name: queue.Queue() for stage in self.stages}
+        timings = {stage.name: StageTiming() for stage in self.stages}
+
+        with ThreadPoolExecutor(max_workers=len(self.stages) or 1) as executor:
+            for stage in self.stages:
+                executor.submit(
+                    self._run_stage,
+                    stage,
+                    inputs,
+                    outputs,
+                    errors,
+                    done,
+                    tokens[stage.name],
+                    timings[stage.name],
+                    start,
+                )
+            for stage in self.stages:
+                if on_stage is not None:
+                    on_stage(stage)
+                while True:
+                    text = tokens[stage.name].get()
+                    if text is _DONE:
+                        break
+                    if on_token is not None:
+                        on_token(stage, text)
+                if stage.name in errors:
+                    raise errors[stage.name]
+
+        return ChainResult(outputs, timings, time.perf_counter() - start)
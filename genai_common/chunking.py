@@ -0,0 +1,179 @@
+"""Token-based chunking of many documents across a process pool.
+
+The LangChain token splitters (``TokenTextSplitter`` and the
+``from_tiktoken_encoder`` variants of ``CharacterTextSplitter`` and
+``RecursiveCharacterTextSplitter``) tokenize one document at a time on one
+core. :class:`TokenChunker` fans documents out to worker processes in
+batches. Each worker builds its splitter, and so loads the tiktoken
+encoder, once when it starts, and the chunks come back in the original
+document order::
+
+    with TokenChunker("recursive", chunk_size=100, chunk_overlap=0) as chunker:
+        chunks = chunker.split_documents(documents)  # LangChain Documents
+
+Every chunk's metadata is the source document's metadata plus
+``doc_index`` and ``chunk_index``. Small inputs are split in-process, where
+starting workers would cost more than it saves.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+METHODS = ("token", "recursive", "character")
+
+# Below this many characters a call is split in the calling process.
+PARALLEL_MIN_CHARS = 1 << 20
+
+_worker_splitter = None
+
+
+def build_splitter(method="recursive", chunk_size=100, chunk_overlap=0, encoding_name="cl100k_base", model_name=None, **kwargs):
+    """The LangChain splitter for ``method``, measuring chunks in tiktoken tokens."""
+    from langchain_text_splitters import CharacterTextSplitter, RecursiveCharacterTextSplitter, TokenTextSplitter
+
+    options = {"encoding_name": encoding_name, "model_name": model_name, "chunk_size": chunk_size, "chunk_overlap": chunk_overlap}
+    if method == "token":
+        return TokenTextSplitter(**options, **kwargs)
+    if method == "recursive":
+        return RecursiveCharacterTextSplitter.from_tiktoken_encoder(**options, **kwargs)
+    if method == "character":
+        return CharacterTextSplitter.from_tiktoken_encoder(**options, **kwargs)
+    raise ValueError(f"method must be one of {', '.join(METHODS)}, got {method!r}")
+
+
+def _init_worker(options):
+    global _worker_splitter
+    _worker_splitter = build_splitter(**options)
+
+
+def _split_batch(texts):
+    return [_worker_splitter.split_text(text) for text in texts]
+
+
+def _text_and_metadata(document):
+    if isinstance(document, str):
+        return document, {}
+    if isinstance(document, tuple):
+        text, metadata = document
+        return text, dict(metadata or {})
+    # LangChain Document, or anything shaped like one.
+    return document.page_content, dict(document.metadata or {})
+
+
+class TokenChunker:
+    """Split documents into token-sized chunks on a pool of worker processes.
+
+    ``method`` is ``"token"``, ``"recursive"`` or ``"character"``; the
+    remaining keyword arguments go to :func:`build_splitter`. ``processes``
+    defaults to the CPU count. Documents travel to the workers
+    ``batch_size`` at a time, with at most ``4 * processes`` batches in
+    flight, so an iterator of documents is consumed incrementally.
+    """
+
+    def __init__(
+        self,
+        method="recursive",
+        chunk_size=100,
+        chunk_overlap=0,
+        encoding_name="cl100k_base",
+        model_name=None,
+        processes=None,
+        batch_size=64,
+        **splitter_kwargs,
+    ):
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {', '.join(METHODS)}, got {method!r}")
+        self.options = {
+            "method": method,
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "encoding_name": encoding_name,
+            "model_name": model_name,
+            **splitter_kwargs,
+        }
+        self.processes = processes or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self._splitter = None
+        self._executor = None
+
+    @property
+    def splitter(self):
+        """The in-process splitter, used for small inputs and ``processes=1``."""
+        if self._splitter is None:
+            self._splitter = build_splitter(**self.options)
+        return self._splitter
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes, initializer=_init_worker, initargs=(self.options,)
+            )
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _batches(self, documents):
+        batch = []
+        for document in documents:
+            batch.append(_text_and_metadata(document))
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def iter_split(self, documents, parallel=None):
+        """Yield ``(text, metadata, chunks)`` per document, in input order.
+
+        ``parallel=None`` uses the pool only for lists of at least
+        ``PARALLEL_MIN_CHARS`` characters (and always for iterators).
+        """
+        if parallel is None:
+            if isinstance(documents, (list, tuple)):
+                parallel = sum(len(_text_and_metadata(d)[0]) for d in documents) >= PARALLEL_MIN_CHARS
+            else:
+                parallel = True
+        if not parallel or self.processes == 1:
+            for batch in self._batches(documents):
+                for text, metadata in batch:
+                    yield text, metadata, self.splitter.split_text(text)
+            return
+
+        executor = self._pool()
+        pending = deque()
+        for batch in self._batches(documents):
+            pending.append((batch, executor.submit(_split_batch, [text for text, _ in batch])))
+            if len(pending) >= 4 * self.processes:
+                batch, future = pending.popleft()
+                for (text, metadata), chunks in zip(batch, future.result()):
+                    yield text, metadata, chunks
+        while pending:
+            batch, future = pending.popleft()
+            for (text, metadata), chunks in zip(batch, future.result()):
+                yield text, metadata, chunks
+
+    def split_texts(self, texts, parallel=None):
+        """Chunks of each text, as one list of strings per text."""
+        return [chunks for _, _, chunks in self.iter_split(texts, parallel=parallel)]
+
+    def split_documents(self, documents, parallel=None):
+        """LangChain ``Document`` chunks of strings, ``(text, metadata)`` pairs or Documents."""
+        from langchain_core.documents import Document
+
+        result = []
+        for doc_index, (_, metadata, chunks) in enumerate(self.iter_split(documents, parallel=parallel)):
+            for chunk_index, chunk in enumerate(chunks):
+                result.append(
+                    Document(page_content=chunk, metadata={**metadata, "doc_index": doc_index, "chunk_index": chunk_index})
+                )
+        return result
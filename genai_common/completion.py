@@ -0,0 +1,457 @@
+"""Shared completion client for the course scripts.
+
+Every use-case script used to carry its own ``generate_response(prompt)`` that
+made one blocking call on the module-global ``openai`` client. This module
+keeps one pooled HTTP client per process and adds an async coroutine and a
+bounded-concurrency batch API on top of it::
+
+    from genai_common.completion import generate_response, generate_many
+
+    print(generate_response("Once upon a time,"))
+    answers = generate_many(prompts, concurrency=8)
+
+Azure deployments that only expose the legacy ``completions`` endpoint use
+:meth:`CompletionClient.azure`. Pass ``cache=True`` (or a
+:class:`~genai_common.cache.ResponseCache`) to answer repeated deterministic
+requests locally. :meth:`CompletionClient.generate_candidates` asks for
+several completions of one prompt in a single request (``n > 1``), and
+:meth:`CompletionClient.stream_response` yields text as it arrives
+(``stream=True``). With ``fit_max_tokens=True`` the prompt is counted
+locally and ``max_tokens`` is lowered to what the model's context window
+has left (see :mod:`genai_common.tokens`). Pass ``transport=`` (or set
+``GENAI_REPLAY``) to record or replay traffic offline (see
+:mod:`genai_common.replay`). Every call is timed and its token usage
+recorded once :mod:`genai_common.telemetry` is configured.
+"""
+
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import openai
+
+from . import telemetry
+from .cache import ResponseCache, request_key
+from .replay import transport_from_env
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant."
+DEFAULT_MAX_CONNECTIONS = 64
+
+
+class CompletionClient:
+    """Generate text through one pooled sync client and one async client.
+
+    ``api="chat"`` calls ``chat.completions.create`` with a system and a user
+    message; ``api="completions"`` calls ``completions.create`` with the raw
+    prompt (the Azure ``gpt-35-turbo-instruct`` deployments). The HTTP clients
+    are created lazily, so importing a script never needs an API key.
+    """
+
+    def __init__(
+        self,
+        model=DEFAULT_MODEL,
+        system_prompt=DEFAULT_SYSTEM_PROMPT,
+        max_tokens=500,
+        temperature=0.3,
+        api="chat",
+        api_key=None,
+        base_url=None,
+        max_connections=DEFAULT_MAX_CONNECTIONS,
+        azure_endpoint=None,
+        api_version=None,
+        cache=None,
+        supports_n=None,
+        fit_max_tokens=False,
+        max_retries=None,
+        transport=None,
+    ):
+        if api not in ("chat", "completions"):
+            raise ValueError(f"api must be 'chat' or 'completions', got {api!r}")
+        self.model = model
+        self.system_prompt = system_prompt
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.api = api
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.azure_endpoint = azure_endpoint
+        self.api_version = api_version
+        self.cache = ResponseCache() if cache is True else cache or None
+        # Whether the backend accepts n > 1; None until the first attempt.
+        self.supports_n = supports_n
+        self.fit_max_tokens = fit_max_tokens
+        # Retries done by the openai SDK itself; None keeps its default.
+        self.max_retries = max_retries
+        # httpx transport for both clients, e.g. a RecordReplayTransport.
+        self.transport = transport
+        self._client = None
+        self._async_client = None
+        self._async_loop = None
+
+    @classmethod
+    def azure(
+        cls,
+        deployment_name,
+        azure_endpoint,
+        api_version="2024-02-01",
+        api_key=None,
+        api="completions",
+        max_tokens=200,
+        temperature=None,
+        **kwargs,
+    ):
+        """Client for an Azure OpenAI deployment (``model`` is the deployment name)."""
+        return cls(
+            model=deployment_name,
+            api=api,
+            api_key=api_key or os.environ.get("AZURE_OPENAI_API_KEY"),
+            azure_endpoint=azure_endpoint,
+            api_version=api_version,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            **kwargs,
+        )
+
+    # Clients
+
+    def _build_client(self, is_async):
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections,
+        )
+        transport = self.transport or transport_from_env(limits)
+        if is_async:
+            http_client = openai.DefaultAsyncHttpxClient(limits=limits, transport=transport)
+        else:
+            http_client = openai.DefaultHttpxClient(limits=limits, transport=transport)
+
+        options = {"http_client": http_client}
+        if self.max_retries is not None:
+            options["max_retries"] = self.max_retries
+        # Replayed responses need no credentials, but the SDK insists on a key.
+        placeholder_key = "replay" if getattr(transport, "mode", None) == "replay" else None
+        if self.azure_endpoint is not None:
+            client_class = openai.AsyncAzureOpenAI if is_async else openai.AzureOpenAI
+            return client_class(
+                api_key=self.api_key or os.environ.get("AZURE_OPENAI_API_KEY") or placeholder_key,
+                api_version=self.api_version,
+                azure_endpoint=self.azure_endpoint,
+                **options,
+            )
+        client_class = openai.AsyncOpenAI if is_async else openai.OpenAI
+        return client_class(
+            api_key=self.api_key or os.environ.get("OPENAI_API_KEY") or placeholder_key,
+            base_url=self.base_url,
+            **options,
+        )
+
+    @property
+    def client(self):
+        """The pooled synchronous client, shared by every thread."""
+        if self._client is None:
+            self._client = self._build_client(is_async=False)
+        return self._client
+
+    @property
+    def async_client(self):
+        """The async client for the running event loop.
+
+        httpx async connections belong to the loop that opened them, so a new
+        client is built when called from a different loop (e.g. a second
+        ``asyncio.run``).
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = self._build_client(is_async=True)
+            self._async_loop = loop
+        return self._async_client
+
+    def close(self):
+        """Close the sync client; the async client belongs to an event loop and is closed by :meth:`aclose`."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self):
+        """Close both clients; await it on the loop that used the async client."""
+        self.close()
+        if self._async_client is not None:
+            client, self._async_client, self._async_loop = self._async_client, None, None
+            await client.close()
+
+    # Requests
+
+    def _request(self, prompt, overrides):
+        options = {
+            "model": self.model,
+            "system_prompt": self.system_prompt,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+        }
+        unknown = set(overrides) - set(options)
+        if unknown:
+            raise TypeError(f"Unexpected options: {', '.join(sorted(unknown))}")
+        options.update(overrides)
+
+        request = {"model": options["model"], "max_tokens": options["max_tokens"]}
+        if self.fit_max_tokens:
+            # tiktoken is only needed by clients that ask for this.
+            from .tokens import PromptBudget
+
+            budget = PromptBudget(
+                options["model"],
+                completion_tokens=options["max_tokens"],
+                system_prompt=options["system_prompt"] if self.api == "chat" else None,
+            )
+            request["max_tokens"] = budget.max_tokens_for(prompt)
+        if options["temperature"] is not None:
+            request["temperature"] = options["temperature"]
+        if self.api == "chat":
+            request["messages"] = [
+                {"role": "system", "content": options["system_prompt"]},
+                {"role": "user", "content": prompt},
+            ]
+            request["n"] = 1
+            request["stop"] = None
+        else:
+            request["prompt"] = prompt
+        return request
+
+    def _cache_key(self, request):
+        if self.cache is None or not self.cache.is_cacheable(request):
+            return None
+        # The same model name on two endpoints is not the same model.
+        endpoint = self.azure_endpoint or self.base_url or os.environ.get("OPENAI_BASE_URL")
+        return request_key({"api": self.api, "endpoint": endpoint, **request})
+
+    def _send(self, client, request):
+        # Returns a coroutine when ``client`` is an async client.
+        if self.api == "chat":
+            return client.chat.completions.create(**request)
+        return client.completions.create(**request)
+
+    def _create(self, client, request):
+        """Send ``request`` on the sync client; subclasses add retries and routing here."""
+        return self._send(client, request)
+
+    async def _acreate(self, client, request):
+        return await self._send(client, request)
+
+    def _texts(self, response):
+        choices = sorted(response.choices, key=lambda choice: choice.index)
+        if self.api == "chat":
+            return [choice.message.content.strip() for choice in choices]
+        return [choice.text for choice in choices]
+
+    def _text(self, response):
+        return self._texts(response)[0]
+
+    def _candidate_requests(self, prompt, n, overrides):
+        batched = self._request(prompt, overrides)
+        batched["n"] = n
+        single = dict(batched)
+        if self.api == "chat":
+            single["n"] = 1
+        else:
+            del single["n"]
+        return batched, single
+
+    def generate_response(self, prompt, **overrides):
+        """Blocking call; ``overrides`` may set model, system_prompt, max_tokens or temperature."""
+        request = self._request(prompt, overrides)
+        with telemetry.track_call(request["model"]) as call:
+            key = self._cache_key(request)
+            if key is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    call.cache_hit()
+                    return cached
+            response = self._create(self.client, request)
+            call.openai_usage(response.usage)
+            text = self._text(response)
+        if key is not None:
+            self.cache.set(key, text)
+        return text
+
+    async def agenerate_response(self, prompt, **overrides):
+        request = self._request(prompt, overrides)
+        with telemetry.track_call(request["model"]) as call:
+            key = self._cache_key(request)
+            if key is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    call.cache_hit()
+                    return cached
+            response = await self._acreate(self.async_client, request)
+            call.openai_usage(response.usage)
+            text = self._text(response)
+        if key is not None:
+            self.cache.set(key, text)
+        return text
+
+    def generate_candidates(self, prompt, n=2, **overrides):
+        """Return ``n`` completions of ``prompt`` as a list.
+
+        All candidates come back from one request with ``n=n``. Backends that
+        reject ``n > 1`` (some Azure ``completions`` deployments) get ``n``
+        concurrent single requests instead, and the client remembers not to
+        try the batched form again.
+        """
+        if n < 1:
+            raise ValueError("n must be at least 1")
+        batched, single = self._candidate_requests(prompt, n, overrides)
+        with telemetry.track_call(batched["model"]) as call:
+            if n > 1 and self.supports_n is not False:
+                try:
+                    response = self._create(self.client, batched)
+                except openai.BadRequestError:
+                    if self.supports_n:
+                        raise
+                else:
+                    self.supports_n = True
+                    call.openai_usage(response.usage)
+                    return self._texts(response)
+
+            with ThreadPoolExecutor(max_workers=n) as executor:
+                futures = [executor.submit(self._create, self.client, single) for _ in range(n)]
+                responses = [future.result() for future in futures]
+            for response in responses:
+                call.openai_usage(response.usage)
+        if n > 1 and self.supports_n is None:
+            # Only learn "no n > 1" once the single form has actually worked,
+            # so an unrelated bad request is not mistaken for it.
+            self.supports_n = False
+        return [self._text(response) for response in responses]
+
+    async def agenerate_candidates(self, prompt, n=2, **overrides):
+        if n < 1:
+            raise ValueError("n must be at least 1")
+        batched, single = self._candidate_requests(prompt, n, overrides)
+        with telemetry.track_call(batched["model"]) as call:
+            if n > 1 and self.supports_n is not False:
+                try:
+                    response = await self._acreate(self.async_client, batched)
+                except openai.BadRequestError:
+                    if self.supports_n:
+                        raise
+                else:
+                    self.supports_n = True
+                    call.openai_usage(response.usage)
+                    return self._texts(response)
+
+            responses = await asyncio.gather(*(self._acreate(self.async_client, single) for _ in range(n)))
+            for response in responses:
+                call.openai_usage(response.usage)
+        if n > 1 and self.supports_n is None:
+            self.supports_n = False
+        return [self._text(response) for response in responses]
+
+    def _delta(self, chunk):
+        # Some chunks (usage, Azure content-filter results) carry no choices.
+        if not chunk.choices:
+            return ""
+        choice = chunk.choices[0]
+        if self.api == "chat":
+            return choice.delta.content or ""
+        return choice.text or ""
+
+    def _stream_request(self, prompt, overrides):
+        request = self._request(prompt, overrides)
+        request["stream"] = True
+        if self.api == "chat" and self.azure_endpoint is None and telemetry.enabled():
+            # A final chunk with the token usage; Azure's 2024-02-01 API rejects this option.
+            request["stream_options"] = {"include_usage": True}
+        return request
+
+    def stream_response(self, prompt, **overrides):
+        """Yield pieces of the completion as the server streams them.
+
+        Streamed text is not stripped or cached; join the pieces and strip to
+        get what :meth:`generate_response` would have returned.
+        """
+        request = self._stream_request(prompt, overrides)
+        with telemetry.track_call(request["model"]) as call:
+            stream = self._create(self.client, request)
+            try:
+                for chunk in stream:
+                    call.openai_usage(getattr(chunk, "usage", None))
+                    text = self._delta(chunk)
+                    if text:
+                        call.first_token()
+                        yield text
+            finally:
+                stream.close()
+
+    async def astream_response(self, prompt, **overrides):
+        request = self._stream_request(prompt, overrides)
+        with telemetry.track_call(request["model"]) as call:
+            stream = await self._acreate(self.async_client, request)
+            try:
+                async for chunk in stream:
+                    call.openai_usage(getattr(chunk, "usage", None))
+                    text = self._delta(chunk)
+                    if text:
+                        call.first_token()
+                        yield text
+            finally:
+                await stream.close()
+
+    def generate_many(self, prompts, concurrency=8, **overrides):
+        """Run ``prompts`` with at most ``concurrency`` requests in flight.
+
+        Uses worker threads over the pooled sync client rather than an event
+        loop, so it also works inside Jupyter where a loop is already running.
+        Results are returned in the order of ``prompts``.
+        """
+        prompts = list(prompts)
+        if not prompts:
+            return []
+        workers = max(1, min(concurrency, len(prompts)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Run each prompt in a copy of the caller's context so the
+            # telemetry stage follows it onto the worker thread.
+            futures = [
+                executor.submit(contextvars.copy_context().run, self.generate_response, prompt, **overrides)
+                for prompt in prompts
+            ]
+            return [future.result() for future in futures]
+
+    async def agenerate_many(self, prompts, concurrency=8, **overrides):
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run(prompt):
+            async with semaphore:
+                return await self.agenerate_response(prompt, **overrides)
+
+        return await asyncio.gather(*(run(prompt) for prompt in prompts))
+
+
+_default_client = None
+
+
+def get_default_client():
+    """The process-wide OpenAI chat client used by the module-level helpers."""
+    global _default_client
+    if _default_client is None:
+        _default_client = CompletionClient()
+    return _default_client
+
+
+def generate_response(prompt, **overrides):
+    return get_default_client().generate_response(prompt, **overrides)
+
+
+async def agenerate_response(prompt, **overrides):
+    return await get_default_client().agenerate_response(prompt, **overrides)
+
+
+def generate_many(prompts, concurrency=8, **overrides):
+    return get_default_client().generate_many(prompts, concurrency=concurrency, **overrides)
+
+
+def generate_candidates(prompt, n=2, **overrides):
+    return get_default_client().generate_candidates(prompt, n=n, **overrides)
@@ -0,0 +1,258 @@
+"""Persistent, content-addressed cache in front of an embeddings model.
+
+The RAG notebooks embed the same chunks of state_of_the_union.txt every time
+a vector store is rebuilt. :class:`CachedEmbeddings` wraps any LangChain
+embeddings object and keys every vector on ``(model, sha256(text))``, so an
+unchanged corpus is embedded once and then served from disk::
+
+    embeddings = CachedEmbeddings(OpenAIEmbeddings())
+    db = FAISS.from_documents(documents, embeddings)  # only misses reach the API
+
+Each model gets an :class:`EmbeddingStore` directory under ``cache_dir``:
+``vectors.f32`` holds the float32 vectors row after row and is read through
+a NumPy memory map, and ``keys.bin`` holds the 32-byte text digests in the
+same row order. The index (digest to row) is rebuilt from ``keys.bin``
+when the store is opened. Rows are only ever appended. Processes may share
+a store: appends take an OS file lock on ``lock`` and first index whatever
+the other processes appended.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+try:
+    from langchain_core.embeddings import Embeddings as _EmbeddingsBase
+except ImportError:  # the cache works without LangChain, as a plain object
+    _EmbeddingsBase = object
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "genai-course", "embeddings")
+
+DIGEST_SIZE = 32
+
+
+def text_digest(text):
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+def model_name(embeddings):
+    """The name a LangChain embeddings object embeds with, including its ``dimensions``."""
+    name = None
+    for attribute in ("model", "deployment", "model_name"):
+        name = getattr(embeddings, attribute, None)
+        if isinstance(name, str) and name:
+            break
+    else:
+        name = type(embeddings).__name__
+    dimensions = getattr(embeddings, "dimensions", None)
+    return f"{name}:{dimensions}" if dimensions else name
+
+
+@contextmanager
+def _file_lock(path):
+    """Hold an exclusive OS lock on ``path`` (created if missing) for the ``with`` block."""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class EmbeddingStore:
+    """Append-only float32 vectors of one model, indexed by text digest."""
+
+    def __init__(self, directory, model=None):
+        self.directory = directory
+        self.model = model
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.keys_path = os.path.join(directory, "keys.bin")
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.lock_path = os.path.join(directory, "lock")
+        self.dimensions = None
+        self._rows = {}
+        self._count = 0
+        self._map = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        with self._lock, _file_lock(self.lock_path):
+            self._sync()
+
+    def _sync(self):
+        """Index the rows other processes appended since the last sync.
+
+        Callers hold both locks, so no append is in flight: files out of step
+        were left by an interrupted append and are cut back to their common rows.
+        """
+        if self.dimensions is None:
+            try:
+                with open(self.meta_path, encoding="utf-8") as f:
+                    self.dimensions = json.load(f)["dimensions"]
+            except (OSError, ValueError, KeyError):
+                return
+        row_bytes = 4 * self.dimensions
+        for path in (self.keys_path, self.vectors_path):
+            open(path, "ab").close()
+        keys_size = os.path.getsize(self.keys_path)
+        vectors_size = os.path.getsize(self.vectors_path)
+        count = min(keys_size // DIGEST_SIZE, vectors_size // row_bytes)
+        if keys_size != count * DIGEST_SIZE:
+            os.truncate(self.keys_path, count * DIGEST_SIZE)
+        if vectors_size != count * row_bytes:
+            os.truncate(self.vectors_path, count * row_bytes)
+        if count > self._count:
+            with open(self.keys_path, "rb") as f:
+                f.seek(self._count * DIGEST_SIZE)
+                keys = f.read((count - self._count) * DIGEST_SIZE)
+            for i in range(count - self._count):
+                self._rows.setdefault(keys[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE], self._count + i)
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, digest):
+        return digest in self._rows
+
+    def rows(self, digests):
+        """Row numbers of ``digests``, ``None`` for the ones not stored."""
+        with self._lock:
+            return [self._rows.get(d) for d in digests]
+
+    def vectors(self, rows):
+        """The stored vectors at ``rows`` as a ``(len(rows), dimensions)`` float32 array."""
+        with self._lock:
+            if self._map is None or len(self._map) < self._count:
+                self._map = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self._count, self.dimensions))
+            return np.asarray(self._map[rows])
+
+    def add(self, digests, vectors):
+        """Append vectors for digests not stored yet; returns their row numbers.
+
+        Appends hold a file lock, so processes sharing the store take turns,
+        and each first picks up the rows the others added.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(digests):
+            raise ValueError("expected one vector per digest")
+        with self._lock, _file_lock(self.lock_path):
+            self._sync()
+            if self.dimensions is None:
+                temporary = self.meta_path + ".tmp"
+                with open(temporary, "w", encoding="utf-8") as f:
+                    json.dump({"model": self.model, "dimensions": vectors.shape[1]}, f)
+                os.replace(temporary, self.meta_path)
+                self.dimensions = vectors.shape[1]
+                self._sync()
+            elif vectors.shape[1] != self.dimensions:
+                raise ValueError(f"store holds {self.dimensions}-dimensional vectors, got {vectors.shape[1]}")
+            new = [i for i, d in enumerate(digests) if d not in self._rows]
+            new = list({digests[i]: i for i in new}.values())
+            if new:
+                # Vectors first, then keys: a row only counts once its key is
+                # written. Row numbers come from the file, not from memory.
+                first = os.path.getsize(self.vectors_path) // (4 * self.dimensions)
+                with open(self.vectors_path, "ab") as f:
+                    f.write(vectors[new].tobytes())
+                with open(self.keys_path, "ab") as f:
+                    f.write(b"".join(digests[i] for i in new))
+                for row, i in enumerate(new, first):
+                    self._rows[digests[i]] = row
+                self._count = first + len(new)
+            return [self._rows[d] for d in digests]
+
+
+class CachedEmbeddings(_EmbeddingsBase):
+    """LangChain embeddings that only send cache misses to ``embeddings``.
+
+    ``model`` names the store (default: the wrapped object's model and
+    ``dimensions``). Misses are deduplicated and sent ``batch_size`` texts
+    per ``embed_documents`` call (``embed_array`` when the wrapped object
+    has one, as :class:`~genai_common.embedding_executor.EmbeddingExecutor`
+    does). Queries go straight to ``embed_query``: some models embed queries
+    differently from documents, and every user query would grow the store.
+    ``cache_queries=True`` sends them through the document cache instead.
+    """
+
+    def __init__(self, embeddings, cache_dir=DEFAULT_CACHE_DIR, model=None, batch_size=1000, cache_queries=False):
+        self.embeddings = embeddings
+        self.model = model or model_name(embeddings)
+        safe = re.sub(r"[^A-Za-z0-9._-]+", "_", self.model)
+        suffix = hashlib.sha256(self.model.encode("utf-8")).hexdigest()[:8]
+        self.store = EmbeddingStore(os.path.join(cache_dir, f"{safe}-{suffix}"), model=self.model)
+        self.batch_size = batch_size
+        self.cache_queries = cache_queries
+        self.hits = 0
+        self.misses = 0
+        self.upstream_calls = 0
+
+    def embed_documents(self, texts):
+        return self.embed_array(texts).tolist()
+
+    def embed_array(self, texts):
+        """Embeddings of ``texts`` as a ``(len(texts), dimensions)`` float32 array, read straight from the store."""
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, self.store.dimensions or 0), dtype=np.float32)
+        digests = [text_digest(t) for t in texts]
+        rows = self.store.rows(digests)
+        missing = {}
+        for digest, text, row in zip(digests, texts, rows):
+            if row is None:
+                missing.setdefault(digest, text)
+        misses = sum(row is None for row in rows)
+        self.hits += len(texts) - misses
+        self.misses += misses
+        if missing:
+            pending = list(missing.items())
+            for i in range(0, len(pending), self.batch_size):
+                batch = pending[i:i + self.batch_size]
+                # An EmbeddingExecutor hands back a float32 matrix directly.
+                embed = getattr(self.embeddings, "embed_array", None) or self.embeddings.embed_documents
+                vectors = embed([text for _, text in batch])
+                self.upstream_calls += 1
+                self.store.add([digest for digest, _ in batch], vectors)
+            rows = self.store.rows(digests)
+        return self.store.vectors(rows)
+
+    def embed_query(self, text):
+        if not self.cache_queries:
+            self.upstream_calls += 1
+            return self.embeddings.embed_query(text)
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts):
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text):
+        return await asyncio.to_thread(self.embed_query, text)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "upstream_calls": self.upstream_calls,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stored": len(self.store),
+        }
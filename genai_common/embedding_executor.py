@@ -0,0 +1,257 @@
+"""Embed large corpora with token-bounded batches and adaptive concurrency.
+
+``OpenAIEmbeddings.embed_documents`` sends fixed batches of 1000 texts one
+after the other and builds every vector as a list of Python floats.
+:class:`EmbeddingExecutor` packs texts into batches bounded by token count,
+keeps several of them in flight on the async client, and decodes the
+base64 float32 payloads straight into a preallocated NumPy matrix::
+
+    executor = EmbeddingExecutor(model="text-embedding-3-small")
+    matrix = executor.embed_array(texts)  # (len(texts), dimensions) float32
+
+Batch size and concurrency adapt as the run goes. A batch answered faster
+than ``target_latency`` grows the next batches and adds concurrency. A
+slower one shrinks the batches. A 429 halves both and holds every request
+until the ``Retry-After`` delay has passed. The learned settings carry
+over to the next call on the same executor.
+
+The blocking calls run on one event loop thread owned by the executor, so
+the async client and its pooled connections are reused from call to call.
+:meth:`EmbeddingExecutor.close` stops the loop, and also closes the client
+when the executor created it.
+"""
+
+import asyncio
+import base64
+import contextvars
+import json
+import random
+import threading
+import time
+import weakref
+from collections import deque
+
+import numpy as np
+import openai
+
+from . import telemetry
+from .azure import RETRYABLE_ERRORS, retry_after_seconds
+from .completion import CompletionClient
+from .tokens import count_tokens_batch
+
+try:
+    from langchain_core.embeddings import Embeddings as _EmbeddingsBase
+except ImportError:  # usable without LangChain, as a plain object
+    _EmbeddingsBase = object
+
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Per-request limits of the embeddings endpoint.
+MAX_BATCH_INPUTS = 2048
+MAX_BATCH_TOKENS = 300_000
+
+
+class EmbeddingExecutor(_EmbeddingsBase):
+    """Adaptive, concurrent batching over ``embeddings.create``.
+
+    ``client`` is a :class:`~genai_common.completion.CompletionClient` (a
+    default one is built otherwise); for Azure, ``model`` is the deployment
+    name. ``batch_tokens`` and ``concurrency`` are the starting points; they
+    move within ``[min_batch_tokens, max_batch_tokens]`` and
+    ``[1, max_concurrency]``. A batch that keeps failing with a retryable
+    error is given up after ``max_attempts``.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        model=DEFAULT_EMBEDDING_MODEL,
+        dimensions=None,
+        batch_tokens=16_384,
+        min_batch_tokens=1024,
+        max_batch_tokens=MAX_BATCH_TOKENS,
+        max_batch_inputs=MAX_BATCH_INPUTS,
+        concurrency=4,
+        max_concurrency=32,
+        target_latency=2.0,
+        max_attempts=8,
+    ):
+        # Only a client created here is closed by close(); a caller's may still be in use.
+        self._owns_client = client is None
+        self.client = client or CompletionClient()
+        self.model = model
+        self.dimensions = dimensions
+        self.batch_tokens = batch_tokens
+        self.min_batch_tokens = min_batch_tokens
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_inputs = max_batch_inputs
+        self.concurrency = float(concurrency)
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.max_attempts = max_attempts
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self._paused_until = 0.0
+        self._loop = None
+        self._loop_thread = None
+        self._loop_finalizer = None
+        self._loop_lock = threading.Lock()
+
+    # Adaptation
+
+    def _on_success(self, latency):
+        if latency > self.target_latency:
+            self.batch_tokens = max(self.min_batch_tokens, int(self.batch_tokens * 0.75))
+        else:
+            self.batch_tokens = min(self.max_batch_tokens, int(self.batch_tokens * 1.25))
+            # About one more request in flight per round of responses.
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+    def _on_throttle(self, delay):
+        self.throttled += 1
+        self.concurrency = max(1.0, self.concurrency / 2)
+        self.batch_tokens = max(self.min_batch_tokens, self.batch_tokens // 2)
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    def _take(self, pending, token_counts):
+        """Indices for the next batch: as many as fit in ``batch_tokens`` (at least one)."""
+        batch = [pending.popleft()]
+        tokens = token_counts[batch[0]]
+        while pending and len(batch) < self.max_batch_inputs:
+            if tokens + token_counts[pending[0]] > self.batch_tokens:
+                break
+            index = pending.popleft()
+            batch.append(index)
+            tokens += token_counts[index]
+        return batch
+
+    # Requests
+
+    async def _send(self, client, texts, batch):
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+        request = {"model": self.model, "input": [texts[i] for i in batch], "encoding_format": "base64"}
+        if self.dimensions is not None:
+            request["dimensions"] = self.dimensions
+        start = time.perf_counter()
+        try:
+            with telemetry.track_call(self.model, source="openai-embeddings") as call:
+                raw = await client.embeddings.with_raw_response.create(**request)
+                payload = json.loads(raw.content)
+                call.usage((payload.get("usage") or {}).get("prompt_tokens"), None)
+        except RETRYABLE_ERRORS as error:
+            return batch, None, error, time.perf_counter() - start
+        finally:
+            self.requests += 1
+        return batch, payload["data"], None, time.perf_counter() - start
+
+    async def aembed_array(self, texts):
+        """Embeddings of ``texts`` as a ``(len(texts), dimensions)`` float32 matrix."""
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, self.dimensions or 0), dtype=np.float32)
+        # Retries are handled here, so 429s reach the adaptation instead of
+        # being absorbed by the SDK.
+        client = self.client.async_client.with_options(max_retries=0)
+        token_counts = count_tokens_batch(texts, model=self.model)
+        pending = deque(range(len(texts)))
+        retry = deque()
+        attempts = {}
+        matrix = None
+        in_flight = set()
+        try:
+            while pending or retry or in_flight:
+                while (pending or retry) and len(in_flight) < int(self.concurrency):
+                    batch = retry.popleft() if retry else self._take(pending, token_counts)
+                    in_flight.add(asyncio.ensure_future(self._send(client, texts, batch)))
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    batch, data, error, latency = task.result()
+                    if error is not None:
+                        attempt = attempts[batch[0]] = attempts.get(batch[0], 0) + 1
+                        if attempt >= self.max_attempts:
+                            raise error
+                        self.retries += 1
+                        delay = retry_after_seconds(error)
+                        if delay is None:
+                            delay = min(30.0, 0.5 * 2 ** attempt) * (0.5 + random.random())
+                        if isinstance(error, openai.RateLimitError):
+                            self._on_throttle(delay)
+                        else:
+                            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                        retry.append(batch)
+                        continue
+                    self._on_success(latency)
+                    for item in data:
+                        vector = np.frombuffer(base64.b64decode(item["embedding"]), dtype=np.float32)
+                        if matrix is None:
+                            matrix = np.empty((len(texts), len(vector)), dtype=np.float32)
+                        matrix[batch[item["index"]]] = vector
+        finally:
+            for task in in_flight:
+                task.cancel()
+        return matrix
+
+    def _background_loop(self):
+        """The executor's event loop, running on its own daemon thread until :meth:`close`."""
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="embedding-executor", daemon=True)
+                thread.start()
+                # Stop the thread if the executor is dropped without close().
+                self._loop_finalizer = weakref.finalize(self, loop.call_soon_threadsafe, loop.stop)
+                self._loop, self._loop_thread = loop, thread
+            return self._loop
+
+    async def _in_context(self, context, texts):
+        # Tasks on the background loop start from that thread's context; carry
+        # over the caller's variables (the telemetry stage) instead.
+        for variable, value in context.items():
+            variable.set(value)
+        return await self.aembed_array(texts)
+
+    def embed_array(self, texts):
+        """Blocking :meth:`aembed_array`; safe to call inside a running event loop (Jupyter)."""
+        coroutine = self._in_context(contextvars.copy_context(), texts)
+        return asyncio.run_coroutine_threadsafe(coroutine, self._background_loop()).result()
+
+    def close(self):
+        """Stop the background loop, closing the client if the executor created it; a later call starts them again."""
+        with self._loop_lock:
+            loop, thread, self._loop, self._loop_thread = self._loop, self._loop_thread, None, None
+        if loop is None:
+            return
+        self._loop_finalizer.detach()
+        try:
+            if self._owns_client:
+                asyncio.run_coroutine_threadsafe(self.client.aclose(), loop).result()
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    # LangChain Embeddings interface
+
+    def embed_documents(self, texts):
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text):
+        return self.embed_array([text])[0].tolist()
+
+    async def aembed_documents(self, texts):
+        return (await self.aembed_array(texts)).tolist()
+
+    async def aembed_query(self, text):
+        return (await self.aembed_array([text]))[0].tolist()
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "batch_tokens": self.batch_tokens,
+            "concurrency": int(self.concurrency),
+        }
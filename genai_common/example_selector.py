@@ -0,0 +1,112 @@
+"""Few-shot example selectors over one NumPy matrix, with embeddings kept on disk.
+
+The example selector notebooks build
+``SemanticSimilarityExampleSelector.from_examples(examples, OpenAIEmbeddings(), Chroma, k=1)``.
+Every start-up embeds all the examples again, and a whole vector store is
+set up for a handful of them. :class:`NumpyExampleSelector` and
+:class:`NumpyMMRExampleSelector` take the same arguments, minus the store
+class::
+
+    example_selector = NumpyExampleSelector.from_examples(examples, OpenAIEmbeddings(), k=1)
+    similar_prompt = FewShotPromptTemplate(example_selector=example_selector, ...)
+
+* example embeddings go through
+  :class:`~genai_common.embedding_cache.CachedEmbeddings` (unless
+  ``cache_dir=None``), so each example is embedded once, ever. Later starts
+  read the vectors from disk;
+* the vectors sit in a :class:`~genai_common.vector_index.FlatIndex`.
+  ``select_examples`` embeds the input and scores every example with one
+  matrix-vector product, and the MMR selector re-ranks the best ``fetch_k``
+  with :func:`~genai_common.vector_index.maximal_marginal_relevance`;
+* ``add_example`` appends one row; the matrix grows geometrically and is
+  never rebuilt.
+
+Examples are embedded as in LangChain: the values of ``input_keys`` (or of
+every key), ordered by key name and joined by spaces.
+"""
+
+from .embedding_cache import DEFAULT_CACHE_DIR, CachedEmbeddings
+from .vector_index import FlatIndex, maximal_marginal_relevance
+
+try:
+    from langchain_core.example_selectors import BaseExampleSelector as _SelectorBase
+except ImportError:  # the selectors work without LangChain, as plain objects
+    _SelectorBase = object
+
+
+class NumpyExampleSelector(_SelectorBase):
+    """The ``k`` examples most similar to the input, by cosine similarity.
+
+    ``example_keys`` limits the keys of the returned examples.
+    """
+
+    def __init__(self, embeddings, examples=(), k=4, input_keys=None, example_keys=None, cache_dir=DEFAULT_CACHE_DIR):
+        if cache_dir is not None and not isinstance(embeddings, CachedEmbeddings):
+            embeddings = CachedEmbeddings(embeddings, cache_dir=cache_dir)
+        self.embeddings = embeddings
+        self.k = k
+        self.input_keys = input_keys
+        self.example_keys = example_keys
+        self.examples = []
+        self.index = FlatIndex()
+        self.add_examples(examples)
+
+    @classmethod
+    def from_examples(cls, examples, embeddings, k=4, input_keys=None, *, example_keys=None, **kwargs):
+        return cls(embeddings, examples, k=k, input_keys=input_keys, example_keys=example_keys, **kwargs)
+
+    def _text(self, values):
+        if self.input_keys:
+            values = {key: values[key] for key in self.input_keys}
+        return " ".join(values[key] for key in sorted(values))
+
+    def add_examples(self, examples):
+        """Append ``examples`` with one embedding call; returns their row numbers."""
+        examples = list(examples)
+        if not examples:
+            return []
+        texts = [self._text(example) for example in examples]
+        # CachedEmbeddings and EmbeddingExecutor hand back a float32 matrix directly.
+        embed = getattr(self.embeddings, "embed_array", None) or self.embeddings.embed_documents
+        rows = self.index.add(embed(texts))
+        self.examples.extend(examples)
+        return rows.tolist()
+
+    def add_example(self, example):
+        return self.add_examples([example])[0]
+
+    def select_examples(self, input_variables):
+        return self.select_examples_by_vector(self.embeddings.embed_query(self._text(input_variables)))
+
+    def select_examples_by_vector(self, embedding):
+        """The examples for an already embedded input: no embedding call."""
+        return [self._output(self.examples[row]) for row in self._select_rows(embedding)]
+
+    def _select_rows(self, embedding):
+        _, rows = self.index.search([embedding], self.k)
+        return rows[0][rows[0] >= 0].tolist()
+
+    def _output(self, example):
+        if self.example_keys:
+            return {key: example[key] for key in self.example_keys}
+        return dict(example)
+
+
+class NumpyMMRExampleSelector(NumpyExampleSelector):
+    """``k`` examples picked by maximal marginal relevance among the ``fetch_k`` most similar."""
+
+    def __init__(self, embeddings, examples=(), k=4, input_keys=None, example_keys=None, fetch_k=20, lambda_mult=0.5,
+                 cache_dir=DEFAULT_CACHE_DIR):
+        self.fetch_k = fetch_k
+        self.lambda_mult = lambda_mult
+        super().__init__(embeddings, examples, k, input_keys, example_keys, cache_dir)
+
+    @classmethod
+    def from_examples(cls, examples, embeddings, k=4, input_keys=None, fetch_k=20, example_keys=None, **kwargs):
+        return cls(embeddings, examples, k=k, input_keys=input_keys, example_keys=example_keys, fetch_k=fetch_k, **kwargs)
+
+    def _select_rows(self, embedding):
+        _, rows = self.index.search([embedding], max(self.k, self.fetch_k))
+        rows = rows[0][rows[0] >= 0]
+        picked = maximal_marginal_relevance(embedding, self.index.vectors[rows], self.lambda_mult, self.k)
+        return rows[picked].tolist()
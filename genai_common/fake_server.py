@@ -0,0 +1,360 @@
+"""A tiny OpenAI-compatible HTTP server for local benchmarks.
+
+It answers ``/v1/chat/completions``, ``/v1/completions`` and
+``/v1/embeddings`` (Azure ``/openai/deployments/<name>/...`` paths too) and
+Ollama's ``/api/generate``, ``/api/chat``, ``/api/embeddings`` and
+``/api/embed`` with canned payloads after an optional injected delay,
+streamed word by word when the request asks for ``stream=True``, so the
+course code can be exercised without an API key::
+
+    with FakeOpenAIServer(latency=0.05) as server:
+        client = CompletionClient(base_url=server.base_url, api_key="test")
+        client.generate_many(prompts, concurrency=16)
+
+Run it as ``python -m genai_common.fake_server --latency 0.05`` to serve from
+a separate process, so that its CPU time stays out of client measurements.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _numbered(text, n):
+    # Distinct texts per choice so callers can tell the candidates apart.
+    return [text] if n == 1 else [f"{text} ({i + 1})" for i in range(n)]
+
+
+def _chat_payload(request, text):
+    n = int(request.get("n") or 1)
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "fake-model"),
+        "choices": [
+            {
+                "index": i,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+            for i, content in enumerate(_numbered(text, n))
+        ],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    }
+
+
+def _completion_payload(request, text):
+    n = int(request.get("n") or 1)
+    return {
+        "id": "cmpl-fake",
+        "object": "text_completion",
+        "created": int(time.time()),
+        "model": request.get("model", "fake-model"),
+        "choices": [
+            {"index": i, "text": content, "finish_reason": "stop", "logprobs": None}
+            for i, content in enumerate(_numbered(text, n))
+        ],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    }
+
+
+def _fake_embedding(text, dimensions):
+    # Deterministic unit vector per text, so similarity search gives stable results.
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    rng = random.Random(seed)
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = sum(value * value for value in vector) ** 0.5 or 1.0
+    return [value / norm for value in vector]
+
+
+def _embedding_payload(request, dimensions):
+    inputs = request.get("input") or ""
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    dimensions = int(request.get("dimensions") or dimensions)
+    vectors = [_fake_embedding(str(text), dimensions) for text in inputs]
+    if request.get("encoding_format") == "base64":
+        # Little-endian float32, as the real API sends (and the SDK asks for).
+        vectors = [base64.b64encode(struct.pack(f"<{dimensions}f", *vector)).decode("ascii") for vector in vectors]
+    return {
+        "object": "list",
+        "data": [{"object": "embedding", "index": i, "embedding": vector} for i, vector in enumerate(vectors)],
+        "model": request.get("model", "fake-embedding"),
+        "usage": {"prompt_tokens": 8 * len(inputs), "total_tokens": 8 * len(inputs)},
+    }
+
+
+def _ollama_payload(request, text, path, dimensions):
+    model = request.get("model", "llama3")
+    if path == "/api/embeddings":
+        return {"embedding": _fake_embedding(str(request.get("prompt", "")), dimensions)}
+    if path == "/api/embed":
+        inputs = request.get("input") or ""
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        return {"model": model, "embeddings": [_fake_embedding(str(item), dimensions) for item in inputs]}
+    payload = {
+        "model": model,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "done": True,
+        "done_reason": "stop",
+        "prompt_eval_count": 10,
+        "eval_count": 5,
+    }
+    if path == "/api/chat":
+        payload["message"] = {"role": "assistant", "content": text}
+    else:
+        payload["response"] = text
+    return payload
+
+
+def _chunk_payload(request, index, word, is_chat):
+    piece = word if index == 0 else " " + word
+    if is_chat:
+        choice = {"index": 0, "delta": {"content": piece}, "finish_reason": None}
+        kind = "chat.completion.chunk"
+    else:
+        choice = {"index": 0, "text": piece, "finish_reason": None, "logprobs": None}
+        kind = "text_completion"
+    return {
+        "id": "chatcmpl-fake" if is_chat else "cmpl-fake",
+        "object": kind,
+        "created": int(time.time()),
+        "model": request.get("model", "fake-model"),
+        "choices": [choice],
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between requests.
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this Nagle's algorithm
+    # adds ~40 ms to every response and swamps the injected latency.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        raw = data.encode("utf-8")
+        self.wfile.write(f"{len(raw):X}\r\n".encode("ascii") + raw + b"\r\n")
+        self.wfile.flush()
+
+    def _send_stream(self, request, text, is_chat):
+        # Server-sent events, one word per event, like the real streaming API.
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for index, word in enumerate(text.split(" ")):
+            if index and self.server.token_latency:
+                time.sleep(self.server.token_latency)
+            self._write_chunk(f"data: {json.dumps(_chunk_payload(request, index, word, is_chat))}\n\n")
+        if (request.get("stream_options") or {}).get("include_usage"):
+            usage = {**_chunk_payload(request, 0, "", is_chat), "choices": []}
+            usage["usage"] = {"prompt_tokens": 10, "completion_tokens": index + 1, "total_tokens": index + 11}
+            self._write_chunk(f"data: {json.dumps(usage)}\n\n")
+        self._write_chunk("data: [DONE]\n\n")
+        self._write_chunk("")
+
+    def _send_ollama_stream(self, request, text, path):
+        # Ollama streams newline-delimited JSON, ending with a "done" object.
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        model = request.get("model", "llama3")
+        for index, word in enumerate(text.split(" ")):
+            if index and self.server.token_latency:
+                time.sleep(self.server.token_latency)
+            piece = word if index == 0 else " " + word
+            if path == "/api/chat":
+                chunk = {"model": model, "message": {"role": "assistant", "content": piece}, "done": False}
+            else:
+                chunk = {"model": model, "response": piece, "done": False}
+            self._write_chunk(json.dumps(chunk) + "\n")
+        final = _ollama_payload(request, "", path, self.server.embedding_dimensions)
+        self._write_chunk(json.dumps(final) + "\n")
+        self._write_chunk("")
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        with server.lock:
+            server.request_count += 1
+            count = server.request_count
+            server.path_counts[self.path] = server.path_counts.get(self.path, 0) + 1
+        if server.rate_limit_every and count % server.rate_limit_every == 0:
+            with server.lock:
+                server.rate_limited_count += 1
+            self._send_json(
+                429,
+                {"error": {"code": "429", "message": "Requests have exceeded the rate limit. Retry later."}},
+                {"Retry-After": f"{server.retry_after:g}"},
+            )
+            return
+        if server.reject_n and int(request.get("n") or 1) > 1:
+            self._send_json(400, {"error": {"message": "n > 1 is not supported", "param": "n"}})
+            return
+        if server.latency:
+            time.sleep(server.latency)
+
+        path = self.path.split("?", 1)[0]
+        if path.startswith("/api/"):
+            if path not in ("/api/generate", "/api/chat", "/api/embeddings", "/api/embed"):
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+            elif request.get("stream", True) and path in ("/api/generate", "/api/chat"):
+                # Ollama streams unless told otherwise.
+                self._send_ollama_stream(request, server.response_text, path)
+            else:
+                self._send_json(200, _ollama_payload(request, server.response_text, path, server.embedding_dimensions))
+        elif path.endswith("/embeddings"):
+            self._send_json(200, _embedding_payload(request, server.embedding_dimensions))
+        elif path.endswith("/completions") and request.get("stream"):
+            self._send_stream(request, server.response_text, path.endswith("/chat/completions"))
+        elif path.endswith("/chat/completions"):
+            self._send_json(200, _chat_payload(request, server.response_text))
+        elif path.endswith("/completions"):
+            self._send_json(200, _completion_payload(request, server.response_text))
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+
+class FakeOpenAIServer:
+    """Run the fake server on a background thread.
+
+    ``latency`` (seconds) is added to every request before it is answered
+    and ``token_latency`` between the words of a streamed response.
+    With ``reject_n`` set, requests asking for ``n > 1`` get a 400, like
+    deployments that only return one choice. With ``rate_limit_every=N``
+    every N-th request is answered with a 429 and a ``Retry-After`` header of
+    ``retry_after`` seconds, like an Azure deployment over its quota.
+    Embeddings have ``embedding_dimensions`` dimensions unless the request
+    asks for ``dimensions``.
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        latency=0.0,
+        token_latency=0.0,
+        response_text="This is a fake response from the local test server.",
+        reject_n=False,
+        rate_limit_every=0,
+        retry_after=1,
+        embedding_dimensions=1536,
+    ):
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.latency = latency
+        self._httpd.token_latency = token_latency
+        self._httpd.response_text = response_text
+        self._httpd.reject_n = reject_n
+        self._httpd.rate_limit_every = rate_limit_every
+        self._httpd.retry_after = retry_after
+        self._httpd.embedding_dimensions = embedding_dimensions
+        self._httpd.request_count = 0
+        self._httpd.rate_limited_count = 0
+        self._httpd.path_counts = {}
+        self._httpd.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def endpoint(self):
+        """Root URL, for clients (like ``AzureOpenAI``) that build their own paths."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def request_count(self):
+        return self._httpd.request_count
+
+    @property
+    def rate_limited_count(self):
+        return self._httpd.rate_limited_count
+
+    @property
+    def path_counts(self):
+        """Requests received per URL path (e.g. per Azure deployment)."""
+        with self._httpd.lock:
+            return dict(self._httpd.path_counts)
+
+    def set(self, **options):
+        """Change server behaviour (``latency``, ``reject_n``, ...) while running."""
+        for key, value in options.items():
+            setattr(self._httpd, key, value)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the fake OpenAI/Ollama API until interrupted.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="0 picks a free port")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    parser.add_argument("--retry-after", type=float, default=1)
+    parser.add_argument("--embedding-dimensions", type=int, default=1536)
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        token_latency=args.token_latency,
+        rate_limit_every=args.rate_limit_every,
+        retry_after=args.retry_after,
+        embedding_dimensions=args.embedding_dimensions,
+    )
+    # The first line tells a parent process where to connect.
+    print(server.endpoint, flush=True)
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Hybrid keyword + vector retrieval: BM25 over a NumPy inverted index, fused with cosine similarity.
+
+The LanceDB notebook gets hybrid search by building a full-text index
+inside LanceDB and reranking every query with ``LinearCombinationReranker``.
+:class:`HybridVectorStore` does the same in process over the chunks already
+held by a :class:`~genai_common.vector_index.NumpyVectorStore`:
+
+* :class:`BM25Index` keeps the postings of all terms in flat arrays (``rows``
+  and precomputed per-posting BM25 weights, sliced by ``offsets``), so a
+  query adds one ``idf * weights`` slice per term into a dense score vector.
+* The best ``fetch_k`` rows by BM25 and by cosine similarity are fused by a
+  weighted sum (``fusion="weighted"``, as LanceDB's reranker does) or by
+  reciprocal rank fusion (``fusion="rrf"``).
+* Short keyword queries, such as "Ketanji Brown Jackson", are answered from
+  BM25 alone when every term is rare and one chunk contains them all, so the
+  query is never embedded. Questions such as "what is inflation" contain a
+  common word and are always fused.
+
+Text searches on the store, and so ``as_retriever()``, are hybrid::
+
+    db = HybridVectorStore.from_documents(texts, embeddings, weight=0.3)
+    retriever = db.as_retriever(search_kwargs={"k": 4})
+"""
+
+import re
+from collections import Counter
+
+import numpy as np
+
+from .vector_index import NumpyVectorStore, normalize, top_k
+
+TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index held in flat NumPy arrays.
+
+    The postings of term id ``t`` are ``rows[offsets[t]:offsets[t + 1]]``,
+    in row order. ``weights`` holds, at the same positions, each posting's
+    term-frequency and length-normalisation factor, so scoring a term is
+    one multiply-add of ``idf[t] * weights`` into the score vector. Added
+    texts are merged into the arrays on the next search, so indexing
+    through many small ``add`` calls does not re-sort the postings each time.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.rows = np.zeros(0, dtype=np.int32)
+        self.counts = np.zeros(0, dtype=np.float32)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self.idf = np.zeros(0, dtype=np.float32)
+        self.lengths = np.zeros(0, dtype=np.float32)
+        # Postings of texts added since the last merge: term ids, rows, counts and text lengths.
+        self._pending = ([], [], [], [])
+
+    def __len__(self):
+        return len(self.lengths) + len(self._pending[3])
+
+    def add(self, texts):
+        """Index ``texts`` as the next rows; returns their row numbers."""
+        start = len(self)
+        terms, rows, counts, lengths = self._pending
+        for row, text in enumerate(texts, start):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for term, count in Counter(tokens).items():
+                terms.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                rows.append(row)
+                counts.append(count)
+        return np.arange(start, len(self))
+
+    def _merge(self):
+        """Fold the pending postings into the term-ordered arrays and recompute the weights."""
+        terms, rows, counts, lengths = self._pending
+        if not lengths:
+            return
+        self._pending = ([], [], [], [])
+        # Merge the new postings into the term-ordered arrays; a stable sort keeps each term's rows ascending.
+        old_terms = np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+        all_terms = np.concatenate([old_terms, np.asarray(terms, dtype=np.int64)])
+        order = np.argsort(all_terms, kind="stable")
+        self.rows = np.concatenate([self.rows, np.asarray(rows, dtype=np.int32)])[order]
+        self.counts = np.concatenate([self.counts, np.asarray(counts, dtype=np.float32)])[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(all_terms, minlength=len(self.vocabulary)))])
+        self.lengths = np.concatenate([self.lengths, np.asarray(lengths, dtype=np.float32)])
+        self._reweight()
+
+    def _reweight(self):
+        # The IDFs and the average length change with every merge, so all weights are recomputed.
+        documents = np.diff(self.offsets)
+        self.idf = np.log1p((len(self) - documents + 0.5) / (documents + 0.5)).astype(np.float32)
+        average = max(float(self.lengths.mean()), 1.0) if len(self) else 1.0
+        norm = self.k1 * (1 - self.b + self.b * self.lengths / average)
+        self.weights = (self.counts * (self.k1 + 1) / (self.counts + norm[self.rows])).astype(np.float32)
+
+    def term_idf(self, term):
+        """The IDF of ``term``, 0 if no row contains it."""
+        self._merge()
+        t = self.vocabulary.get(term)
+        return 0.0 if t is None or t >= len(self.idf) else float(self.idf[t])
+
+    def scores(self, query):
+        """``(scores, matched)``: every row's BM25 score for ``query``, and how many distinct query terms it contains."""
+        self._merge()
+        scores = np.zeros(len(self), dtype=np.float32)
+        matched = np.zeros(len(self), dtype=np.int32)
+        for term in dict.fromkeys(tokenize(query)):
+            t = self.vocabulary.get(term)
+            if t is None:
+                continue
+            postings = slice(self.offsets[t], self.offsets[t + 1])
+            rows = self.rows[postings]
+            scores[rows] += self.idf[t] * self.weights[postings]
+            matched[rows] += 1
+        return scores, matched
+
+    def search(self, query, k, mask=None):
+        """``(scores, rows)`` of the ``k`` best rows that contain a query term, as :func:`top_k` returns them."""
+        scores, matched = self.scores(query)
+        keep = matched > 0 if mask is None else (matched > 0) & mask
+        scores, rows = top_k(np.where(keep, scores, -np.inf)[None, :], k)
+        return scores[0], rows[0]
+
+
+class HybridVectorStore(NumpyVectorStore):
+    """:class:`NumpyVectorStore` whose text queries fuse BM25 keyword scores with cosine similarity.
+
+    With ``fusion="weighted"`` a row scores ``weight * cosine + (1 - weight) * bm25 / best_bm25``,
+    like LanceDB's ``LinearCombinationReranker(weight)``; with ``fusion="rrf"`` it scores
+    ``1 / (rrf_k + rank)`` summed over the two rankings. Either way the candidates are
+    the best ``fetch_k`` rows of each ranking. Searches by vector are vector-only.
+
+    A keyword query is ranked by BM25 alone, without embedding it: at most
+    ``keyword_terms`` terms, each with an IDF of at least ``keyword_idf`` (1.5
+    is a term in fewer than about a fifth of the rows), all found in one row.
+    ``keyword_terms=0`` always embeds, and ``keyword=True``/``False`` on a
+    search forces either path. Keyword-only hits are scored as the keyword part
+    of the fused score, ``(1 - weight) * bm25 / best_bm25`` or ``1 / (rrf_k + rank)``,
+    so a score threshold means the same on both paths.
+    """
+
+    def __init__(self, embedding, index=None, fusion="weighted", weight=0.7, fetch_k=50, rrf_k=60, keyword_terms=4,
+                 keyword_idf=1.5, k1=1.5, b=0.75):
+        if fusion not in ("weighted", "rrf"):
+            raise ValueError(f"Unknown fusion {fusion!r}; expected 'weighted' or 'rrf'.")
+        super().__init__(embedding, index=index)
+        self.fusion = fusion
+        self.weight = weight
+        self.fetch_k = fetch_k
+        self.rrf_k = rrf_k
+        self.keyword_terms = keyword_terms
+        self.keyword_idf = keyword_idf
+        self.bm25 = BM25Index(k1, b)
+
+    def add_embeddings(self, texts, embeddings, metadatas=None, ids=None):
+        texts = list(texts)
+        ids = super().add_embeddings(texts, embeddings, metadatas, ids)
+        if texts:
+            self.bm25.add(texts)
+        return ids
+
+    def is_keyword_query(self, query, matched):
+        """Whether ``query`` is a few rare terms that one row contains all of (``matched`` as from :meth:`BM25Index.scores`)."""
+        terms = set(tokenize(query))
+        if not 0 < len(terms) <= self.keyword_terms or matched.max() != len(terms):
+            return False
+        return all(self.bm25.term_idf(term) >= self.keyword_idf for term in terms)
+
+    def hybrid_search_with_score(self, query, k=4, fusion=None, weight=None, fetch_k=None, keyword=None, **kwargs):
+        """``[(Document, score), ...]``: the ``k`` best rows for ``query`` by fused keyword and vector score."""
+        if not len(self):
+            return []
+        fusion = fusion or self.fusion
+        weight = self.weight if weight is None else weight
+        fetch_k = max(k, fetch_k or self.fetch_k)
+        bm25, matched = self.bm25.scores(query)
+        matched[~self._live] = 0
+        best = float(bm25[matched > 0].max()) if matched.any() else 0.0
+        if keyword is None:
+            keyword = self.is_keyword_query(query, matched)
+        if keyword:
+            scores, rows = top_k(np.where(matched > 0, bm25, -np.inf)[None, :], k)
+            keep = rows[0] >= 0
+            if fusion == "rrf":
+                scores = 1 / (self.rrf_k + np.arange(1, keep.sum() + 1, dtype=np.float32))[None, :]
+            else:
+                scores = (1 - weight) * scores[:, keep] / best
+            return self._with_scores(scores, rows[:, keep])[0]
+
+        embedding = normalize(self.embedding.embed_query(query))[0]
+        _, vector_rows = self.search_vectors([embedding], fetch_k)
+        vector_rows = vector_rows[0][vector_rows[0] >= 0]
+        _, keyword_rows = top_k(np.where(matched > 0, bm25, -np.inf)[None, :], fetch_k)
+        keyword_rows = keyword_rows[0][keyword_rows[0] >= 0]
+        if fusion == "rrf":
+            fused = np.zeros(len(self.texts), dtype=np.float32)
+            fused[vector_rows] += 1 / (self.rrf_k + np.arange(1, len(vector_rows) + 1))
+            fused[keyword_rows] += 1 / (self.rrf_k + np.arange(1, len(keyword_rows) + 1))
+            candidates = np.union1d(vector_rows, keyword_rows)
+            fused = fused[candidates]
+        else:
+            # Rows from either list get both scores, the cosine computed exactly even under IVF-PQ.
+            candidates = np.union1d(vector_rows, keyword_rows)
+            cosine = self.index.vectors[candidates] @ embedding
+            keyword = bm25[candidates] / best if best > 0 else 0.0
+            fused = weight * cosine + (1 - weight) * keyword
+        scores, columns = top_k(fused[None, :], k)
+        keep = columns[0] >= 0
+        return self._with_scores(scores[:, keep], candidates[columns[:, keep]])[0]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.hybrid_search_with_score(query, k, **kwargs)
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.hybrid_search_with_score(query, k, **kwargs)]
+
+    def similarity_search_with_relevance_scores(self, query, k=4, score_threshold=None, **kwargs):
+        hits = self.hybrid_search_with_score(query, k, **kwargs)
+        return hits if score_threshold is None else [(doc, score) for doc, score in hits if score >= score_threshold]
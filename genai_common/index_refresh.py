@@ -0,0 +1,201 @@
+"""Incremental refresh of a LlamaIndex index from a folder of files.
+
+The starter notebook either rebuilds the whole index from ``data/`` or
+loads the stored one and ignores what changed in ``data/`` since.
+:func:`refresh_index` keeps a fingerprint of every source file (modification
+time, size and SHA-256) in ``<persist_dir>/source_fingerprints.json``. Each
+run only reads, splits and embeds the files that were added or whose
+content changed, and deletes the nodes of files that were changed or
+removed. The index lives in a :class:`~genai_common.mmap_vector_store.MmapVectorStore`,
+which persists only the rows added and deleted since the last run::
+
+    index, changes = refresh_index("./storage", "data")
+    print(changes)  # {'added': ['new.txt'], 'changed': [], 'removed': [], 'unchanged': 41, 'nodes': 12}
+
+Files whose modification time and size are unchanged are not read at all;
+a file that was only touched is hashed, found unchanged, and skipped.
+"""
+
+import hashlib
+import json
+import os
+
+from llama_index.core import Settings, SimpleDirectoryReader, StorageContext, VectorStoreIndex
+from llama_index.core.ingestion import run_transformations
+
+from .mmap_vector_store import MmapVectorStore, load_index
+
+FINGERPRINTS_NAME = "source_fingerprints.json"
+
+
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def text_digest(text):
+    return hashlib.sha256(text.strip().encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _source_text(nodes):
+    """The text ``nodes`` were split from, rebuilt from their character spans; ``None`` if they leave gaps."""
+    text, offset = "", None
+    for node in sorted(nodes, key=lambda node: (node.start_char_idx or 0, node.end_char_idx or 0)):
+        start, content = node.start_char_idx, node.get_content()
+        if start is None or node.end_char_idx - start != len(content):
+            return None
+        if offset is None:
+            offset = start
+        start -= offset
+        if start > len(text):
+            return None
+        overlap = min(len(text) - start, len(content))
+        if text[start:start + overlap] != content[:overlap]:
+            return None
+        text += content[overlap:]
+    return text
+
+
+def _stored_documents(index):
+    """``({text digest: doc id}, every doc id)`` for the documents an index was built from.
+
+    ``Document.hash`` covers metadata such as the file path and dates, so it
+    differs after a clone; the text itself is rebuilt from the stored nodes.
+    """
+    if index.vector_store.stores_text:
+        nodes = index.vector_store.get_nodes()
+    else:
+        nodes = index.docstore.get_nodes(list(index.index_struct.nodes_dict.values()))
+    by_document = {}
+    for node in nodes:
+        if node.ref_doc_id is not None:
+            by_document.setdefault(node.ref_doc_id, []).append(node)
+    digests = {}
+    for doc_id, document_nodes in by_document.items():
+        text = _source_text(document_nodes)
+        if text is not None:
+            digests[text_digest(text)] = doc_id
+    return digests, set(by_document) | set(index.docstore.get_all_document_hashes().values())
+
+
+def list_files(input_dir, recursive=False, required_exts=None):
+    """Paths under ``input_dir`` (relative, ``/``-separated) that ``SimpleDirectoryReader`` would read."""
+    paths = []
+    for root, dirs, files in os.walk(input_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".")) if recursive else []
+        for name in files:
+            if name.startswith(".") or (required_exts and os.path.splitext(name)[1] not in required_exts):
+                continue
+            paths.append(os.path.relpath(os.path.join(root, name), input_dir).replace(os.sep, "/"))
+    return sorted(paths)
+
+
+def load_fingerprints(persist_dir):
+    """``{relative path: fingerprint}`` from the last refresh, or ``None`` if there was none."""
+    try:
+        with open(os.path.join(persist_dir, FINGERPRINTS_NAME), encoding="utf-8") as f:
+            return json.load(f)["files"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_fingerprints(persist_dir, fingerprints):
+    path = os.path.join(persist_dir, FINGERPRINTS_NAME)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump({"files": fingerprints}, f, indent=1, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def scan(input_dir, previous, recursive=False, required_exts=None):
+    """``(fingerprints, added, changed)`` for the files in ``input_dir``.
+
+    Files with the modification time and size recorded in ``previous`` keep
+    their fingerprint without being read. The new fingerprints of added and
+    changed files have no ``doc_ids`` yet.
+    """
+    fingerprints, added, changed = {}, [], []
+    for rel in list_files(input_dir, recursive, required_exts):
+        stat = os.stat(os.path.join(input_dir, rel))
+        old = previous.get(rel)
+        if old is not None and old["mtime_ns"] == stat.st_mtime_ns and old["size"] == stat.st_size:
+            fingerprints[rel] = old
+            continue
+        digest = file_digest(os.path.join(input_dir, rel))
+        unchanged = old is not None and old["sha256"] == digest
+        fingerprints[rel] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": digest,
+            "doc_ids": old["doc_ids"] if unchanged else [],
+        }
+        if not unchanged:
+            (changed if old is not None else added).append(rel)
+    return fingerprints, added, changed
+
+
+def refresh_index(persist_dir, input_dir="data", recursive=False, required_exts=None, file_extractor=None,
+                  show_progress=False, **index_kwargs):
+    """Bring the index in ``persist_dir`` up to date with ``input_dir``; returns ``(index, changes)``.
+
+    ``persist_dir`` may hold nothing yet (the index is built), an index
+    persisted by :mod:`genai_common.mmap_vector_store`, or one persisted with
+    the default JSON stores (converted first). On the first refresh of an
+    index that was built some other way, documents whose text matches a
+    file's are kept (without embedding them again) and every other document
+    is deleted. ``index_kwargs``
+    (``embed_model``, ``transformations``, ...) go to the index.
+    """
+    index = load_index(persist_dir, **index_kwargs)
+    if index is None:
+        storage_context = StorageContext.from_defaults(vector_store=MmapVectorStore())
+        index = VectorStoreIndex([], storage_context=storage_context, **index_kwargs)
+    previous = load_fingerprints(persist_dir)
+    fingerprints, added, changed = scan(input_dir, previous or {}, recursive, required_exts)
+    removed = sorted(set(previous or {}) - set(fingerprints))
+    stale = [doc_id for rel in changed + removed for doc_id in previous[rel]["doc_ids"]]
+
+    existing, foreign = _stored_documents(index) if previous is None else ({}, set())
+    documents = []
+    for rel in added + changed:
+        reader = SimpleDirectoryReader(
+            input_files=[os.path.join(input_dir, rel)], filename_as_id=True, file_extractor=file_extractor
+        )
+        for document in reader.load_data():
+            doc_id = existing.get(text_digest(document.text))
+            if doc_id is None:
+                doc_id = document.id_
+                documents.append(document)
+            fingerprints[rel]["doc_ids"].append(doc_id)
+    if previous is None:
+        kept = {doc_id for fingerprint in fingerprints.values() for doc_id in fingerprint["doc_ids"]}
+        stale = sorted(foreign - kept)
+    # Also documents stored by a run that failed before saving its fingerprints.
+    stale += [d.id_ for d in documents if index.docstore.get_document_hash(d.id_) is not None]
+
+    changes = {
+        "added": added,
+        "changed": changed,
+        "removed": removed,
+        "unchanged": len(fingerprints) - len(added) - len(changed),
+        "nodes": 0,
+    }
+    if fingerprints == previous:
+        return index, changes
+    # Old nodes go first: a changed file's documents come back under the same ids.
+    for doc_id in dict.fromkeys(stale):
+        index.delete_ref_doc(doc_id)
+        index.docstore.delete_document(doc_id, raise_error=False)
+    if documents:
+        transformations = index_kwargs.get("transformations") or Settings.transformations
+        nodes = run_transformations(documents, transformations, show_progress=show_progress)
+        index.insert_nodes(nodes)
+        for document in documents:
+            index.docstore.set_document_hash(document.id_, document.hash)
+        changes["nodes"] = len(nodes)
+    index.storage_context.persist(persist_dir=persist_dir)
+    # Written last: if anything above fails, the next run redoes this one.
+    save_fingerprints(persist_dir, fingerprints)
+    return index, changes
@@ -0,0 +1,357 @@
+"""LangChain LLM cache: an in-memory LRU over a WAL-mode SQLite file.
+
+``SQLiteCache(database_path=".langchain.db")`` from the chat model caching
+notebook opens a SQLAlchemy session per lookup on a rollback-journal
+database, keeps every entry forever, and lets one writer lock out every
+reader. :class:`SQLiteLLMCache` is a ``set_llm_cache`` backend for many
+threads (Streamlit sessions) or processes sharing one file:
+
+* the last ``max_entries`` responses are answered from memory, as the
+  ``Generation`` objects themselves;
+* the database runs in WAL mode, so reads never wait for the writer, and
+  each thread borrows a connection from a pool of ``pool_size``;
+* new entries, and the access times of disk hits, are queued and written
+  ``batch_size`` at a time (or once ``flush_interval`` seconds have passed)
+  in one transaction;
+* entries expire after ``ttl`` seconds, and the file is kept under
+  ``max_disk_bytes`` by deleting the least recently used entries;
+* ``alookup`` answers memory hits on the event loop and sends only disk
+  reads to a worker thread.
+
+::
+
+    from langchain_core.globals import set_llm_cache
+    from genai_common.llm_cache import SQLiteLLMCache
+
+    set_llm_cache(SQLiteLLMCache(".langchain-cache.db"))
+"""
+
+import asyncio
+import atexit
+import functools
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .cache import request_key
+
+try:
+    from langchain_core.caches import BaseCache as _CacheBase
+    from langchain_core.load import dumps, loads
+except ImportError:  # the cache works without LangChain, for JSON values
+    from json import dumps, loads
+
+    _CacheBase = object
+
+DEFAULT_DATABASE = os.path.join(os.path.expanduser("~"), ".cache", "genai-course", "llm-cache.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key BLOB PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at, size);
+-- Total of the size column, kept by triggers so no one scans the table for it.
+CREATE TABLE IF NOT EXISTS llm_cache_size (bytes INTEGER NOT NULL);
+INSERT INTO llm_cache_size SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM llm_cache_size);
+CREATE TRIGGER IF NOT EXISTS llm_cache_insert AFTER INSERT ON llm_cache
+BEGIN UPDATE llm_cache_size SET bytes = bytes + new.size; END;
+CREATE TRIGGER IF NOT EXISTS llm_cache_update AFTER UPDATE OF size ON llm_cache
+BEGIN UPDATE llm_cache_size SET bytes = bytes + new.size - old.size; END;
+CREATE TRIGGER IF NOT EXISTS llm_cache_delete AFTER DELETE ON llm_cache
+BEGIN UPDATE llm_cache_size SET bytes = bytes - old.size; END;
+"""
+
+UPSERT = """
+INSERT INTO llm_cache VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    value = excluded.value, expires_at = excluded.expires_at, accessed_at = excluded.accessed_at, size = excluded.size
+"""
+
+
+class SQLiteLLMCache(_CacheBase):
+    """Two-tier LangChain cache with per-entry TTL, a disk size bound and hit/miss counters.
+
+    ``ttl`` is the lifetime of an entry in seconds (``None`` keeps entries
+    until they are evicted). Queued writes are flushed when the queue is
+    full or old enough, by :meth:`flush`, and at interpreter exit.
+    """
+
+    def __init__(
+        self,
+        database_path=DEFAULT_DATABASE,
+        max_entries=1024,
+        max_disk_bytes=256 * 1024 * 1024,
+        ttl=7 * 24 * 3600,
+        pool_size=4,
+        batch_size=64,
+        flush_interval=1.0,
+        timeout=30.0,
+    ):
+        self.database_path = database_path
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self._memory = OrderedDict()
+        # key -> (serialized value, expires_at) not yet written, and key -> time of a disk hit.
+        self._pending = {}
+        self._touched = {}
+        self._queued_at = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pool = queue.LifoQueue()
+        self._connections = 0
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.write_errors = 0
+        os.makedirs(os.path.dirname(os.path.abspath(database_path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+        atexit.register(self.close)
+
+    # Connections
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database_path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Borrow a pooled connection, opening one if fewer than ``pool_size`` exist."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._connections < self.pool_size
+                self._connections += create
+            if create:
+                try:
+                    conn = self._connect()
+                except BaseException:
+                    with self._lock:
+                        self._connections -= 1
+                    raise
+            else:
+                conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self):
+        """Flush queued writes and close the pooled connections (new ones open on demand)."""
+        self.flush()
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._connections -= 1
+
+    # Lookups
+
+    def lookup(self, prompt, llm_string):
+        key = request_key({"llm": llm_string, "prompt": prompt})
+        found, value = self._lookup_memory(key)
+        return value if found else self._lookup_disk(key)
+
+    async def alookup(self, prompt, llm_string):
+        key = request_key({"llm": llm_string, "prompt": prompt})
+        found, value = self._lookup_memory(key)
+        if found:
+            return value
+        return await asyncio.get_running_loop().run_in_executor(None, self._lookup_disk, key)
+
+    def _lookup_memory(self, key):
+        """``(found, value)`` from the memory tier."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return False, None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= now:
+                del self._memory[key]
+                return False, None
+            self._memory.move_to_end(key)
+            self.hits += 1
+            self.memory_hits += 1
+            return True, value
+
+    def _lookup_disk(self, key):
+        """The value from the write queue or the database, or ``None``."""
+        now = time.time()
+        with self._lock:
+            row = self._pending.get(key)
+        if row is None:
+            with self._connection() as conn:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ?", (bytes.fromhex(key),)
+                ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            with self._lock:
+                self.misses += 1
+            return None
+        value = loads(row[0])
+        with self._lock:
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, value, row[1])
+            self._touched[key] = now
+            due = self._flush_due(now)
+        if due:
+            self.flush()
+        return value
+
+    # Updates
+
+    def update(self, prompt, llm_string, return_val):
+        if self._queue(request_key({"llm": llm_string, "prompt": prompt}), return_val):
+            self.flush()
+
+    async def aupdate(self, prompt, llm_string, return_val):
+        if self._queue(request_key({"llm": llm_string, "prompt": prompt}), return_val):
+            await asyncio.get_running_loop().run_in_executor(None, self.flush)
+
+    def _queue(self, key, value):
+        """Remember ``value`` and queue it for the database; returns whether a flush is due."""
+        now = time.time()
+        expires_at = None if self.ttl is None else now + self.ttl
+        # Serialized now: LangChain replaces the message of a cached generation on every hit.
+        data = dumps(value)
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._pending[key] = (data, expires_at)
+            self._touched.pop(key, None)
+            return self._flush_due(now)
+
+    def _flush_due(self, now):
+        # Callers hold the lock.
+        if self._queued_at is None:
+            self._queued_at = now
+        return len(self._pending) + len(self._touched) >= self.batch_size or now - self._queued_at >= self.flush_interval
+
+    def flush(self):
+        """Write the queued entries and access times in one transaction."""
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                touched, self._touched = self._touched, {}
+                self._queued_at = None
+            if not pending and not touched:
+                return
+            now = time.time()
+            rows = [
+                (bytes.fromhex(key), data, expires_at, now, len(data)) for key, (data, expires_at) in pending.items()
+            ]
+            try:
+                with self._connection() as conn:
+                    with self._transaction(conn):
+                        conn.executemany(UPSERT, rows)
+                        conn.executemany(
+                            "UPDATE llm_cache SET accessed_at = ? WHERE key = ?",
+                            [(accessed_at, bytes.fromhex(key)) for key, accessed_at in touched.items()],
+                        )
+                    if self._disk_bytes(conn) > self.max_disk_bytes:
+                        self._evict(conn)
+            except sqlite3.OperationalError:
+                # Another process held the write lock past ``timeout``: keep the
+                # entries queued (newer values win) and retry on the next flush.
+                with self._lock:
+                    self.write_errors += 1
+                    self._pending = {**pending, **self._pending}
+                    self._touched = {**touched, **self._touched}
+                    self._queued_at = now
+
+    @staticmethod
+    @contextmanager
+    def _transaction(conn):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def clear(self, **kwargs):
+        with self._write_lock:
+            with self._lock:
+                self._memory.clear()
+                self._pending.clear()
+                self._touched.clear()
+                self._queued_at = None
+            with self._connection() as conn:
+                conn.execute("DELETE FROM llm_cache")
+
+    async def aclear(self, **kwargs):
+        await asyncio.get_running_loop().run_in_executor(None, functools.partial(self.clear, **kwargs))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "write_errors": self.write_errors,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "queued_writes": len(self._pending),
+        }
+
+    # Memory tier (callers hold the lock)
+
+    def _remember(self, key, value, expires_at):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    # Disk tier (callers hold the write lock)
+
+    @staticmethod
+    def _disk_bytes(conn):
+        return conn.execute("SELECT bytes FROM llm_cache_size").fetchone()[0]
+
+    def _evict(self, conn):
+        # Drop expired entries, then the least recently used until we are 10%
+        # under the limit, so a full cache does not evict on every flush.
+        with self._transaction(conn):
+            evicted = conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+            excess = self._disk_bytes(conn) - self.max_disk_bytes * 0.9
+            if excess > 0:
+                count = 0
+                cursor = conn.execute("SELECT size FROM llm_cache ORDER BY accessed_at")
+                for (size,) in cursor:
+                    count += 1
+                    excess -= size
+                    if excess <= 0:
+                        break
+                cursor.close()
+                evicted += conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                    (count,),
+                ).rowcount
+        with self._lock:
+            self.evictions += evicted
@@ -0,0 +1,272 @@
+"""Trim long chat histories to a token budget without recounting them every turn.
+
+``trim_messages(history, token_counter=ChatOpenAI(model="gpt-4o"), ...)`` in
+the trim_messages notebook counts the whole history again on every call, and
+its binary search recounts each candidate slice, so a chatbot pays for every
+earlier message on every turn. :class:`MessageTrimmer` counts tokens locally
+with tiktoken and remembers:
+
+* the token count of each message, keyed by a hash of its role, name and
+  content, so an unchanged message is never encoded twice;
+* running prefix sums over the history it trimmed last. Chat histories only
+  grow, so when the next call passes the same messages plus new ones, only
+  the new ones are counted, and the cut is found by binary search over the
+  sums.
+
+::
+
+    trimmer = MessageTrimmer(max_tokens=1000, include_system=True, start_on="human")
+    trimmed = trimmer(messages)
+    chain = trimmer | llm
+
+It supports the ``strategy``, ``include_system``, ``start_on`` and
+``allow_partial`` options of ``trim_messages``. Messages are counted as in the
+OpenAI cookbook (see :func:`genai_common.tokens.count_message_tokens`), and
+:meth:`MessageTrimmer.count` of a trimmed list never exceeds ``max_tokens``,
+unless the kept system message alone does. Use one trimmer per conversation:
+a history that does not extend the previous one (another session, a deleted
+message) is summed again, from the cached message counts.
+"""
+
+import hashlib
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from .tokens import TOKENS_PER_MESSAGE, TOKENS_PER_NAME, TOKENS_PER_REPLY, encoding_for_model
+
+# OpenAI role of each LangChain message type; ChatMessage carries its own.
+ROLES = {"human": "user", "ai": "assistant", "system": "system", "tool": "tool", "function": "function"}
+
+
+def default_text_splitter(text):
+    """Split ``text`` into lines, keeping the newlines, as ``trim_messages`` does."""
+    lines = text.split("\n")
+    return [line + "\n" for line in lines[:-1]] + lines[-1:]
+
+
+def is_message_type(message, types):
+    """Whether ``message`` matches a type name (``"human"``), a message class, or a list of either."""
+    if isinstance(types, (str, type)):
+        types = [types]
+    return any(message.type == t if isinstance(t, str) else isinstance(message, t) for t in types)
+
+
+def _block_text(block):
+    if isinstance(block, str):
+        return block
+    if isinstance(block, dict) and block.get("type") == "text":
+        return block.get("text", "")
+    # Images and other blocks are counted as their JSON.
+    return json.dumps(block, sort_keys=True, default=str)
+
+
+class MessageTrimmer:
+    """Keep the last (or first) messages of a history that fit in ``max_tokens``.
+
+    ``model`` picks the tiktoken encoding. ``include_system`` keeps a leading
+    system message, ``start_on`` drops kept messages from the old end until
+    one of that type, and ``allow_partial`` keeps the fitting part of the
+    message at the cut, split by ``text_splitter`` (or, for content blocks,
+    block by block). ``include_system`` and ``start_on`` only apply to
+    ``strategy="last"``. At most ``max_cached_counts`` message counts are
+    remembered, least recently used first out.
+    """
+
+    def __init__(
+        self,
+        max_tokens,
+        strategy="last",
+        model="gpt-4o",
+        include_system=False,
+        start_on=None,
+        allow_partial=False,
+        text_splitter=default_text_splitter,
+        max_cached_counts=65536,
+    ):
+        if strategy not in ("first", "last"):
+            raise ValueError("strategy must be 'first' or 'last'")
+        if strategy == "first" and (include_system or start_on is not None):
+            raise ValueError("include_system and start_on only apply to strategy='last'")
+        self.max_tokens = max_tokens
+        self.strategy = strategy
+        self.model = model
+        self.include_system = include_system
+        self.start_on = start_on
+        self.allow_partial = allow_partial
+        self.text_splitter = text_splitter
+        self.max_cached_counts = max_cached_counts
+        self._encoding = encoding_for_model(model)
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+        # Prefix sums of message counts over the last history, and its first and last message.
+        self._prefix = [0]
+        self._first = self._last = None
+        self.encoded = 0
+        self.cache_hits = 0
+
+    # Counting
+
+    def _parts(self, message, content=None):
+        """``(role, name, text)`` counted for ``message``, optionally with other ``content``."""
+        content = message.content if content is None else content
+        text = content if isinstance(content, str) else "".join(_block_text(block) for block in content)
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            text += json.dumps(tool_calls, sort_keys=True, default=str)
+        role = ROLES.get(message.type) or getattr(message, "role", message.type)
+        return role, message.name or "", text
+
+    def _encode(self, role, name, text):
+        tokens = TOKENS_PER_MESSAGE + len(self._encoding.encode_ordinary(role))
+        tokens += len(self._encoding.encode_ordinary(text))
+        if name:
+            tokens += TOKENS_PER_NAME + len(self._encoding.encode_ordinary(name))
+        return tokens
+
+    def count_message(self, message):
+        """Tokens of one message, from the content-hash cache when it has been seen."""
+        parts = self._parts(message)
+        key = hashlib.blake2b("\0".join(parts).encode("utf-8"), digest_size=16).digest()
+        tokens = self._counts.get(key)
+        if tokens is not None:
+            self._counts.move_to_end(key)
+            self.cache_hits += 1
+            return tokens
+        tokens = self._encode(*parts)
+        self.encoded += 1
+        self._counts[key] = tokens
+        while len(self._counts) > self.max_cached_counts:
+            self._counts.popitem(last=False)
+        return tokens
+
+    def count(self, messages):
+        """Tokens of a message list, including the reply priming."""
+        messages = self._as_list(messages)
+        with self._lock:
+            return TOKENS_PER_REPLY + self._sync(messages)[-1]
+
+    @staticmethod
+    def _as_list(messages):
+        if hasattr(messages, "to_messages"):  # a ChatPromptValue
+            return messages.to_messages()
+        return messages if isinstance(messages, (list, tuple)) else list(messages)
+
+    def _sync(self, messages):
+        """Prefix sums for ``messages``, counting only what was appended since the last call."""
+        # Callers hold the lock.
+        tracked = len(self._prefix) - 1
+        if not (
+            tracked
+            and len(messages) >= tracked
+            and messages[0] is self._first
+            and messages[tracked - 1] is self._last
+        ):
+            self._prefix = [0]
+            tracked = 0
+        for message in messages[tracked:]:
+            self._prefix.append(self._prefix[-1] + self.count_message(message))
+        self._first, self._last = (messages[0], messages[-1]) if messages else (None, None)
+        return self._prefix
+
+    # Trimming
+
+    def __call__(self, messages):
+        return self.trim(messages)
+
+    def trim(self, messages):
+        """The messages to send: a new list, with at most one message shortened."""
+        messages = self._as_list(messages)
+        with self._lock:
+            prefix = self._sync(messages)
+            if self.strategy == "first":
+                return self._trim_first(messages, prefix)
+            return self._trim_last(messages, prefix)
+
+    def _trim_first(self, messages, prefix):
+        budget = self.max_tokens - TOKENS_PER_REPLY
+        end = max(0, bisect_right(prefix, budget) - 1)
+        kept = list(messages[:end])
+        if self.allow_partial and end < len(messages):
+            partial = self._partial(messages[end], budget - prefix[end], keep="first")
+            if partial is not None:
+                kept.append(partial)
+        return kept
+
+    def _trim_last(self, messages, prefix):
+        count = len(messages)
+        budget = self.max_tokens - TOKENS_PER_REPLY
+        system = []
+        low = 0
+        if self.include_system and count and messages[0].type == "system":
+            system = [messages[0]]
+            low = 1
+            budget -= prefix[1]
+        budget = max(budget, 0)
+        # The oldest message kept is the first whose suffix sum fits.
+        start = min(count, bisect_left(prefix, prefix[count] - budget, low, count + 1))
+        head = []
+        if self.allow_partial and start > low:
+            partial = self._partial(messages[start - 1], budget - (prefix[count] - prefix[start]), keep="last")
+            if partial is not None:
+                head = [partial]
+        if self.start_on is not None:
+            if head and not is_message_type(head[0], self.start_on):
+                head = []
+            if not head:
+                while start < count and not is_message_type(messages[start], self.start_on):
+                    start += 1
+        return system + head + list(messages[start:])
+
+    def _partial(self, message, budget, keep):
+        """A copy of ``message`` cut down to ``budget`` tokens from the ``keep`` end, or ``None``."""
+        content = message.content
+        if not isinstance(content, str) and len(content) > 1:
+            blocks = list(content) if keep == "first" else list(reversed(content))
+
+            def kept_blocks(size):
+                return blocks[:size] if keep == "first" else list(reversed(blocks[:size]))
+
+            size = _largest(len(blocks) - 1, lambda size: self._encode(*self._parts(message, kept_blocks(size))) <= budget)
+            if size:
+                return message.model_copy(update={"content": kept_blocks(size)}, deep=True)
+        if isinstance(content, str):
+            text = content
+        else:
+            texts = [block for block in content if isinstance(block, str) or (isinstance(block, dict) and block.get("type") == "text")]
+            # The text block nearest the end being kept.
+            text = _block_text(texts[0 if keep == "first" else -1]) if texts else ""
+        if not text:
+            return None
+        splits = self.text_splitter(text)
+        if keep == "last":
+            splits = splits[::-1]
+
+        def kept_text(size):
+            return "".join(splits[:size] if keep == "first" else reversed(splits[:size]))
+
+        size = _largest(len(splits), lambda size: self._encode(*self._parts(message, kept_text(size))) <= budget)
+        if not size:
+            return None
+        return message.model_copy(update={"content": kept_text(size)}, deep=True)
+
+    def stats(self):
+        return {
+            "encoded": self.encoded,
+            "cache_hits": self.cache_hits,
+            "cached_counts": len(self._counts),
+            "history_length": len(self._prefix) - 1,
+        }
+
+
+def _largest(limit, fits):
+    """The largest ``size`` in ``0..limit`` with ``fits(size)``, for ``fits`` true up to some size (0 always fits)."""
+    low, high = 0, limit
+    while low < high:
+        mid = (low + high + 1) // 2
+        if fits(mid):
+            low = mid
+        else:
+            high = mid - 1
+    return low
@@ -0,0 +1,517 @@
+"""LlamaIndex vector store persisted as memory-mapped NumPy arrays.
+
+``SimpleVectorStore`` persists ``default__vector_store.json`` as JSON lists
+of floats, and ``load_index_from_storage`` parses all of them on every
+start. The docstore repeats every node's text as JSON next to it.
+:class:`MmapVectorStore` keeps everything needed to answer a query in
+``.npy`` files that are memory-mapped on load, so opening an index costs
+the same at a thousand nodes as at a million.
+
+Rows are stored in segments. Each segment ``<prefix>.<segment>`` holds:
+
+* ``.vectors.npy``: float32 ``(nodes, dimensions)`` matrix, with
+  ``.norms.npy`` holding the row norms;
+* ``.ids.npy`` / ``.ref_ids.npy``: node and source document ids as
+  fixed-width bytes, row for row;
+* ``.nodes.npy`` / ``.offsets.npy``: every node (text and metadata, as
+  LlamaIndex vector stores serialise them) as one byte blob with row
+  offsets. Only the nodes a query returns are decoded.
+
+``<prefix>`` is the path LlamaIndex persists the vector store to
+(``storage/default__vector_store``). The ``.json`` file itself becomes a
+small manifest listing the segments. Segment files are never rewritten:
+persisting again writes the rows added since as a new segment and the rows
+deleted since as a small ``.deleted`` file, and the segments are merged
+once there are too many of them or too many deleted rows. The store keeps
+the node text (``stores_text=True``), so the index no longer copies nodes
+into ``docstore.json``. :func:`load_or_build_index` wraps the starter
+notebook's load-or-create pattern::
+
+    index = load_or_build_index("./storage", lambda: SimpleDirectoryReader("data").load_data())
+
+An existing JSON ``storage`` directory is converted on first load, reusing
+its embeddings.
+"""
+
+import json
+import os
+from typing import Any, List, Optional
+
+import numpy as np
+from llama_index.core import StorageContext, VectorStoreIndex, load_index_from_storage
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.storage.docstore import SimpleDocumentStore
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult,
+)
+from llama_index.core.vector_stores.utils import metadata_dict_to_node, node_to_metadata_dict
+
+try:
+    from llama_index.core.vector_stores.utils import build_metadata_filter_fn
+except ImportError:  # llama-index-core < 0.12 keeps it private
+    from llama_index.core.vector_stores.simple import _build_metadata_filter_fn as build_metadata_filter_fn
+
+FORMAT = "genai-mmap-vector-store"
+FORMAT_VERSION = 2
+DEFAULT_PERSIST_NAME = "default__vector_store.json"
+ARRAYS = ("vectors", "norms", "ids", "ref_ids", "nodes", "offsets")
+# Merge the segments on persist past this many, or once this share of rows is deleted.
+MAX_SEGMENTS = 16
+MAX_DELETED_FRACTION = 0.25
+
+
+def _prefix(persist_path):
+    return persist_path[:-5] if persist_path.endswith(".json") else persist_path
+
+
+def _read_manifest(persist_path):
+    try:
+        with open(persist_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if isinstance(manifest, dict) and manifest.get("format") == FORMAT else None
+
+
+def _segment_entries(manifest):
+    if manifest.get("version", 1) == 1:
+        # Version 1 stores were one segment, written straight to <prefix>.<array>.npy.
+        return [{"name": "", "rows": manifest["count"], "deleted": None}]
+    return manifest["segments"]
+
+
+def _manifest_files(prefix, manifest):
+    """Every file a manifest refers to, for removing the ones a newer manifest dropped."""
+    files = set()
+    for entry in _segment_entries(manifest):
+        files.update(_Segment.paths(prefix, entry["name"]).values())
+        if entry.get("deleted"):
+            files.add(f"{prefix}.{entry['deleted']}.npy")
+    return files
+
+
+def is_mmap_store(persist_path):
+    """Whether ``persist_path`` is a manifest written by :class:`MmapVectorStore`."""
+    return _read_manifest(persist_path) is not None
+
+
+class _Segment:
+    """Rows added together: one set of :data:`ARRAYS`, plus which rows are still live."""
+
+    def __init__(self, vectors, norms, ids, ref_ids, nodes, offsets, live=None, name=None):
+        self.vectors = vectors
+        self.norms = norms
+        self.ids = ids
+        self.ref_ids = ref_ids
+        self.nodes = nodes
+        self.offsets = offsets
+        self.live = np.ones(len(ids), dtype=bool) if live is None else live
+        self.name = name  # None until persisted
+        self.deleted_name = None
+        self.deletes_changed = False
+
+    @classmethod
+    def from_nodes(cls, nodes, flat_metadata):
+        vectors = np.asarray([node.get_embedding() for node in nodes], dtype=np.float32)
+        payloads = [
+            json.dumps(node_to_metadata_dict(node, remove_text=False, flat_metadata=flat_metadata)).encode("utf-8")
+            for node in nodes
+        ]
+        lengths = np.fromiter((len(p) for p in payloads), dtype=np.int64, count=len(payloads))
+        return cls(
+            vectors=vectors,
+            norms=np.linalg.norm(vectors, axis=1),
+            ids=np.array([node.node_id.encode("utf-8") for node in nodes]),
+            ref_ids=np.array([(node.ref_doc_id or "None").encode("utf-8") for node in nodes]),
+            nodes=np.frombuffer(b"".join(payloads), dtype=np.uint8),
+            offsets=np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+        )
+
+    @staticmethod
+    def paths(prefix, name):
+        base = f"{prefix}.{name}" if name else prefix
+        return {array: f"{base}.{array}.npy" for array in ARRAYS}
+
+    @classmethod
+    def load(cls, prefix, entry):
+        arrays = {array: np.load(path, mmap_mode="r") for array, path in cls.paths(prefix, entry["name"]).items()}
+        segment = cls(**arrays, name=entry["name"])
+        if entry.get("deleted"):
+            segment.live[np.load(f"{prefix}.{entry['deleted']}.npy")] = False
+            segment.deleted_name = entry["deleted"]
+        return segment
+
+    def save(self, prefix, name):
+        for array, path in self.paths(prefix, name).items():
+            np.save(path, getattr(self, array))
+        self.name = name
+
+    def save_deleted(self, prefix, name):
+        np.save(f"{prefix}.{name}.npy", np.flatnonzero(~self.live))
+        self.deleted_name = name
+        self.deletes_changed = False
+
+    def entry(self):
+        return {"name": self.name, "rows": len(self), "deleted": self.deleted_name}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dimensions(self):
+        return self.vectors.shape[1]
+
+    def metadata_at(self, row):
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return json.loads(self.nodes[start:end].tobytes())
+
+    def kill(self, rows):
+        self.live[rows] = False
+        if self.name is not None:
+            self.deletes_changed = True
+
+    def scores(self, query_vector, query_norm, rows=None):
+        """Cosine similarity to ``query_vector``; deleted rows score ``-inf``."""
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        denominator = (self.norms if rows is None else self.norms[rows]) * query_norm
+        denominator[denominator == 0] = 1.0
+        scores = (vectors @ query_vector) / denominator
+        scores[~(self.live if rows is None else self.live[rows])] = -np.inf
+        return scores
+
+    def take(self, rows):
+        """A new in-memory segment holding ``rows`` of this one."""
+        starts, ends = self.offsets[:-1][rows], self.offsets[1:][rows]
+        nodes = np.asarray(self.nodes)
+        return _Segment(
+            vectors=np.asarray(self.vectors)[rows],
+            norms=np.asarray(self.norms)[rows],
+            ids=np.asarray(self.ids)[rows],
+            ref_ids=np.asarray(self.ref_ids)[rows],
+            nodes=(
+                np.concatenate([nodes[s:e] for s, e in zip(starts.tolist(), ends.tolist())])
+                if len(starts)
+                else np.empty(0, dtype=np.uint8)
+            ),
+            offsets=np.concatenate([[0], np.cumsum(ends - starts)]).astype(np.int64),
+        )
+
+    @classmethod
+    def concatenate(cls, segments):
+        """One in-memory segment with every row (live or not) of ``segments``, in order."""
+        offsets = [np.asarray(segments[0].offsets)]
+        for segment in segments[1:]:
+            offsets.append(offsets[-1][-1] + np.asarray(segment.offsets)[1:])
+        return cls(
+            vectors=np.concatenate([np.asarray(s.vectors) for s in segments]),
+            norms=np.concatenate([np.asarray(s.norms) for s in segments]),
+            ids=np.concatenate([np.asarray(s.ids) for s in segments]),
+            ref_ids=np.concatenate([np.asarray(s.ref_ids) for s in segments]),
+            nodes=np.concatenate([np.asarray(s.nodes) for s in segments]),
+            offsets=np.concatenate(offsets),
+            live=np.concatenate([s.live for s in segments]),
+        )
+
+
+class MmapVectorStore(BasePydanticVectorStore):
+    """Exact cosine-similarity search over float32 matrices, persisted as ``.npy`` files.
+
+    Rows are numbered across segments in order; deleted rows keep their
+    number (and score ``-inf``) until the segments are merged on persist.
+    """
+
+    stores_text: bool = True
+    flat_metadata: bool = False
+
+    _segments: list = PrivateAttr(default_factory=list)
+    _row_of: Optional[dict] = PrivateAttr(default=None)
+    _source: Optional[str] = PrivateAttr(default=None)
+    _generation: int = PrivateAttr(default=0)
+    _dirty: bool = PrivateAttr(default=False)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MmapVectorStore"
+
+    @property
+    def client(self) -> None:
+        return None
+
+    @property
+    def node_count(self) -> int:
+        # Not __len__: LlamaIndex tests stores for truth, and an empty one must not read as missing.
+        return sum(int(segment.live.sum()) for segment in self._segments)
+
+    # Persistence
+
+    @classmethod
+    def from_persist_path(cls, persist_path: str, fs: Any = None) -> "MmapVectorStore":
+        """Memory-map a store persisted at ``persist_path`` (the manifest)."""
+        if fs is not None:
+            raise NotImplementedError("MmapVectorStore only persists to the local filesystem")
+        manifest = _read_manifest(persist_path)
+        if manifest is None:
+            raise ValueError(f"{persist_path} is not an {FORMAT} manifest")
+        store = cls()
+        prefix = _prefix(persist_path)
+        store._segments = [_Segment.load(prefix, entry) for entry in _segment_entries(manifest)]
+        store._source = os.path.abspath(prefix)
+        store._generation = manifest.get("generation", 0)
+        return store
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: str, fs: Any = None) -> "MmapVectorStore":
+        return cls.from_persist_path(os.path.join(persist_dir, DEFAULT_PERSIST_NAME), fs=fs)
+
+    def persist(self, persist_path: str, fs: Any = None) -> None:
+        """Write the rows added and deleted since the last persist to ``persist_path``.
+
+        Persisting anywhere else, or past :data:`MAX_SEGMENTS` or
+        :data:`MAX_DELETED_FRACTION`, writes the live rows as one segment.
+        """
+        if fs is not None:
+            raise NotImplementedError("MmapVectorStore only persists to the local filesystem")
+        prefix = _prefix(persist_path)
+        previous = _read_manifest(persist_path)
+        in_place = previous is not None and self._source == os.path.abspath(prefix)
+        if in_place and not self._dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(prefix)), exist_ok=True)
+        generation = max(self._generation, previous.get("generation", 0) if previous else 0) + 1
+
+        rows = sum(len(segment) for segment in self._segments)
+        deleted = rows - self.node_count
+        if not in_place or len(self._segments) > MAX_SEGMENTS or deleted > MAX_DELETED_FRACTION * rows:
+            segments = [segment.take(np.flatnonzero(segment.live)) for segment in self._segments]
+        else:
+            # Saved segments stay as they are; only the unsaved tail is written.
+            segments = [
+                segment if segment.name is not None else segment.take(np.flatnonzero(segment.live))
+                for segment in self._segments
+            ]
+        unsaved = [segment for segment in segments if segment.name is None and len(segment)]
+        segments = [segment for segment in segments if segment.name is not None]
+        if unsaved:
+            segment = _Segment.concatenate(unsaved)
+            segment.save(prefix, f"s{generation}")
+            segments.append(segment)
+        for segment in segments:
+            if segment.deletes_changed:
+                segment.save_deleted(prefix, f"{segment.name}.deleted{generation}".lstrip("."))
+
+        # The manifest goes last, so a half-written store is never picked up.
+        manifest = {
+            "format": FORMAT,
+            "version": FORMAT_VERSION,
+            "generation": generation,
+            "count": sum(int(segment.live.sum()) for segment in segments),
+            "dimensions": int(segments[0].dimensions) if segments else 0,
+            "segments": [segment.entry() for segment in segments],
+        }
+        tmp_path = f"{persist_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, persist_path)
+        if previous is not None:
+            for path in _manifest_files(prefix, previous) - _manifest_files(prefix, manifest):
+                try:
+                    os.remove(path)
+                except OSError:  # still mapped (Windows); harmless to leave behind
+                    pass
+
+        if len(segments) != len(self._segments) or any(a is not b for a, b in zip(segments, self._segments)):
+            self._row_of = None
+        self._segments = segments
+        self._source = os.path.abspath(prefix)
+        self._generation = generation
+        self._dirty = False
+
+    # Rows
+
+    def _starts(self) -> np.ndarray:
+        return np.concatenate([[0], np.cumsum([len(segment) for segment in self._segments])]).astype(np.int64)
+
+    def _locate(self, rows: np.ndarray):
+        """``(segment index, row within the segment)`` of every row in ``rows``."""
+        starts = self._starts()
+        segment_of = np.searchsorted(starts, rows, side="right") - 1
+        return segment_of, rows - starts[segment_of]
+
+    def _metadata_at(self, row: int) -> dict:
+        segment_of, local = self._locate(np.array([row]))
+        return self._segments[int(segment_of[0])].metadata_at(int(local[0]))
+
+    def _node_at(self, row: int):
+        return metadata_dict_to_node(self._metadata_at(row))
+
+    def _live_mask(self) -> np.ndarray:
+        return np.concatenate([segment.live for segment in self._segments] or [np.empty(0, dtype=bool)])
+
+    def _live_rows(self) -> np.ndarray:
+        return np.flatnonzero(self._live_mask())
+
+    def _rows_for_ids(self, node_ids: List[str]) -> np.ndarray:
+        if self._row_of is None:
+            self._row_of = {}
+            for start, segment in zip(self._starts().tolist(), self._segments):
+                live = np.flatnonzero(segment.live)
+                self._row_of.update(zip(np.asarray(segment.ids)[live].tolist(), (live + start).tolist()))
+        rows = (self._row_of.get(node_id.encode("utf-8")) for node_id in node_ids)
+        return np.array([row for row in rows if row is not None], dtype=np.int64)
+
+    def _kill(self, rows: np.ndarray) -> None:
+        """Mark ``rows`` deleted."""
+        if not len(rows):
+            return
+        segment_of, local = self._locate(rows)
+        for i, segment in enumerate(self._segments):
+            in_segment = local[segment_of == i]
+            if len(in_segment):
+                if self._row_of is not None:
+                    for node_id in np.asarray(segment.ids)[in_segment].tolist():
+                        self._row_of.pop(node_id, None)
+                segment.kill(in_segment)
+        self._dirty = True
+
+    # BasePydanticVectorStore
+
+    def add(self, nodes, **add_kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+        segment = _Segment.from_nodes(nodes, self.flat_metadata)
+        dimensions = next((s.dimensions for s in self._segments if len(s)), None)
+        if dimensions is not None and segment.dimensions != dimensions:
+            raise ValueError(f"store holds {dimensions}-dimensional vectors, got {segment.dimensions}")
+        # Re-adding a node replaces it.
+        self.delete_nodes([node.node_id for node in nodes])
+        start = int(self._starts()[-1])
+        if self._segments and self._segments[-1].name is None:
+            self._segments[-1] = _Segment.concatenate([self._segments[-1], segment])
+        else:
+            self._segments.append(segment)
+        if self._row_of is not None:
+            self._row_of.update((node_id, row) for row, node_id in enumerate(segment.ids.tolist(), start=start))
+        self._dirty = True
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        if not self._segments:
+            return
+        ref_ids = np.concatenate([np.asarray(segment.ref_ids) for segment in self._segments])
+        self._kill(np.flatnonzero((ref_ids == ref_doc_id.encode("utf-8")) & self._live_mask()))
+
+    def delete_nodes(self, node_ids=None, filters=None, **delete_kwargs: Any) -> None:
+        rows = self._live_rows() if node_ids is None else self._rows_for_ids(node_ids)
+        if filters is not None:
+            matches = build_metadata_filter_fn(self._metadata_at, filters)
+            rows = np.array([row for row in rows.tolist() if matches(row)], dtype=np.int64)
+        self._kill(rows)
+
+    def clear(self) -> None:
+        self._kill(self._live_rows())
+
+    def get_nodes(self, node_ids=None, filters=None):
+        rows = self._live_rows() if node_ids is None else self._rows_for_ids(node_ids)
+        matches = build_metadata_filter_fn(self._metadata_at, filters)
+        return [self._node_at(row) for row in rows.tolist() if matches(row)]
+
+    def _scores(self, query_vector: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        query_norm = np.linalg.norm(query_vector)
+        if rows is None:
+            return np.concatenate([segment.scores(query_vector, query_norm) for segment in self._segments])
+        scores = np.empty(len(rows), dtype=np.float32)
+        segment_of, local = self._locate(rows)
+        for i, segment in enumerate(self._segments):
+            in_segment = segment_of == i
+            if in_segment.any():
+                scores[in_segment] = segment.scores(query_vector, query_norm, local[in_segment])
+        return scores
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.mode != VectorStoreQueryMode.DEFAULT:
+            raise NotImplementedError(f"MmapVectorStore does not support query mode {query.mode}")
+        if query.query_embedding is None or not self.node_count:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+        query_vector = np.asarray(query.query_embedding, dtype=np.float32)
+        candidates = None
+        # The index has no node list of its own for a store that keeps the
+        # text, so its retrievers pass node_ids=[]: that means "all nodes".
+        if query.node_ids:
+            candidates = self._rows_for_ids(query.node_ids)
+        if query.doc_ids:
+            ref_ids = np.concatenate([np.asarray(segment.ref_ids) for segment in self._segments])
+            in_docs = np.flatnonzero(np.isin(ref_ids, [doc_id.encode("utf-8") for doc_id in query.doc_ids]))
+            candidates = in_docs if candidates is None else np.intersect1d(candidates, in_docs)
+        scores = self._scores(query_vector, candidates)
+
+        top_k = query.similarity_top_k
+        matches = build_metadata_filter_fn(self._metadata_at, query.filters)
+        if query.filters is None and top_k < len(scores):
+            order = np.argpartition(-scores, top_k)[:top_k]
+            order = order[np.argsort(-scores[order], kind="stable")]
+        else:
+            order = np.argsort(-scores, kind="stable")
+        nodes, similarities, ids = [], [], []
+        for position in order.tolist():
+            if scores[position] == -np.inf:
+                break  # deleted rows sort last
+            row = position if candidates is None else int(candidates[position])
+            if not matches(row):
+                continue
+            node = self._node_at(row)
+            nodes.append(node)
+            similarities.append(float(scores[position]))
+            ids.append(node.node_id)
+            if len(nodes) == top_k:
+                break
+        return VectorStoreQueryResult(nodes=nodes, similarities=similarities, ids=ids)
+
+
+def _convert_json_storage(persist_dir, **index_kwargs):
+    """Rewrite a ``SimpleVectorStore`` storage directory in the mmap format, keeping its embeddings."""
+    old = load_index_from_storage(StorageContext.from_defaults(persist_dir=persist_dir), **index_kwargs)
+    vector_store = old.storage_context.vector_store
+    nodes = []
+    for node in old.docstore.get_nodes(list(old.index_struct.nodes_dict.values())):
+        node = node.model_copy()
+        node.embedding = vector_store.get(node.node_id)
+        nodes.append(node)
+    docstore = SimpleDocumentStore()
+    hashes = old.docstore.get_all_document_hashes()
+    ref_doc_ids = {node.ref_doc_id for node in nodes if node.ref_doc_id}
+    docstore.set_document_hashes({doc_id: doc_hash for doc_hash, doc_id in hashes.items() if doc_id in ref_doc_ids})
+    storage_context = StorageContext.from_defaults(docstore=docstore, vector_store=MmapVectorStore())
+    index = VectorStoreIndex(nodes, storage_context=storage_context, **index_kwargs)
+    index.storage_context.persist(persist_dir=persist_dir)
+    return index
+
+
+def load_index(persist_dir, **index_kwargs):
+    """The index persisted in ``persist_dir``, or ``None`` if there is none.
+
+    A directory persisted with the default JSON vector store is converted in
+    place on first load; its embeddings are reused, not recomputed.
+    """
+    manifest = os.path.join(persist_dir, DEFAULT_PERSIST_NAME)
+    if is_mmap_store(manifest):
+        storage_context = StorageContext.from_defaults(
+            persist_dir=persist_dir, vector_store=MmapVectorStore.from_persist_path(manifest)
+        )
+        return load_index_from_storage(storage_context, **index_kwargs)
+    if os.path.exists(manifest):
+        return _convert_json_storage(persist_dir, **index_kwargs)
+    return None
+
+
+def load_or_build_index(persist_dir, load_documents, **index_kwargs):
+    """Load the index in ``persist_dir``, or build it from ``load_documents()`` and persist it there."""
+    index = load_index(persist_dir, **index_kwargs)
+    if index is not None:
+        return index
+    storage_context = StorageContext.from_defaults(vector_store=MmapVectorStore())
+    index = VectorStoreIndex.from_documents(load_documents(), storage_context=storage_context, **index_kwargs)
+    index.storage_context.persist(persist_dir=persist_dir)
+    return index
@@ -0,0 +1,238 @@
+"""Record and replay HTTP traffic for the OpenAI, Azure and Ollama clients.
+
+:class:`RecordReplayTransport` is an httpx transport, so it slots into
+anything that takes an httpx client: the openai SDK (OpenAI, Azure,
+embeddings), ``langchain_openai`` (``http_client=``) and the ``ollama``
+package. In ``"record"`` mode every request goes out over a pooled
+connection and the response is appended to a JSONL cassette; in ``"replay"``
+mode responses come from the cassette and nothing touches the network::
+
+    transport = RecordReplayTransport("qna.jsonl", mode="replay", latency=0.2)
+    client = CompletionClient(transport=transport, api_key="replay")
+
+Scripts built on :class:`~genai_common.completion.CompletionClient` pick the
+transport up from the environment, so they run offline without editing
+them::
+
+    GENAI_REPLAY=qna.jsonl GENAI_REPLAY_MODE=record python OpenAI/1-GenAI-UseCases/2-qna.py
+    GENAI_REPLAY=qna.jsonl python OpenAI/1-GenAI-UseCases/2-qna.py
+
+Requests are matched on method, path, query and JSON body, ignoring the host
+and the headers (API keys never reach the cassette). ``stream_options`` is
+left out of the match, so a cassette recorded with telemetry off replays
+with it on and the other way round; the token usage of a stream is then
+simply missing or extra. The same request
+recorded several times is replayed in recorded order, then repeats the last
+answer. Streamed responses are recorded whole and replayed in one piece.
+"""
+
+import asyncio
+import base64
+import json
+import os
+import sys
+import threading
+import time
+
+import httpx
+
+from .cache import request_key
+
+REPLAY_ENV = "GENAI_REPLAY"
+REPLAY_MODE_ENV = "GENAI_REPLAY_MODE"
+
+# Headers that describe the wire encoding rather than the body httpx hands
+# back after decoding; replaying them would make httpx decode twice.
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+def _httpx_for(request):
+    # Some openai releases bundle their own fork of httpx; build responses and
+    # transports from whichever package the client's request came from.
+    return sys.modules[type(request).__module__.split(".")[0]]
+
+
+class ReplayMissError(LookupError):
+    """Replay mode got a request that is not in the cassette."""
+
+
+def replay_key(method, url, content):
+    """Key for a request: method, path, query and (canonicalised) JSON body, without ``stream_options``."""
+    try:
+        body = json.loads(content) if content else None
+    except ValueError:
+        body = content.decode("utf-8", "replace")
+    if isinstance(body, dict):
+        # Only sent while telemetry is on; it adds a usage chunk, not a different answer.
+        body.pop("stream_options", None)
+    return request_key({"method": method, "path": url.path, "query": url.query.decode("ascii"), "body": body})
+
+
+def _encode_body(content):
+    try:
+        return {"body": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body": base64.b64encode(content).decode("ascii"), "base64": True}
+
+
+def _decode_body(entry):
+    if entry.get("base64"):
+        return base64.b64decode(entry["body"])
+    return entry["body"].encode("utf-8")
+
+
+class Cassette:
+    """Recorded responses, loaded from and appended to a JSONL file.
+
+    One line per exchange: the request key, method and path (for reading the
+    file), the response status, headers and body.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = {}
+        self._positions = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+
+    def __len__(self):
+        return sum(map(len, self._entries.values()))
+
+    def next_entry(self, key):
+        """The next recorded response for ``key``, or ``None``."""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            return entries[min(position, len(entries) - 1)]
+
+    def append(self, key, request, response, content):
+        entry = {
+            "key": key,
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS},
+            **_encode_body(content),
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._entries.setdefault(key, []).append(entry)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+class RecordReplayTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """httpx transport that records to, or replays from, a :class:`Cassette`.
+
+    One instance serves both sync and async clients. ``cassette`` is a
+    :class:`Cassette` or a path. ``latency`` seconds are added to every
+    replayed response so load tests see realistic timings. In record mode
+    the real requests go through pooled transports built with ``limits``.
+    """
+
+    def __init__(self, cassette, mode="replay", latency=0.0, limits=None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"mode must be 'record' or 'replay', got {mode!r}")
+        self.cassette = cassette if isinstance(cassette, Cassette) else Cassette(cassette)
+        self.mode = mode
+        self.latency = latency
+        self.limits = limits
+        # Real transports by (httpx package, is_async), built on first use.
+        self._transports = {}
+        self._lock = threading.Lock()
+
+    def _real_transport(self, request, is_async):
+        package = _httpx_for(request)
+        with self._lock:
+            transport = self._transports.get((package.__name__, is_async))
+            if transport is None:
+                transport_class = package.AsyncHTTPTransport if is_async else package.HTTPTransport
+                options = {} if self.limits is None else {"limits": self.limits}
+                transport = self._transports[(package.__name__, is_async)] = transport_class(**options)
+            return transport
+
+    def _replay(self, request):
+        key = replay_key(request.method, request.url, request.read())
+        entry = self.cassette.next_entry(key)
+        if entry is None:
+            raise ReplayMissError(f"No recorded response for {request.method} {request.url.path} in {self.cassette.path}")
+        return _httpx_for(request).Response(
+            entry["status"], headers=entry["headers"], content=_decode_body(entry), request=request
+        )
+
+    def handle_request(self, request):
+        if self.mode == "replay":
+            if self.latency:
+                time.sleep(self.latency)
+            return self._replay(request)
+        response = self._real_transport(request, is_async=False).handle_request(request)
+        try:
+            content = response.read()
+        finally:
+            response.close()
+        return self._recorded(request, response, content)
+
+    async def handle_async_request(self, request):
+        await request.aread()
+        if self.mode == "replay":
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return self._replay(request)
+        response = await self._real_transport(request, is_async=True).handle_async_request(request)
+        try:
+            content = await response.aread()
+        finally:
+            await response.aclose()
+        return self._recorded(request, response, content)
+
+    def _recorded(self, request, response, content):
+        key = replay_key(request.method, request.url, request.read())
+        self.cassette.append(key, request, response, content)
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS]
+        return _httpx_for(request).Response(response.status_code, headers=headers, content=content, request=request)
+
+    def close(self):
+        with self._lock:
+            transports = [t for (_, is_async), t in self._transports.items() if not is_async]
+            self._transports = {key: t for key, t in self._transports.items() if key[1]}
+        for transport in transports:
+            transport.close()
+
+    async def aclose(self):
+        with self._lock:
+            transports = [t for (_, is_async), t in self._transports.items() if is_async]
+            self._transports = {key: t for key, t in self._transports.items() if not key[1]}
+        for transport in transports:
+            await transport.aclose()
+
+
+_env_transports = {}
+_env_lock = threading.Lock()
+
+
+def transport_from_env(limits=None):
+    """The transport named by ``GENAI_REPLAY``/``GENAI_REPLAY_MODE``, or ``None``.
+
+    ``GENAI_REPLAY_MODE`` defaults to ``replay``. Clients in one process share
+    a transport per cassette, so replay positions advance together.
+    """
+    path = os.environ.get(REPLAY_ENV)
+    if not path:
+        return None
+    mode = os.environ.get(REPLAY_MODE_ENV, "replay")
+    with _env_lock:
+        transport = _env_transports.get((path, mode))
+        if transport is None:
+            transport = _env_transports[(path, mode)] = RecordReplayTransport(path, mode=mode, limits=limits)
+        return transport
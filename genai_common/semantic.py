@@ -0,0 +1,203 @@
+"""Semantic chunking that embeds each sentence group once.
+
+``SemanticChunker`` from ``langchain_experimental`` embeds every sentence
+group again on every ``split_text`` call, so comparing the four
+``breakpoint_threshold_type`` settings on one document costs four embedding
+passes. :class:`SemanticSplitter` follows the same rules but keeps the
+embeddings, sends the missing ones to the model in large batches, and
+computes the adjacent cosine distances with NumPy. Every strategy then works
+from the same distance vector::
+
+    splitter = SemanticSplitter(OpenAIEmbeddings())
+    by_strategy = splitter.split_all(state_of_the_union)  # one embedding pass
+    for threshold_type, chunks in by_strategy.items():
+        print(threshold_type, len(chunks))
+"""
+
+import copy
+import re
+import threading
+
+import numpy as np
+
+BREAKPOINT_DEFAULTS = {
+    "percentile": 95,
+    "standard_deviation": 3,
+    "interquartile": 1.5,
+    "gradient": 95,
+}
+THRESHOLD_TYPES = tuple(BREAKPOINT_DEFAULTS)
+
+SENTENCE_SPLIT_REGEX = r"(?<=[.?!])\s+"
+
+
+def combine_sentences(sentences, buffer_size=1):
+    """Each sentence joined with ``buffer_size`` neighbours on either side."""
+    combined = []
+    for i in range(len(sentences)):
+        before = sentences[max(0, i - buffer_size):i]
+        after = sentences[i + 1:i + 1 + buffer_size]
+        combined.append("".join(s + " " for s in before) + sentences[i] + "".join(" " + s for s in after))
+    return combined
+
+
+def adjacent_distances(embeddings):
+    """Cosine distance between each row of ``embeddings`` and the next one."""
+    vectors = np.asarray(embeddings, dtype=np.float64)
+    norms = np.linalg.norm(vectors, axis=1)
+    norms[norms == 0] = 1.0
+    vectors = vectors / norms[:, None]
+    return 1.0 - np.einsum("ij,ij->i", vectors[:-1], vectors[1:])
+
+
+def breakpoint_threshold(distances, threshold_type="percentile", amount=None):
+    """``(threshold, values)``: break wherever ``values`` exceeds ``threshold``."""
+    if amount is None:
+        amount = BREAKPOINT_DEFAULTS[threshold_type]
+    if threshold_type == "percentile":
+        return float(np.percentile(distances, amount)), distances
+    if threshold_type == "standard_deviation":
+        return float(np.mean(distances) + amount * np.std(distances)), distances
+    if threshold_type == "interquartile":
+        q1, q3 = np.percentile(distances, [25, 75])
+        return float(np.mean(distances) + amount * (q3 - q1)), distances
+    if threshold_type == "gradient":
+        gradient = np.gradient(distances, np.arange(len(distances)))
+        return float(np.percentile(gradient, amount)), gradient
+    raise ValueError(f"breakpoint_threshold_type must be one of {', '.join(THRESHOLD_TYPES)}, got {threshold_type!r}")
+
+
+def threshold_for_chunks(distances, number_of_chunks):
+    """The percentile threshold that ``number_of_chunks`` maps to, as in ``SemanticChunker``."""
+    x1, y1 = len(distances), 0.0
+    x2, y2 = 1.0, 100.0
+    x = max(min(number_of_chunks, x1), x2)
+    y = y2 if x2 == x1 else y1 + ((y2 - y1) / (x2 - x1)) * (x - x1)
+    return float(np.percentile(distances, min(max(y, 0), 100)))
+
+
+class SemanticSplitter:
+    """Split text where adjacent sentence groups are far apart in embedding space.
+
+    The arguments mean what they mean for ``SemanticChunker``. ``embeddings``
+    is a LangChain embeddings object (anything with ``embed_documents``).
+    Embeddings of sentence groups are kept in memory, keyed by their text,
+    and the missing ones are requested ``batch_size`` at a time.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        buffer_size=1,
+        add_start_index=False,
+        breakpoint_threshold_type="percentile",
+        breakpoint_threshold_amount=None,
+        number_of_chunks=None,
+        sentence_split_regex=SENTENCE_SPLIT_REGEX,
+        min_chunk_size=None,
+        batch_size=512,
+    ):
+        if breakpoint_threshold_type not in BREAKPOINT_DEFAULTS:
+            raise ValueError(
+                f"breakpoint_threshold_type must be one of {', '.join(THRESHOLD_TYPES)}, "
+                f"got {breakpoint_threshold_type!r}"
+            )
+        self.embeddings = embeddings
+        self.buffer_size = buffer_size
+        self.add_start_index = add_start_index
+        self.breakpoint_threshold_type = breakpoint_threshold_type
+        self.breakpoint_threshold_amount = breakpoint_threshold_amount
+        self.number_of_chunks = number_of_chunks
+        self.sentence_split_regex = sentence_split_regex
+        self.min_chunk_size = min_chunk_size
+        self.batch_size = batch_size
+        self._vectors = {}
+        self._lock = threading.Lock()
+
+    def embed(self, texts):
+        """Embeddings of ``texts`` as one array, asking the model only for unseen texts."""
+        with self._lock:
+            missing = list(dict.fromkeys(t for t in texts if t not in self._vectors))
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i:i + self.batch_size]
+            vectors = np.asarray(self.embeddings.embed_documents(batch), dtype=np.float64)
+            with self._lock:
+                self._vectors.update(zip(batch, vectors))
+        with self._lock:
+            return np.stack([self._vectors[t] for t in texts])
+
+    def clear_cache(self):
+        with self._lock:
+            self._vectors.clear()
+
+    def sentence_distances(self, text):
+        """``(sentences, distances)`` for ``text``; ``distances`` is ``None`` below two sentences."""
+        sentences = re.split(self.sentence_split_regex, text)
+        if len(sentences) < 2:
+            return sentences, None
+        return sentences, adjacent_distances(self.embed(combine_sentences(sentences, self.buffer_size)))
+
+    def _group(self, sentences, breakpoints):
+        chunks = []
+        start = 0
+        for index in breakpoints:
+            combined = " ".join(sentences[start:index + 1])
+            if self.min_chunk_size is not None and len(combined) < self.min_chunk_size:
+                continue
+            chunks.append(combined)
+            start = index + 1
+        if start < len(sentences):
+            chunks.append(" ".join(sentences[start:]))
+        return chunks
+
+    def _chunks(self, sentences, distances, threshold_type, amount):
+        if distances is None or (threshold_type == "gradient" and len(sentences) == 2):
+            return sentences
+        if self.number_of_chunks is not None:
+            threshold, values = threshold_for_chunks(distances, self.number_of_chunks), distances
+        else:
+            threshold, values = breakpoint_threshold(distances, threshold_type, amount)
+        return self._group(sentences, np.flatnonzero(values > threshold).tolist())
+
+    def split_text(self, text, threshold_type=None, amount=None):
+        """Chunks of ``text``; ``threshold_type`` and ``amount`` override the defaults."""
+        if threshold_type is None:
+            threshold_type = self.breakpoint_threshold_type
+            amount = self.breakpoint_threshold_amount if amount is None else amount
+        sentences, distances = self.sentence_distances(text)
+        return self._chunks(sentences, distances, threshold_type, amount)
+
+    def split_all(self, text, amounts=None):
+        """Chunks of ``text`` for every threshold type, from one embedding pass.
+
+        ``amounts`` maps threshold types to amounts; the rest use the defaults.
+        """
+        amounts = amounts or {}
+        sentences, distances = self.sentence_distances(text)
+        return {
+            threshold_type: self._chunks(sentences, distances, threshold_type, amounts.get(threshold_type))
+            for threshold_type in THRESHOLD_TYPES
+        }
+
+    def create_documents(self, texts, metadatas=None, threshold_type=None, amount=None):
+        """LangChain ``Document`` chunks of ``texts``, as ``SemanticChunker.create_documents``."""
+        from langchain_core.documents import Document
+
+        metadatas = metadatas or [{}] * len(texts)
+        documents = []
+        for text, metadata in zip(texts, metadatas):
+            start_index = 0
+            for chunk in self.split_text(text, threshold_type, amount):
+                chunk_metadata = copy.deepcopy(metadata)
+                if self.add_start_index:
+                    # Chunks rejoin sentences with single spaces, so (as in
+                    # SemanticChunker) this is the running length, not a search.
+                    chunk_metadata["start_index"] = start_index
+                documents.append(Document(page_content=chunk, metadata=chunk_metadata))
+                start_index += len(chunk)
+        return documents
+
+    def split_documents(self, documents, threshold_type=None, amount=None):
+        return self.create_documents(
+            [d.page_content for d in documents], [d.metadata for d in documents], threshold_type, amount
+        )
@@ -0,0 +1,305 @@
+"""Semantic LLM cache: answer a prompt with the response to the most similar cached prompt.
+
+Exact-match caches (``InMemoryCache``, ``SQLiteCache``,
+:class:`~genai_common.llm_cache.SQLiteLLMCache`) miss as soon as a question
+is rephrased: "Tell me a joke" and "tell me a joke please" are different
+keys. :class:`SemanticLLMCache` embeds the question of the prompt and
+returns the cached response of the nearest earlier question when their
+cosine similarity reaches ``threshold``::
+
+    from langchain_core.globals import set_llm_cache
+    from genai_common.semantic_cache import SemanticLLMCache
+
+    set_llm_cache(SemanticLLMCache(OpenAIEmbeddings(), threshold=0.95))
+
+Only the last human message is embedded (see :func:`split_prompt`). The rest
+of the prompt, such as a fixed system message and earlier turns, must match
+exactly: with it in the embedded text, two different short questions would
+be a few tokens apart in a mostly shared string. Every ``llm_string`` (model
+and call parameters) and every such context is a separate namespace, so one
+model is never answered with another's response. Every turn of a chat adds
+to the context, so at most ``max_namespaces`` namespaces are kept and the
+least recently used one is dropped first. A namespace holds
+at most ``max_entries`` prompts as unit vectors in one matrix, and a lookup
+is one matrix-vector product. When the namespace is full, the least recently
+used row is overwritten. Repeating a cached prompt exactly does not call
+the embedding model. :meth:`SemanticLLMCache.stats` reports the hit rate
+and the time saved: a hit saves the time its entry first took to generate,
+measured from the missed lookup to the update, minus the lookup itself.
+
+:class:`HashingEmbeddings` is a deterministic local embedding (hashed words
+and character trigrams) for tests and offline runs.
+"""
+
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from .vector_index import normalize
+
+try:
+    from langchain_core.caches import BaseCache as _CacheBase
+    from langchain_core.embeddings import Embeddings as _EmbeddingsBase
+except ImportError:  # the cache works without LangChain, as a plain object
+    _CacheBase = _EmbeddingsBase = object
+
+# Missed lookups remembered so that update() can reuse their embedding and timing.
+MAX_OPEN_MISSES = 1024
+
+
+def split_prompt(prompt):
+    """``(context, question)`` of a cache prompt: the last human message, and everything else.
+
+    Chat prompts arrive as serialized messages; other prompts as text, where
+    a chat prompt rendered for a completion model has ``Human: `` lines. A
+    prompt with no human message is all question.
+    """
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        messages = None
+    if not isinstance(messages, list):
+        head, separator, question = prompt.rpartition("Human: ")
+        if separator and (not head or head.endswith("\n")):
+            return head + separator, question
+        return "", prompt
+    lines = []
+    for message in messages:
+        kwargs = message.get("kwargs") if isinstance(message, dict) else None
+        if not isinstance(kwargs, dict) or "content" not in kwargs:
+            return "", prompt
+        content = kwargs["content"]
+        lines.append((kwargs.get("type", ""), content if isinstance(content, str) else json.dumps(content)))
+    for i in range(len(lines) - 1, -1, -1):
+        if lines[i][0] == "human":
+            context = [f"{role}: {content}" for role, content in lines[:i]] + ["human:"]
+            context += [f"{role}: {content}" for role, content in lines[i + 1:]]
+            return "\n".join(context), lines[i][1]
+    return "", "\n".join(f"{role}: {content}" for role, content in lines)
+
+
+class HashingEmbeddings(_EmbeddingsBase):
+    """Deterministic local embeddings: lower-cased words and their character trigrams, hashed into ``dimensions``."""
+
+    def __init__(self, dimensions=256):
+        self.dimensions = dimensions
+
+    def embed_query(self, text):
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in text.lower().split():
+            word = word.strip(".,!?;:\"'()")
+            padded = f"<{word}>"
+            for feature in [word] + [padded[i:i + 3] for i in range(len(padded) - 2)]:
+                digest = zlib.crc32(feature.encode("utf-8"))
+                vector[digest % self.dimensions] += 1.0 if digest & 0x80000000 else -1.0
+        return normalize(vector)[0].tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+class _Namespace:
+    """The prompts cached for one ``llm_string`` and context: unit vectors in a matrix, rows reused least recently used first."""
+
+    def __init__(self):
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.used = np.zeros(0, dtype=np.int64)
+        self.expires = np.zeros(0)
+        self.prompts = []
+        self.values = []
+        self.costs = []
+        self.row_of = {}
+
+    def __len__(self):
+        return len(self.prompts)
+
+    def nearest(self, vector, now):
+        """``(row, similarity)`` of the closest unexpired prompt, or ``(None, -inf)``."""
+        if not self.prompts:
+            return None, -np.inf
+        scores = self.vectors[: len(self)] @ vector
+        scores[self.expires[: len(self)] <= now] = -np.inf
+        row = int(np.argmax(scores))
+        return row, float(scores[row])
+
+    def put(self, prompt, vector, value, cost, expires_at, tick, max_entries):
+        """Store ``prompt``; returns whether another prompt was evicted to make room."""
+        evicted = False
+        row = self.row_of.get(prompt)
+        if row is None:
+            if len(self) < max_entries:
+                row = len(self)
+                if row == len(self.vectors):
+                    self._grow(len(vector), min(max_entries, max(16, 2 * row)))
+                self.prompts.append(prompt)
+                self.values.append(None)
+                self.costs.append(None)
+            else:
+                row = int(np.argmin(self.used))
+                del self.row_of[self.prompts[row]]
+                self.prompts[row] = prompt
+                evicted = True
+            self.row_of[prompt] = row
+        self.vectors[row] = vector
+        self.values[row] = value
+        self.costs[row] = cost
+        self.expires[row] = expires_at
+        self.used[row] = tick
+        return evicted
+
+    def _grow(self, dimensions, capacity):
+        vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        if len(self):
+            vectors[: len(self)] = self.vectors[: len(self)]
+        self.vectors = vectors
+        self.used = np.concatenate([self.used, np.zeros(capacity - len(self.used), dtype=np.int64)])
+        self.expires = np.concatenate([self.expires, np.full(capacity - len(self.expires), np.inf)])
+
+
+class SemanticLLMCache(_CacheBase):
+    """LangChain cache keyed on question similarity, one namespace per ``llm_string`` and context.
+
+    ``embedding`` is a LangChain ``Embeddings`` (only ``embed_query`` is
+    used). ``threshold`` is the cosine similarity a cached prompt needs to
+    answer a new one. Where rephrasings and different questions fall
+    depends on the embedding model, so tune it on a few pairs of each
+    (``benchmarks/bench_semantic_cache.py`` sweeps it). ``ttl``
+    (seconds, ``None`` for no expiry) and ``max_entries`` apply per
+    namespace, and ``max_namespaces`` bounds how many namespaces are kept.
+    ``exact_cache``, such as a
+    :class:`~genai_common.llm_cache.SQLiteLLMCache`, is tried before the
+    prompt is embedded and is given every update, which adds a persistent
+    exact-match tier.
+    """
+
+    def __init__(self, embedding, threshold=0.95, max_entries=1024, ttl=None, exact_cache=None, max_namespaces=256):
+        self.embedding = embedding
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_namespaces = max_namespaces
+        self.ttl = ttl
+        self.exact_cache = exact_cache
+        self._namespaces = OrderedDict()
+        self._open_misses = OrderedDict()
+        self._tick = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.namespace_evictions = 0
+        self.embed_calls = 0
+        self.lookup_seconds = 0.0
+        self.seconds_saved = 0.0
+
+    def _embed(self, question):
+        vector = normalize(self.embedding.embed_query(question))[0]
+        with self._lock:
+            self.embed_calls += 1
+        return vector
+
+    def _namespace(self, key):
+        # Callers hold the lock.
+        namespace = self._namespaces.get(key)
+        if namespace is not None:
+            self._namespaces.move_to_end(key)
+        return namespace
+
+    def lookup(self, prompt, llm_string):
+        start = time.perf_counter()
+        now = time.time()
+        context, question = split_prompt(prompt)
+        with self._lock:
+            namespace = self._namespace((llm_string, context))
+            row = None if namespace is None else namespace.row_of.get(prompt)
+            if row is not None and namespace.expires[row] > now:
+                return self._hit(namespace, row, start, exact=True)
+        if self.exact_cache is not None:
+            value = self.exact_cache.lookup(prompt, llm_string)
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                    self.exact_hits += 1
+                    self.lookup_seconds += time.perf_counter() - start
+                return value
+
+        vector = self._embed(question)
+        with self._lock:
+            namespace = self._namespace((llm_string, context))
+            if namespace is not None:
+                row, similarity = namespace.nearest(vector, now)
+                if similarity >= self.threshold:
+                    return self._hit(namespace, row, start, exact=False)
+            self.misses += 1
+            self.lookup_seconds += time.perf_counter() - start
+            self._open_misses[(prompt, llm_string)] = (vector, start)
+            while len(self._open_misses) > MAX_OPEN_MISSES:
+                self._open_misses.popitem(last=False)
+        return None
+
+    def _hit(self, namespace, row, start, exact):
+        # Callers hold the lock.
+        self._tick += 1
+        namespace.used[row] = self._tick
+        elapsed = time.perf_counter() - start
+        self.hits += 1
+        if exact:
+            self.exact_hits += 1
+        else:
+            self.semantic_hits += 1
+        self.lookup_seconds += elapsed
+        if namespace.costs[row] is not None:
+            self.seconds_saved += namespace.costs[row] - elapsed
+        return namespace.values[row]
+
+    def update(self, prompt, llm_string, return_val):
+        with self._lock:
+            vector, start = self._open_misses.pop((prompt, llm_string), (None, None))
+        # Time from the missed lookup to here is what generating the response cost.
+        cost = None if start is None else time.perf_counter() - start
+        context, question = split_prompt(prompt)
+        if vector is None:
+            vector = self._embed(question)
+        expires_at = np.inf if self.ttl is None else time.time() + self.ttl
+        with self._lock:
+            namespace = self._namespace((llm_string, context))
+            if namespace is None:
+                namespace = self._namespaces[(llm_string, context)] = _Namespace()
+                while len(self._namespaces) > self.max_namespaces:
+                    _, dropped = self._namespaces.popitem(last=False)
+                    self.namespace_evictions += 1
+                    self.evictions += len(dropped)
+            self._tick += 1
+            if namespace.put(prompt, vector, return_val, cost, expires_at, self._tick, self.max_entries):
+                self.evictions += 1
+        if self.exact_cache is not None:
+            self.exact_cache.update(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self._namespaces.clear()
+            self._open_misses.clear()
+        if self.exact_cache is not None:
+            self.exact_cache.clear(**kwargs)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "namespace_evictions": self.namespace_evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "embed_calls": self.embed_calls,
+            "entries": sum(len(namespace) for namespace in self._namespaces.values()),
+            "namespaces": len(self._namespaces),
+            "lookup_seconds": self.lookup_seconds,
+            "seconds_saved": self.seconds_saved,
+        }
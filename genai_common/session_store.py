@@ -0,0 +1,399 @@
+"""Chat histories for ``RunnableWithMessageHistory`` with bounded memory, kept on disk.
+
+The chatbot notebook keeps every conversation in ``store = {}`` as an
+``InMemoryChatMessageHistory``: nothing is ever dropped, so memory grows with
+every session, and a restart loses them all. :class:`SessionStore` provides a
+drop-in ``get_session_history``::
+
+    sessions = SessionStore("chat-sessions.log", max_tokens=2000)
+    with_message_history = RunnableWithMessageHistory(chain, sessions.get_session_history)
+
+* new messages are appended to one log file as they arrive, so a restart
+  loses nothing, and the log is the only copy of an idle session;
+* the ``max_sessions`` most recently used sessions are kept in memory. Any
+  other session is read back from the log when it is next used, so memory
+  holds only a small index entry for each of them;
+* once a session passes ``max_tokens``, its older turns are replaced by one
+  summary message (``summarize(transcript) -> str``, by default the head and
+  tail of the transcript cut to ``summary_tokens``). The latest
+  ``keep_tokens`` of messages are kept verbatim;
+* log records made obsolete by summaries and :meth:`SessionStore.clear` are
+  dropped by rewriting the log once it is ``vacuum_ratio`` times the size of
+  the live records. The rewrite runs outside the store's lock; only copying
+  the records appended meanwhile and swapping the files hold it.
+
+Each record points to the previous record of its session, so loading a
+session reads only its own records since its last summary. The store is
+thread-safe within one process; do not share a log file between processes.
+"""
+
+import itertools
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import SystemMessage, message_to_dict, messages_from_dict
+
+from .tokens import TOKENS_PER_MESSAGE, count_tokens, truncate_tokens
+
+DEFAULT_LOG = os.path.join(os.path.expanduser("~"), ".cache", "genai-course", "chat-sessions.log")
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+# Logs smaller than this are never rewritten, whatever their dead share.
+MIN_VACUUM_BYTES = 1024 * 1024
+
+
+def transcript(messages):
+    """``type: content`` lines for ``messages``, the text handed to ``summarize``; an earlier summary goes in as is."""
+    lines = []
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+        if message.type == "system" and content.startswith(SUMMARY_PREFIX):
+            lines.append(content[len(SUMMARY_PREFIX) :])
+        else:
+            lines.append(f"{message.type}: {content}")
+    return "\n".join(lines)
+
+
+class _Entry:
+    """Where a session's newest record is, the bytes of its live records, and its generation.
+
+    The generation changes on every reset and is drawn from a store-wide
+    counter, so a session that is dropped and comes back never reuses one.
+    """
+
+    __slots__ = ("offset", "live", "epoch")
+
+    def __init__(self, epoch):
+        self.offset = None
+        self.live = 0
+        self.epoch = epoch
+
+
+class _Session:
+    """A session in memory: its messages, their token counts and the total."""
+
+    __slots__ = ("messages", "tokens", "total")
+
+    def __init__(self, messages=(), tokens=()):
+        self.messages = list(messages)
+        self.tokens = list(tokens)
+        self.total = sum(self.tokens)
+
+
+class SessionHistory(BaseChatMessageHistory):
+    """The ``BaseChatMessageHistory`` of one session; it holds no messages itself."""
+
+    def __init__(self, store, session_id):
+        self.store = store
+        self.session_id = session_id
+
+    @property
+    def messages(self):
+        return self.store.messages(self.session_id)
+
+    def add_messages(self, messages):
+        self.store.add_messages(self.session_id, messages)
+
+    def clear(self):
+        self.store.clear(self.session_id)
+
+
+class SessionStore:
+    """An LRU of chat sessions over an append-only log, with summaries past a token budget.
+
+    ``keep_tokens`` defaults to half of ``max_tokens``; ``model`` picks the
+    tiktoken encoding they are counted with. ``summarize`` runs outside the
+    store's lock, and a summary is dropped if the session was cleared or
+    summarized again meanwhile. ``fsync=True`` syncs the log after every
+    append instead of leaving it to the OS.
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_LOG,
+        max_sessions=1024,
+        max_tokens=4000,
+        keep_tokens=None,
+        summarize=None,
+        summary_tokens=500,
+        model="gpt-4o",
+        vacuum_ratio=2.0,
+        fsync=False,
+    ):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.max_tokens = max_tokens
+        self.keep_tokens = max_tokens // 2 if keep_tokens is None else keep_tokens
+        self.summarize = summarize or self._digest
+        self.summary_tokens = summary_tokens
+        self.model = model
+        self.vacuum_ratio = vacuum_ratio
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._hot = OrderedDict()
+        self._compacting = set()
+        self._generations = itertools.count()
+        self._vacuuming = False
+        self.loads = 0
+        self.summaries = 0
+        self.vacuums = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._open()
+
+    def get_session_history(self, session_id):
+        """For ``RunnableWithMessageHistory(chain, store.get_session_history)``."""
+        return SessionHistory(self, session_id)
+
+    # The log
+
+    def _open(self):
+        """Index the log, cutting off a record left half-written by a crash."""
+        self._index = {}
+        self._live = 0
+        offset = 0
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    self._indexed(record["session"], offset, len(line), record["reset"])
+                    offset += len(line)
+            if offset != os.path.getsize(self.path):
+                os.truncate(self.path, offset)
+        self._size = offset
+        self._writer = open(self.path, "ab")
+        self._reader = open(self.path, "rb")
+
+    def close(self):
+        with self._lock:
+            self._writer.close()
+            self._reader.close()
+
+    def _indexed(self, session_id, offset, size, reset):
+        # Callers hold the lock.
+        entry = self._index.get(session_id)
+        if entry is None:
+            entry = self._index[session_id] = _Entry(next(self._generations))
+        if reset:
+            self._live -= entry.live
+            entry.live = 0
+            entry.epoch = next(self._generations)
+        entry.offset = offset
+        entry.live += size
+        self._live += size
+
+    @staticmethod
+    def _record(session_id, prev, reset, tokens, messages):
+        """One log line; ``messages`` are already dicts."""
+        record = {"session": session_id, "prev": prev, "reset": reset, "tokens": tokens, "messages": messages}
+        return (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def _append(self, session_id, messages, tokens, reset):
+        """Write one record; a ``reset`` record replaces everything the session had."""
+        # Callers hold the lock.
+        entry = self._index.get(session_id)
+        prev = None if reset or entry is None else entry.offset
+        line = self._record(session_id, prev, reset, tokens, [message_to_dict(message) for message in messages])
+        self._writer.write(line)
+        self._writer.flush()
+        if self.fsync:
+            os.fsync(self._writer.fileno())
+        self._indexed(session_id, self._size, len(line), reset)
+        self._size += len(line)
+
+    def _read(self, offset, reader=None):
+        """The messages (as dicts) and token counts of the session whose newest record is at ``offset``.
+
+        Follows the records back to the last reset. Callers hold the lock,
+        unless they pass their own ``reader``.
+        """
+        reader = reader or self._reader
+        records = []
+        while offset is not None:
+            reader.seek(offset)
+            record = json.loads(reader.readline())
+            records.append(record)
+            if record["reset"]:
+                break
+            offset = record["prev"]
+        messages, tokens = [], []
+        for record in reversed(records):
+            messages.extend(record["messages"])
+            tokens.extend(record["tokens"])
+        return messages, tokens
+
+    def vacuum(self):
+        """Rewrite the log with one record per non-empty session."""
+        self._vacuum()
+
+    def _vacuum(self):
+        # Callers do not hold the lock. The log is only appended to, so its
+        # first ``end`` bytes can be read into the new log while other
+        # sessions carry on; the lock is taken again to copy the records
+        # appended meanwhile and swap the files. The new log is written beside
+        # the old one, so a crash leaves one of them whole.
+        with self._lock:
+            if self._vacuuming:
+                return
+            self._vacuuming = True
+            heads = [(session_id, entry.offset) for session_id, entry in self._index.items()]
+            end = self._size
+        try:
+            temporary = self.path + ".tmp"
+            newest, live = {}, {}
+            with open(temporary, "wb") as f, open(self.path, "rb") as reader:
+                size = 0
+                for session_id, offset in heads:
+                    messages, tokens = self._read(offset, reader)
+                    if not messages:
+                        continue
+                    line = self._record(session_id, None, True, tokens, messages)
+                    f.write(line)
+                    newest[session_id], live[session_id] = size, len(line)
+                    size += len(line)
+                with self._lock:
+                    # Records appended since the snapshot, pointed at their session's new records.
+                    reader.seek(end)
+                    for line in reader.read(self._size - end).splitlines(keepends=True):
+                        record = json.loads(line)
+                        session_id = record["session"]
+                        if record["reset"]:
+                            live[session_id] = 0
+                        else:
+                            record["prev"] = newest.get(session_id)
+                            line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+                        f.write(line)
+                        newest[session_id] = size
+                        live[session_id] = live.get(session_id, 0) + len(line)
+                        size += len(line)
+                    if self.fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+                    f.close()
+                    reader.close()
+                    self._swap(temporary, newest, live, size)
+        finally:
+            with self._lock:
+                self._vacuuming = False
+
+    def _swap(self, temporary, newest, live, size):
+        # Callers hold the lock. Sessions keep their generation; the ones left
+        # with no records are dropped.
+        self._writer.close()
+        self._reader.close()
+        os.replace(temporary, self.path)
+        index = {}
+        for session_id, offset in newest.items():
+            entry = index[session_id] = _Entry(self._index[session_id].epoch)
+            entry.offset, entry.live = offset, live[session_id]
+        self._index = index
+        self._size = size
+        self._live = sum(live.values())
+        self._writer = open(self.path, "ab")
+        self._reader = open(self.path, "rb")
+        self.vacuums += 1
+
+    # Sessions
+
+    def _session(self, session_id):
+        """The in-memory session, loaded from the log if it is not hot."""
+        # Callers hold the lock.
+        session = self._hot.get(session_id)
+        if session is not None:
+            self._hot.move_to_end(session_id)
+            return session
+        entry = self._index.get(session_id)
+        if entry is None:
+            session = _Session()
+        else:
+            messages, tokens = self._read(entry.offset)
+            session = _Session(messages_from_dict(messages), tokens)
+            self.loads += 1
+        self._hot[session_id] = session
+        while len(self._hot) > self.max_sessions:
+            self._hot.popitem(last=False)
+        return session
+
+    def _count(self, message):
+        content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+        return TOKENS_PER_MESSAGE + count_tokens(content, self.model)
+
+    def messages(self, session_id):
+        with self._lock:
+            return list(self._session(session_id).messages)
+
+    def add_messages(self, session_id, messages):
+        messages = list(messages)
+        if not messages:
+            return
+        tokens = [self._count(message) for message in messages]
+        with self._lock:
+            session = self._session(session_id)
+            self._append(session_id, messages, tokens, reset=False)
+            session.messages.extend(messages)
+            session.tokens.extend(tokens)
+            session.total += sum(tokens)
+            compaction = None
+            if session.total > self.max_tokens and session_id not in self._compacting:
+                cut = self._cut(session)
+                if cut:
+                    self._compacting.add(session_id)
+                    compaction = (session.messages[:cut], cut, self._index[session_id].epoch)
+            vacuum = not self._vacuuming and self._size > MIN_VACUUM_BYTES and self._size > self.vacuum_ratio * self._live
+        if compaction is not None:
+            self._compact(session_id, *compaction)
+        if vacuum:
+            self._vacuum()
+
+    def _cut(self, session):
+        """How many leading messages to summarize: all but the latest ``keep_tokens``, cut before a human turn."""
+        cut, kept = len(session.messages), 0
+        while cut and kept + session.tokens[cut - 1] <= self.keep_tokens:
+            cut -= 1
+            kept += session.tokens[cut]
+        while cut < len(session.messages) and session.messages[cut].type != "human":
+            cut += 1
+        return cut
+
+    def _compact(self, session_id, old, cut, epoch):
+        try:
+            summary = SystemMessage(SUMMARY_PREFIX + self.summarize(transcript(old)))
+            count = self._count(summary)
+            with self._lock:
+                entry = self._index.get(session_id)
+                if entry is None or entry.epoch != epoch:
+                    return
+                session = self._session(session_id)
+                messages = [summary] + session.messages[cut:]
+                tokens = [count] + session.tokens[cut:]
+                self._append(session_id, messages, tokens, reset=True)
+                session.messages, session.tokens, session.total = messages, tokens, sum(tokens)
+                self.summaries += 1
+        finally:
+            with self._lock:
+                self._compacting.discard(session_id)
+
+    def _digest(self, text):
+        """The default summary: the start and end of the transcript, ``summary_tokens`` in all."""
+        return truncate_tokens(text, self.summary_tokens, self.model, keep="both")
+
+    def clear(self, session_id):
+        with self._lock:
+            if session_id in self._index:
+                self._append(session_id, [], [], reset=True)
+            self._hot.pop(session_id, None)
+
+    def stats(self):
+        return {
+            "sessions": len(self._index),
+            "hot_sessions": len(self._hot),
+            "log_bytes": self._size,
+            "live_bytes": self._live,
+            "loads": self.loads,
+            "summaries": self.summaries,
+            "vacuums": self.vacuums,
+        }
@@ -0,0 +1,253 @@
+"""Streaming recursive character splitter for corpora that do not fit in memory.
+
+``RecursiveCharacterTextSplitter.split_text`` needs the whole document as one
+string, searches it once per separator level and returns every chunk in a
+list. :class:`StreamingRecursiveSplitter` reads a file (or any iterator of
+text blocks) incrementally and yields chunks as soon as they are complete,
+each with its byte offsets in the source::
+
+    splitter = StreamingRecursiveSplitter(chunk_size=1000, chunk_overlap=200)
+    for chunk in splitter.split_file("corpus.txt"):
+        index(chunk.text, source="corpus.txt", start=chunk.start, end=chunk.end)
+
+It follows the LangChain splitter with ``keep_separator=True`` and
+``strip_whitespace=True`` (the defaults) chunk for chunk. The top level is
+split in one pass over the stream and only the pieces that are too long
+are split further, so memory is bounded by the block size plus one
+top-level piece (capped at ``max_piece_chars``), not by the document.
+Output matches ``split_text`` exactly unless the first
+separator present in the document only shows up after the first
+``max_piece_chars`` characters, or one top-level piece is longer than that.
+"""
+
+import codecs
+import os
+from collections import deque
+from itertools import accumulate
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+# The separator list the text-splitter notebook uses for languages without
+# word boundaries (Chinese, Japanese, Thai, ...).
+CJK_SEPARATORS = [
+    "\n\n",
+    "\n",
+    " ",
+    ".",
+    ",",
+    "\u200b",  # Zero-width space
+    "\uff0c",  # Fullwidth comma
+    "\u3001",  # Ideographic comma
+    "\uff0e",  # Fullwidth full stop
+    "\u3002",  # Ideographic full stop
+    "",
+]
+
+DEFAULT_BLOCK_SIZE = 1 << 20
+DEFAULT_MAX_PIECE_CHARS = 8 << 20
+
+
+class TextChunk:
+    """A chunk's text and its ``[start, end)`` byte offsets in the source."""
+
+    __slots__ = ("text", "start", "end")
+
+    def __init__(self, text, start, end):
+        self.text = text
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f"TextChunk(start={self.start}, end={self.end}, text={self.text[:40]!r})"
+
+
+def _split_keep_start(text, separator):
+    """Split on a literal separator, keeping it at the start of the next piece."""
+    if not separator:
+        return list(text)
+    parts = text.split(separator)
+    pieces = [parts[0]] if parts[0] else []
+    pieces.extend(separator + part for part in parts[1:])
+    return pieces
+
+
+def _choose_separator(text, separators):
+    """First separator that occurs in ``text`` and the ones after it."""
+    for i, separator in enumerate(separators):
+        if not separator:
+            return separator, []
+        if separator in text:
+            return separator, separators[i + 1:]
+    return separators[-1], []
+
+
+def _make_chunk(current, encoding):
+    """Join the pending ``(piece, length, byte_start, byte_length)`` entries into a stripped chunk."""
+    joined = "".join([entry[0] for entry in current])
+    text = joined.strip()
+    if not text:
+        return None
+    start = current[0][2]
+    end = current[-1][2] + current[-1][3]
+    if len(text) != len(joined):
+        lead = len(joined) - len(joined.lstrip())
+        trail = len(joined) - len(joined.rstrip())
+        if lead:
+            start += len(joined[:lead].encode(encoding))
+        if trail:
+            end -= len(joined[len(joined) - trail:].encode(encoding))
+    return TextChunk(text, start, end)
+
+
+class StreamingRecursiveSplitter:
+    """Recursive character splitter over a stream of text.
+
+    ``chunk_size``, ``chunk_overlap``, ``separators`` (literal strings, tried
+    in order) and ``length_function`` mean what they mean for
+    ``RecursiveCharacterTextSplitter``. Byte offsets are counted in
+    ``encoding``, which should be the encoding of the file being split.
+    """
+
+    def __init__(
+        self,
+        chunk_size=4000,
+        chunk_overlap=200,
+        separators=None,
+        length_function=len,
+        encoding="utf-8",
+        max_piece_chars=DEFAULT_MAX_PIECE_CHARS,
+    ):
+        if chunk_overlap > chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) is larger than chunk_size ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = list(separators) if separators is not None else list(DEFAULT_SEPARATORS)
+        self.length_function = length_function
+        self.encoding = encoding
+        self._utf8 = codecs.lookup(encoding).name == "utf-8"
+        self.max_piece_chars = max(max_piece_chars, chunk_size)
+
+    def _byte_length(self, text):
+        # isascii() is O(1) on CPython strings and ASCII is one byte per
+        # character in UTF-8, so most pieces skip the encode.
+        if self._utf8 and text.isascii():
+            return len(text)
+        return len(text.encode(self.encoding))
+
+    def _chunks(self, pieces, separators):
+        """Merge small pieces into chunks and recurse into long ones.
+
+        ``pieces`` yields ``(text, byte_start, byte_length)`` in order. The
+        merge keeps LangChain's ``_merge_splits`` rules, but pops the
+        overlap from a deque instead of re-slicing a list.
+        """
+        length_function = self.length_function
+        chunk_size = self.chunk_size
+        chunk_overlap = self.chunk_overlap
+        encoding = self.encoding
+        current = deque()
+        total = 0
+        for piece, byte_start, byte_length in pieces:
+            length = length_function(piece)
+            if length < chunk_size:
+                if total + length > chunk_size and current:
+                    chunk = _make_chunk(current, encoding)
+                    if chunk is not None:
+                        yield chunk
+                    while total > chunk_overlap or (total + length > chunk_size and total > 0):
+                        total -= current.popleft()[1]
+                current.append((piece, length, byte_start, byte_length))
+                total += length
+                continue
+            if current:
+                chunk = _make_chunk(current, encoding)
+                if chunk is not None:
+                    yield chunk
+                current.clear()
+                total = 0
+            if not separators:
+                # Nothing left to split on: the piece is a chunk on its own, unstripped.
+                yield TextChunk(piece, byte_start, byte_start + byte_length)
+            else:
+                yield from self._split_piece(piece, byte_start, separators)
+        if current:
+            chunk = _make_chunk(current, encoding)
+            if chunk is not None:
+                yield chunk
+
+    def _split_piece(self, text, byte_start, separators):
+        separator, rest = _choose_separator(text, separators)
+        pieces = _split_keep_start(text, separator)
+        byte_lengths = [self._byte_length(piece) for piece in pieces]
+        starts = accumulate(byte_lengths, initial=byte_start)
+        yield from self._chunks(zip(pieces, starts, byte_lengths), rest)
+
+    def _stream_pieces(self, blocks, separator):
+        """Top-level pieces of the stream, in order, with their byte offsets."""
+        position = 0
+        tail = ""
+        # Whether the pending tail piece starts with the (stripped) separator.
+        tail_has_separator = False
+        prefix = separator
+        for block in blocks:
+            if not block:
+                continue
+            buffer = tail + block
+            if not separator:
+                for char in buffer:
+                    byte_length = self._byte_length(char)
+                    yield char, position, byte_length
+                    position += byte_length
+                tail = ""
+                continue
+            parts = buffer.split(separator)
+            for i, part in enumerate(parts[:-1]):
+                piece = prefix + part if (i or tail_has_separator) else part
+                if piece:
+                    byte_length = self._byte_length(piece)
+                    yield piece, position, byte_length
+                    position += byte_length
+            if len(parts) > 1:
+                tail_has_separator = True
+            tail = parts[-1]
+            if len(tail) > self.max_piece_chars:
+                # No separator for a long stretch: hand over what we have as one piece.
+                piece = prefix + tail if tail_has_separator else tail
+                byte_length = self._byte_length(piece)
+                yield piece, position, byte_length
+                position += byte_length
+                tail, tail_has_separator = "", False
+        piece = (prefix + tail) if tail_has_separator else tail
+        if piece:
+            yield piece, position, self._byte_length(piece)
+
+    def iter_chunks(self, blocks):
+        """Yield :class:`TextChunk` objects from an iterable of text blocks."""
+        blocks = iter(blocks)
+        # The top-level separator is the first one found in the opening
+        # window; reading stops as soon as the first in the list turns up.
+        first = self.separators[0]
+        window = []
+        size = 0
+        for block in blocks:
+            window.append(block)
+            size += len(block)
+            if size >= self.max_piece_chars or not first or first in "".join(window[-2:]):
+                break
+        separator, rest = _choose_separator("".join(window), self.separators)
+
+        def stream():
+            yield from window
+            yield from blocks
+
+        yield from self._chunks(self._stream_pieces(stream(), separator), rest)
+
+    def split_file(self, path, block_size=DEFAULT_BLOCK_SIZE):
+        """Yield the chunks of a text file, read ``block_size`` characters at a time."""
+        # newline="" keeps "\r\n" as is, so byte offsets match the file.
+        with open(os.fspath(path), encoding=self.encoding, newline="") as f:
+            yield from self.iter_chunks(iter(lambda: f.read(block_size), ""))
+
+    def split_text(self, text):
+        """Chunks of an in-memory string, as a list of strings (like ``split_text``)."""
+        return [chunk.text for chunk in self.iter_chunks([text])]
@@ -0,0 +1,403 @@
+"""Latency and token-usage records for every model call.
+
+Each call through :class:`~genai_common.completion.CompletionClient` (and any
+LangChain model given :func:`langchain_callback`) produces one record with
+its wall time, time to first token (streams), prompt and completion tokens,
+whether the response cache answered it, and the script and stage it ran
+in. Recording is off until it is configured, in code or from the
+environment::
+
+    GENAI_TELEMETRY_JSONL=calls.jsonl python OpenAI/3-PromptEngineering/8-prompt-chaining.py
+    GENAI_METRICS_PORT=9464 streamlit run OpenAI/4-LangChain/1-Basics/app.py
+
+    telemetry.configure(jsonl="calls.jsonl", prometheus_port=9464)
+    with telemetry.stage("retrieve"):
+        client.generate_response(prompt)
+    print(telemetry.get_recorder().summary())
+
+Records are appended to the JSONL file one line per call, and aggregated
+into Prometheus histograms and counters served as text on
+``http://127.0.0.1:<port>/metrics``. Stages come from :func:`stage` (or the
+stage name in a :class:`~genai_common.chain.StreamingChain`).
+"""
+
+import bisect
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+JSONL_ENV = "GENAI_TELEMETRY_JSONL"
+METRICS_PORT_ENV = "GENAI_METRICS_PORT"
+
+# Upper bounds in seconds, Prometheus style; the last bucket catches the rest.
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+
+_stage = contextvars.ContextVar("genai_stage", default=None)
+
+
+@contextmanager
+def stage(name):
+    """Tag the model calls made inside the ``with`` block with ``name``."""
+    token = _stage.set(name)
+    try:
+        yield
+    finally:
+        _stage.reset(token)
+
+
+def current_stage():
+    return _stage.get()
+
+
+def _script_name():
+    main = sys.modules.get("__main__")
+    path = getattr(main, "__file__", None) or (sys.argv[0] if sys.argv and sys.argv[0] else "interactive")
+    return os.path.basename(path)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class LatencyHistogram:
+    """Thread-safe cumulative latency histogram with fixed buckets."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[min(index, len(self.counts) - 1)] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "count": self.count,
+                "sum": self.sum,
+                "mean": self.sum / self.count if self.count else 0.0,
+                "buckets": dict(zip(self.buckets, self.counts)),
+            }
+
+
+class Recorder:
+    """Collects call records, writes them to JSONL and aggregates metrics."""
+
+    def __init__(self, script=None, jsonl=None):
+        self.script = script or _script_name()
+        self.jsonl = jsonl
+        self._file = open(jsonl, "a", encoding="utf-8") if jsonl else None
+        self._lock = threading.Lock()
+        self._durations = {}
+        self._first_token = {}
+        self._totals = {}
+        self._server = None
+
+    def record(self, record):
+        record.setdefault("script", self.script)
+        labels = (record["script"], record.get("stage") or "", record.get("model") or "")
+        with self._lock:
+            totals = self._totals.get(labels)
+            if totals is None:
+                totals = self._totals[labels] = {
+                    "calls": 0,
+                    "errors": 0,
+                    "cache_hits": 0,
+                    "wall_time": 0.0,
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                }
+                self._durations[labels] = LatencyHistogram()
+                self._first_token[labels] = LatencyHistogram()
+            totals["calls"] += 1
+            totals["errors"] += record.get("error") is not None
+            totals["cache_hits"] += bool(record.get("cache_hit"))
+            totals["wall_time"] += record["wall_time"]
+            totals["prompt_tokens"] += record.get("prompt_tokens") or 0
+            totals["completion_tokens"] += record.get("completion_tokens") or 0
+            if self._file is not None:
+                self._file.write(json.dumps(record) + "\n")
+                self._file.flush()
+        self._durations[labels].observe(record["wall_time"])
+        if record.get("time_to_first_token") is not None:
+            self._first_token[labels].observe(record["time_to_first_token"])
+
+    def summary(self):
+        """Totals per ``(script, stage, model)``, most wall time first."""
+        with self._lock:
+            items = [(labels, dict(totals)) for labels, totals in self._totals.items()]
+        return dict(sorted(items, key=lambda item: item[1]["wall_time"], reverse=True))
+
+    def prometheus_text(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            series = list(self._totals.items())
+            histograms = {
+                "genai_llm_call_duration_seconds": dict(self._durations),
+                "genai_llm_time_to_first_token_seconds": dict(self._first_token),
+            }
+        for name, by_labels in histograms.items():
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in by_labels.items():
+                snapshot = histogram.snapshot()
+                if not snapshot["count"]:
+                    continue
+                base = 'script="{}",stage="{}",model="{}"'.format(*map(_escape, labels))
+                cumulative = 0
+                for bound, count in snapshot["buckets"].items():
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{name}_bucket{{{base},le="{le}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{base}}} {snapshot['sum']}")
+                lines.append(f"{name}_count{{{base}}} {snapshot['count']}")
+        counters = (
+            ("genai_llm_calls_total", "calls"),
+            ("genai_llm_errors_total", "errors"),
+            ("genai_llm_cache_hits_total", "cache_hits"),
+            ("genai_llm_prompt_tokens_total", "prompt_tokens"),
+            ("genai_llm_completion_tokens_total", "completion_tokens"),
+        )
+        for name, key in counters:
+            lines.append(f"# TYPE {name} counter")
+            for labels, totals in series:
+                base = 'script="{}",stage="{}",model="{}"'.format(*map(_escape, labels))
+                lines.append(f"{name}{{{base}}} {totals[key]}")
+        return "\n".join(lines) + "\n"
+
+    def serve_prometheus(self, port, host="127.0.0.1"):
+        """Serve :meth:`prometheus_text` at ``/metrics`` from a background thread."""
+        recorder = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = recorder.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class CallTimer:
+    """Times one model call; used as ``with track_call(model) as call:``."""
+
+    __slots__ = ("recorder", "model", "source", "stage", "start", "ttft", "prompt_tokens", "completion_tokens", "cached")
+
+    def __init__(self, recorder, model, source, stage_name):
+        self.recorder = recorder
+        self.model = model
+        self.source = source
+        self.stage = stage_name
+        self.start = None
+        self.ttft = None
+        self.prompt_tokens = None
+        self.completion_tokens = None
+        self.cached = False
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def first_token(self):
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.start
+
+    def cache_hit(self):
+        self.cached = True
+
+    def usage(self, prompt_tokens, completion_tokens):
+        """Add token counts; calls made of several requests add them up."""
+        if prompt_tokens is not None:
+            self.prompt_tokens = (self.prompt_tokens or 0) + prompt_tokens
+        if completion_tokens is not None:
+            self.completion_tokens = (self.completion_tokens or 0) + completion_tokens
+
+    def openai_usage(self, usage):
+        if usage is not None:
+            self.usage(usage.prompt_tokens, usage.completion_tokens)
+
+    def __exit__(self, exc_type, exc, traceback):
+        # A consumer that stops reading a stream early is not an error.
+        failed = exc_type is not None and not issubclass(exc_type, GeneratorExit)
+        self.recorder.record({
+            "timestamp": time.time(),
+            "stage": self.stage,
+            "source": self.source,
+            "model": self.model,
+            "wall_time": time.perf_counter() - self.start,
+            "time_to_first_token": self.ttft,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cache_hit": self.cached,
+            "error": exc_type.__name__ if failed else None,
+        })
+
+
+class _NullTimer:
+    """Stands in for :class:`CallTimer` while recording is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def first_token(self):
+        pass
+
+    def cache_hit(self):
+        pass
+
+    def usage(self, prompt_tokens, completion_tokens):
+        pass
+
+    def openai_usage(self, usage):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+_recorder = None
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure(jsonl=None, prometheus_port=None, script=None):
+    """Start recording; returns the process-wide :class:`Recorder`.
+
+    Replaces (and closes) any recorder configured before.
+    """
+    global _recorder, _configured
+    with _configure_lock:
+        if _recorder is not None:
+            _recorder.close()
+        _recorder = Recorder(script=script, jsonl=jsonl)
+        if prometheus_port is not None:
+            _recorder.serve_prometheus(int(prometheus_port))
+        _configured = True
+        return _recorder
+
+
+def get_recorder():
+    """The configured :class:`Recorder`, or ``None`` while recording is off.
+
+    The first call configures recording from ``GENAI_TELEMETRY_JSONL`` and
+    ``GENAI_METRICS_PORT`` when either is set.
+    """
+    global _configured
+    if not _configured:
+        jsonl, port = os.environ.get(JSONL_ENV), os.environ.get(METRICS_PORT_ENV)
+        if jsonl or port:
+            return configure(jsonl=jsonl, prometheus_port=port)
+        _configured = True
+    return _recorder
+
+
+def enabled():
+    return get_recorder() is not None
+
+
+def track_call(model, source="openai", stage_name=None):
+    """Context manager timing one model call (a no-op while recording is off)."""
+    recorder = get_recorder()
+    if recorder is None:
+        return _NULL_TIMER
+    return CallTimer(recorder, model, source, stage_name or _stage.get())
+
+
+def langchain_callback(stage_name=None):
+    """LangChain callback handler recording every LLM or chat model call.
+
+    Pass it in ``config={"callbacks": [...]}`` of ``invoke`` or in a model's
+    ``callbacks=``. Token counts come from ``usage_metadata`` or the
+    provider's ``llm_output``. A chat model answered from the LLM cache is
+    recorded as a cache hit: LangChain marks those generations with a
+    ``total_cost`` of 0 in ``usage_metadata``, and their token counts are
+    not counted again. Completion (non-chat) models make no callbacks at all
+    for cached prompts, so their hits only show in the cache's own stats.
+    Needs ``langchain_core``.
+    """
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class TelemetryCallbackHandler(BaseCallbackHandler):
+        def __init__(self):
+            self._calls = {}
+
+        def _start(self, serialized, run_id, kwargs):
+            params = kwargs.get("invocation_params") or {}
+            model = params.get("model") or params.get("model_name") or params.get("deployment_name")
+            if model is None and serialized:
+                model = (serialized.get("kwargs") or {}).get("model_name") or serialized.get("name")
+            call = track_call(model, source="langchain", stage_name=stage_name)
+            self._calls[run_id] = call.__enter__()
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+            self._start(serialized, run_id, kwargs)
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            self._start(serialized, run_id, kwargs)
+
+        def on_llm_new_token(self, token, *, run_id, **kwargs):
+            call = self._calls.get(run_id)
+            if call is not None:
+                call.first_token()
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            call = self._calls.pop(run_id, None)
+            if call is None:
+                return
+            found = False
+            for generations in response.generations:
+                for generation in generations:
+                    metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                    if metadata and metadata.get("total_cost") == 0:
+                        found = True
+                        call.cache_hit()
+                    elif metadata:
+                        found = True
+                        call.usage(metadata.get("input_tokens"), metadata.get("output_tokens"))
+            if not found:
+                token_usage = (response.llm_output or {}).get("token_usage") or {}
+                call.usage(token_usage.get("prompt_tokens"), token_usage.get("completion_tokens"))
+            call.__exit__(None, None, None)
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            call = self._calls.pop(run_id, None)
+            if call is not None:
+                call.__exit__(type(error), error, None)
+
+    return TelemetryCallbackHandler()
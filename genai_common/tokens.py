@@ -0,0 +1,214 @@
+"""Token counting and token budgets for prompts.
+
+Scripts used to hard-code ``max_tokens`` without looking at how long the
+prompt was, so an oversized context only failed once it reached the API.
+This module counts tokens locally with tiktoken (``pip install tiktoken``),
+keeping one encoder per encoding for the whole process, and derives
+``max_tokens`` from the model's context window::
+
+    budget = PromptBudget("gpt-3.5-turbo", completion_tokens=500)
+    context = budget.fit(context, reserve=budget.count(question) + 50)
+    prompt = f"Context: {context}\\nQuestion: {question}\\nAnswer:"
+    max_tokens = budget.max_tokens_for(prompt)
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import tiktoken
+
+DEFAULT_ENCODING = "cl100k_base"
+
+# Total tokens (prompt + completion) each model accepts.
+CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-3.5-turbo-instruct": 4096,
+    "gpt-35-turbo": 16385,
+    "gpt-35-turbo-instruct": 4096,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+}
+DEFAULT_CONTEXT_WINDOW = 4096
+
+# Per-message overhead of the chat format (see the OpenAI cookbook).
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_NAME = 1
+TOKENS_PER_REPLY = 3
+
+
+# Below this many characters a batch is encoded on the calling thread; thread
+# hand-off costs more than it saves for a few short texts.
+PARALLEL_BATCH_CHARS = 256 * 1024
+
+_batch_pool = None
+
+
+class TokenBudgetError(ValueError):
+    """The prompt leaves no room for a completion in the model's context window."""
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name=DEFAULT_ENCODING):
+    """Process-wide cached tiktoken encoding."""
+    return tiktoken.get_encoding(name)
+
+
+@lru_cache(maxsize=None)
+def encoding_for_model(model):
+    """Encoding for ``model``; unknown names (e.g. Azure deployments) fall back to cl100k_base."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Azure spells gpt-3.5 as gpt-35.
+        try:
+            return tiktoken.encoding_for_model(model.replace("gpt-35", "gpt-3.5"))
+        except KeyError:
+            return get_encoding(DEFAULT_ENCODING)
+
+
+def context_window(model):
+    if model in CONTEXT_WINDOWS:
+        return CONTEXT_WINDOWS[model]
+    # Dated snapshots, e.g. gpt-4o-2024-08-06, share their family's window.
+    for name in sorted(CONTEXT_WINDOWS, key=len, reverse=True):
+        if model.startswith(name):
+            return CONTEXT_WINDOWS[name]
+    return DEFAULT_CONTEXT_WINDOW
+
+
+def count_tokens(text, model=None):
+    # encode_ordinary treats "<|endoftext|>" in user text as plain text
+    # instead of raising, and skips the special-token scan.
+    encoding = encoding_for_model(model) if model else get_encoding()
+    return len(encoding.encode_ordinary(text))
+
+
+def count_tokens_batch(texts, model=None):
+    """Token counts for many texts.
+
+    Large batches are spread over a persistent thread pool (tiktoken releases
+    the GIL while encoding); ``Encoding.encode_ordinary_batch`` would build a
+    new pool on every call.
+    """
+    global _batch_pool
+    encoding = encoding_for_model(model) if model else get_encoding()
+    texts = list(texts)
+    if len(texts) < 2 or sum(map(len, texts)) < PARALLEL_BATCH_CHARS:
+        return [len(encoding.encode_ordinary(text)) for text in texts]
+    workers = os.cpu_count() or 4
+    if _batch_pool is None:
+        _batch_pool = ThreadPoolExecutor(max_workers=workers)
+    chunksize = max(1, len(texts) // (4 * workers))
+    return [len(tokens) for tokens in _batch_pool.map(encoding.encode_ordinary, texts, chunksize=chunksize)]
+
+
+def count_message_tokens(messages, model=None):
+    """Tokens used by a list of chat messages (``{"role": ..., "content": ...}``)."""
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE
+        for key, value in message.items():
+            if isinstance(value, str):
+                total += count_tokens(value, model)
+            if key == "name":
+                total += TOKENS_PER_NAME
+    return total
+
+
+TRUNCATION_MARKER = " ... "
+
+
+def truncate_tokens(text, max_tokens, model=None, keep="start"):
+    """Cut ``text`` down to at most ``max_tokens`` tokens.
+
+    ``keep`` is ``"start"``, ``"end"`` or ``"both"`` (head and tail, with the
+    middle replaced by :data:`TRUNCATION_MARKER`; just the head when the
+    marker does not fit). Decoding a cut and encoding it again can take more
+    tokens than were kept, so the result is re-counted and cut shorter until
+    it fits.
+    """
+    if keep not in ("start", "end", "both"):
+        raise ValueError("keep must be 'start', 'end' or 'both'")
+    encoding = encoding_for_model(model) if model else get_encoding()
+    tokens = encoding.encode_ordinary(text)
+    if len(tokens) <= max_tokens:
+        return text
+    marker_tokens = len(encoding.encode_ordinary(TRUNCATION_MARKER))
+    if keep == "both" and max_tokens - marker_tokens < 2:
+        keep = "start"
+    budget = max_tokens - marker_tokens if keep == "both" else max_tokens
+    while budget > 0:
+        if keep == "start":
+            result = encoding.decode(tokens[:budget])
+        elif keep == "end":
+            result = encoding.decode(tokens[-budget:])
+        else:
+            head = budget // 2
+            tail = tokens[len(tokens) - (budget - head):]
+            result = encoding.decode(tokens[:head]) + TRUNCATION_MARKER + encoding.decode(tail)
+        excess = len(encoding.encode_ordinary(result)) - max_tokens
+        if excess <= 0:
+            return result
+        budget -= excess
+    return ""
+
+
+class PromptBudget:
+    """Split a model's context window between prompt and completion.
+
+    ``completion_tokens`` is the most the caller wants back; ``max_tokens_for``
+    lowers it when the prompt leaves less room than that, and raises
+    :class:`TokenBudgetError` when fewer than ``min_completion_tokens`` remain.
+    """
+
+    def __init__(self, model, completion_tokens=500, system_prompt=None, min_completion_tokens=16):
+        self.model = model
+        self.completion_tokens = completion_tokens
+        self.system_prompt = system_prompt
+        self.min_completion_tokens = min_completion_tokens
+        self.context_window = context_window(model)
+
+    def count(self, text):
+        return count_tokens(text, self.model)
+
+    def prompt_tokens(self, prompt):
+        if self.system_prompt is None:
+            return self.count(prompt)
+        return count_message_tokens(
+            [{"role": "system", "content": self.system_prompt}, {"role": "user", "content": prompt}],
+            self.model,
+        )
+
+    @property
+    def available_prompt_tokens(self):
+        """Prompt tokens that still leave room for the full completion."""
+        overhead = 0
+        if self.system_prompt is not None:
+            overhead = count_message_tokens([{"role": "system", "content": self.system_prompt}, {"role": "user", "content": ""}], self.model)
+        return self.context_window - self.completion_tokens - overhead
+
+    def max_tokens_for(self, prompt):
+        available = self.context_window - self.prompt_tokens(prompt)
+        if available < self.min_completion_tokens:
+            raise TokenBudgetError(
+                f"Prompt uses {self.context_window - available} of {self.context_window} tokens for {self.model}; "
+                f"fewer than {self.min_completion_tokens} left for the completion"
+            )
+        return min(self.completion_tokens, available)
+
+    def fit(self, text, reserve=0, summarize=None, keep="start"):
+        """Return ``text`` small enough to leave ``reserve`` tokens for the rest of the prompt.
+
+        When it is too long and ``summarize(text) -> str`` is given, the
+        summary is used instead (and still truncated if it does not fit).
+        """
+        limit = self.available_prompt_tokens - reserve
+        if self.count(text) <= limit:
+            return text
+        if summarize is not None:
+            text = summarize(text)
+        return truncate_tokens(text, limit, self.model, keep=keep)
@@ -0,0 +1,221 @@
+"""Tool registry for Automatic Reasoning and Tool-use (ART) loops.
+
+The ``calculator`` tool used to be ``eval(input_data)``, which runs whatever
+the model writes. Here expressions are parsed with :mod:`ast`, checked
+against a small arithmetic grammar and compiled once into a tree of Python
+closures; the compiled form is cached per expression string, so repeated or
+batched evaluation skips parsing entirely::
+
+    tools = ToolRegistry.with_defaults()
+    tools.use_tool("calculator", "2 + 3 * 5")                 # 17
+    tools.use_tools([("calculator", "2 ** 10"), ("web_search", "primes")])
+    tools.latency_histograms()["calculator"]["count"]
+
+Several tool calls from one reasoning step run concurrently, and every call
+is timed into a per-tool latency histogram.
+"""
+
+import ast
+import math
+import operator
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from .telemetry import LatencyHistogram
+
+MAX_EXPRESSION_LENGTH = 10_000
+MAX_EXPONENT = 4096
+# Integer results are capped in size, so one expression cannot run for
+# minutes or exhaust memory building a huge int.
+MAX_INT_BITS = 10_000
+# round(1, -10**8) builds 10**(10**8) internally.
+MAX_ROUND_DIGITS = 400
+
+
+class ExpressionError(ValueError):
+    """The expression is not valid, or not allowed, arithmetic."""
+
+
+def _check_int_bits(bits):
+    if bits > MAX_INT_BITS:
+        raise ExpressionError(f"Result would have about {bits} bits, more than {MAX_INT_BITS}")
+
+
+def _safe_pow(base, exponent):
+    if isinstance(exponent, (int, float)) and abs(exponent) > MAX_EXPONENT and abs(base) not in (0, 1):
+        raise ExpressionError(f"Exponent {exponent} is too large")
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and abs(base) > 1:
+        _check_int_bits(abs(base).bit_length() * exponent)
+    return operator.pow(base, exponent)
+
+
+def _safe_mul(left, right):
+    if isinstance(left, int) and isinstance(right, int):
+        _check_int_bits(abs(left).bit_length() + abs(right).bit_length())
+    return operator.mul(left, right)
+
+
+def _safe_round(number, ndigits=None):
+    if isinstance(ndigits, int) and abs(ndigits) > MAX_ROUND_DIGITS:
+        raise ExpressionError(f"round() to {ndigits} digits is out of range")
+    return round(number, ndigits)
+
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: _safe_mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: _safe_pow,
+}
+_UNARY_OPERATORS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+CONSTANTS = {"pi": math.pi, "e": math.e, "tau": math.tau}
+FUNCTIONS = {
+    "abs": abs,
+    "round": _safe_round,
+    "min": min,
+    "max": max,
+    "sum": lambda *values: sum(values),
+    "sqrt": math.sqrt,
+    "log": math.log,
+    "log10": math.log10,
+    "exp": math.exp,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "floor": math.floor,
+    "ceil": math.ceil,
+}
+
+
+def _compile_node(node):
+    if isinstance(node, ast.Constant):
+        value = node.value
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ExpressionError(f"Unsupported constant {value!r}")
+        return lambda: value
+    if isinstance(node, ast.BinOp):
+        op = _BINARY_OPERATORS.get(type(node.op))
+        if op is None:
+            raise ExpressionError(f"Unsupported operator {type(node.op).__name__}")
+        left, right = _compile_node(node.left), _compile_node(node.right)
+        return lambda: op(left(), right())
+    if isinstance(node, ast.UnaryOp):
+        op = _UNARY_OPERATORS.get(type(node.op))
+        if op is None:
+            raise ExpressionError(f"Unsupported operator {type(node.op).__name__}")
+        operand = _compile_node(node.operand)
+        return lambda: op(operand())
+    if isinstance(node, ast.Name):
+        if node.id not in CONSTANTS:
+            raise ExpressionError(f"Unknown name {node.id!r}")
+        value = CONSTANTS[node.id]
+        return lambda: value
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+            raise ExpressionError(f"Unsupported call {ast.unparse(node.func)!r}")
+        func = FUNCTIONS[node.func.id]
+        args = [_compile_node(arg) for arg in node.args]
+        return lambda: func(*(arg() for arg in args))
+    raise ExpressionError(f"Unsupported syntax {type(node).__name__}")
+
+
+@lru_cache(maxsize=4096)
+def compile_expression(expression):
+    """Parse and validate ``expression`` once; return a zero-argument callable."""
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError("Expression is too long")
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+        return _compile_node(tree.body)
+    except SyntaxError as exc:
+        raise ExpressionError(f"Invalid expression: {exc.msg}") from None
+    except RecursionError:
+        raise ExpressionError("Expression is nested too deeply") from None
+
+
+def evaluate(expression):
+    """Evaluate one arithmetic expression safely."""
+    try:
+        return compile_expression(expression)()
+    except (ArithmeticError, ValueError, TypeError) as exc:
+        if isinstance(exc, ExpressionError):
+            raise
+        raise ExpressionError(str(exc)) from exc
+    except RecursionError:
+        raise ExpressionError("Expression is nested too deeply") from None
+
+
+def evaluate_many(expressions, errors="raise"):
+    """Evaluate a batch of expressions in one call.
+
+    With ``errors="return"`` a failing expression puts its
+    :class:`ExpressionError` in the result list instead of raising, so one
+    bad model output does not sink the whole batch.
+    """
+    if errors not in ("raise", "return"):
+        raise ValueError("errors must be 'raise' or 'return'")
+    results = []
+    for expression in expressions:
+        try:
+            results.append(evaluate(expression))
+        except ExpressionError as exc:
+            if errors == "raise":
+                raise
+            results.append(exc)
+    return results
+
+
+def web_search(query):
+    # Placeholder search, as in the course example.
+    return f"Results for '{query}'"
+
+
+class ToolRegistry:
+    """Named tools with concurrent dispatch and per-tool latency histograms."""
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self._tools = {}
+        self._histograms = {}
+
+    @classmethod
+    def with_defaults(cls, **kwargs):
+        """Registry with the ``calculator`` and ``web_search`` tools."""
+        registry = cls(**kwargs)
+        registry.register("calculator", evaluate)
+        registry.register("web_search", web_search)
+        return registry
+
+    def register(self, name, func):
+        self._tools[name] = func
+        self._histograms[name] = LatencyHistogram()
+        return func
+
+    def __contains__(self, name):
+        return name in self._tools
+
+    def use_tool(self, tool_name, input_data):
+        func = self._tools.get(tool_name)
+        if func is None:
+            return "Tool not recognized"
+        start = time.perf_counter()
+        try:
+            return func(input_data)
+        finally:
+            self._histograms[tool_name].observe(time.perf_counter() - start)
+
+    def use_tools(self, calls):
+        """Run ``[(tool_name, input_data), ...]`` concurrently; results keep the call order."""
+        calls = list(calls)
+        if len(calls) <= 1:
+            return [self.use_tool(name, data) for name, data in calls]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(calls))) as executor:
+            futures = [executor.submit(self.use_tool, name, data) for name, data in calls]
+            return [future.result() for future in futures]
+
+    def latency_histograms(self):
+        return {name: histogram.snapshot() for name, histogram in self._histograms.items()}
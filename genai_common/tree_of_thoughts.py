@@ -0,0 +1,158 @@
+"""Breadth-first Tree-of-Thoughts search.
+
+Each level of the tree is expanded in one concurrent round: every node in
+the current beam asks for ``branching_factor`` new thoughts, each new thought
+is scored, and only the ``beam_width`` best children go on to the next level.
+Siblings never wait for each other, so wall-clock time grows with ``depth``
+rather than with the number of nodes in the tree::
+
+    tot = TreeOfThoughts(
+        client.generate_response,
+        generate_candidates=client.generate_candidates,
+        branching_factor=3,
+        depth=2,
+        beam_width=2,
+    )
+    root = ThoughtNode(client.generate_response("Generate ideas for a new AI project."))
+    best = tot.search(root)
+"""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+EXPAND_PROMPT = "Expand on the idea: {thought}"
+SCORE_PROMPT = (
+    "Rate how promising the following idea is on a scale from 1 to 10. "
+    "Reply with the number only.\n\nIdea: {thought}"
+)
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+class ThoughtNode:
+    """A node in the thought tree.
+
+    Uses ``__slots__`` so trees with thousands of thoughts do not pay for a
+    per-node ``__dict__``.
+    """
+
+    __slots__ = ("thought", "parent", "children", "score", "depth")
+
+    def __init__(self, thought, parent=None, score=None):
+        self.thought = thought
+        self.parent = parent
+        self.children = []
+        self.score = score
+        self.depth = 0 if parent is None else parent.depth + 1
+
+    def add_child(self, child_thought, score=None):
+        child_node = ThoughtNode(child_thought, parent=self, score=score)
+        self.children.append(child_node)
+        return child_node
+
+    def path(self):
+        """Thoughts from the root down to this node."""
+        thoughts = []
+        node = self
+        while node is not None:
+            thoughts.append(node.thought)
+            node = node.parent
+        return thoughts[::-1]
+
+    def walk(self):
+        """Yield this node and all of its descendants, breadth first."""
+        level = [self]
+        while level:
+            yield from level
+            level = [child for node in level for child in node.children]
+
+    def __repr__(self):
+        return f"ThoughtNode(depth={self.depth}, score={self.score!r}, thought={self.thought[:40]!r})"
+
+
+def parse_score(text):
+    """First number in a model reply, or 0.0 if there is none."""
+    match = _NUMBER.search(text or "")
+    return float(match.group()) if match else 0.0
+
+
+class TreeOfThoughts:
+    """Beam search over thoughts produced by ``generate(prompt) -> str``.
+
+    ``expand_prompt`` and ``score_prompt`` are format strings with a
+    ``{thought}`` field. ``max_workers`` bounds the number of model calls in
+    flight; to keep one round per level it should be at least
+    ``beam_width * branching_factor``.
+
+    When ``generate_candidates(prompt, n) -> list[str]`` is given, each node
+    asks for all of its children in one request instead of
+    ``branching_factor`` identical ones.
+    """
+
+    def __init__(
+        self,
+        generate,
+        branching_factor=2,
+        depth=2,
+        beam_width=2,
+        expand_prompt=EXPAND_PROMPT,
+        score_prompt=SCORE_PROMPT,
+        max_workers=16,
+        generate_candidates=None,
+    ):
+        if branching_factor < 1 or depth < 1 or beam_width < 1:
+            raise ValueError("branching_factor, depth and beam_width must be at least 1")
+        self.generate = generate
+        self.branching_factor = branching_factor
+        self.depth = depth
+        self.beam_width = beam_width
+        self.expand_prompt = expand_prompt
+        self.score_prompt = score_prompt
+        self.max_workers = max_workers
+        self.generate_candidates = generate_candidates
+
+    def score(self, thought):
+        return parse_score(self.generate(self.score_prompt.format(thought=thought)))
+
+    def _expand_one(self, node):
+        # Generate and score in the same task so scoring of one child overlaps
+        # with generation of its siblings.
+        thought = self.generate(self.expand_prompt.format(thought=node.thought))
+        return thought, self.score(thought)
+
+    def expand_level(self, frontier, executor):
+        """Expand every node in ``frontier`` concurrently; return the new children."""
+        if self.generate_candidates is not None:
+            return self._expand_level_batched(frontier, executor)
+        jobs = [(node, executor.submit(self._expand_one, node)) for node in frontier for _ in range(self.branching_factor)]
+        # Attach in submission order so the tree shape does not depend on
+        # which request happened to finish first.
+        children = []
+        for node, future in jobs:
+            thought, score = future.result()
+            children.append(node.add_child(thought, score=score))
+        return children
+
+    def _expand_level_batched(self, frontier, executor):
+        jobs = [
+            (node, executor.submit(self.generate_candidates, self.expand_prompt.format(thought=node.thought), self.branching_factor))
+            for node in frontier
+        ]
+        # Start scoring each node's candidates as soon as they arrive.
+        scored = []
+        for node, future in jobs:
+            for thought in future.result():
+                scored.append((node, thought, executor.submit(self.score, thought)))
+        return [node.add_child(thought, score=future.result()) for node, thought, future in scored]
+
+    def search(self, root):
+        """Grow the tree under ``root`` (a ThoughtNode or a string) and return the best leaf."""
+        if not isinstance(root, ThoughtNode):
+            root = ThoughtNode(root)
+        frontier = [root]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for _ in range(self.depth):
+                children = self.expand_level(frontier, executor)
+                children.sort(key=lambda child: child.score, reverse=True)
+                frontier = children[: self.beam_width]
+        return frontier[0]
@@ -0,0 +1,463 @@
+"""In-process vector search over float32 NumPy matrices, exact or IVF-PQ.
+
+The FAISS, Chroma and LanceDB notebooks answer one ``similarity_search`` at
+a time. The indexes here take a whole batch of query vectors and score it
+with one matrix operation:
+
+* :class:`FlatIndex` keeps the rows L2-normalised in one float32 matrix and
+  answers exactly: cosine similarity is ``queries @ vectors.T``, and the top
+  ``k`` of every row is picked with ``argpartition``.
+* :class:`IVFPQIndex` adds an approximate path. k-means centroids split the
+  rows into ``nlist`` inverted lists. Each row's residual from its centroid
+  is product-quantised to ``m`` one-byte codes. A query scans only its
+  ``nprobe`` nearest lists, scoring codes through ``(m, 256)`` lookup tables,
+  then re-ranks the best ``k * refine`` candidates exactly.
+
+:class:`NumpyVectorStore` puts either index behind the LangChain
+``VectorStore`` interface, with :meth:`~NumpyVectorStore.similarity_search_batch`
+on top::
+
+    db = NumpyVectorStore.from_documents(documents, embeddings)
+    results = db.similarity_search_batch(questions, k=4)  # one embedding call, one matmul
+
+It also answers the retriever search types without Python loops over the
+candidates: ``"mmr"`` through :func:`maximal_marginal_relevance`, and
+``"similarity_score_threshold"`` by cutting the score array before any
+``Document`` is built.
+"""
+
+import uuid
+
+import numpy as np
+
+try:
+    from langchain_core.documents import Document
+    from langchain_core.vectorstores import VectorStore as _VectorStoreBase
+except ImportError:  # the indexes work without LangChain
+    _VectorStoreBase = object
+
+# Query-by-row scores held at once by a search, to bound its memory.
+SCORE_BLOCK = 1 << 24
+
+
+def normalize(vectors):
+    """A float32 copy of ``vectors`` with unit-length rows (zero rows stay zero)."""
+    vectors = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors /= norms
+    return vectors
+
+
+def top_k(scores, k):
+    """``(scores, columns)`` of the ``k`` highest columns of every row, best first.
+
+    Missing entries (fewer than ``k`` columns, or ``-inf`` scores) have
+    column ``-1``.
+    """
+    n = scores.shape[1]
+    kept = min(k, n)
+    if kept < n:
+        columns = np.argpartition(-scores, kept - 1, axis=1)[:, :kept]
+    else:
+        columns = np.broadcast_to(np.arange(n), scores.shape).copy()
+    best = np.take_along_axis(scores, columns, axis=1)
+    order = np.argsort(-best, axis=1, kind="stable")
+    columns = np.take_along_axis(columns, order, axis=1)
+    best = np.take_along_axis(best, order, axis=1)
+    if kept < k:
+        best = np.pad(best, ((0, 0), (0, k - kept)), constant_values=-np.inf)
+        columns = np.pad(columns, ((0, 0), (0, k - kept)))
+    columns[best == -np.inf] = -1
+    return best, columns
+
+
+def assign(vectors, centroids):
+    """Index of the nearest (Euclidean) centroid of every row of ``vectors``."""
+    half_norms = 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    block = max(1, SCORE_BLOCK // len(centroids))
+    nearest = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block):
+        # argmin |x - c|^2 == argmax x.c - |c|^2 / 2
+        nearest[start:start + block] = np.argmax(vectors[start:start + block] @ centroids.T - half_norms, axis=1)
+    return nearest
+
+
+def kmeans(vectors, clusters, iterations=10, rng=None):
+    """Lloyd's k-means; returns the ``(clusters, dimensions)`` float32 centroids."""
+    rng = np.random.default_rng(rng)
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        nearest = assign(vectors, centroids)
+        counts = np.bincount(nearest, minlength=clusters)
+        order = np.argsort(nearest, kind="stable")
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+        centroids[filled] = np.add.reduceat(vectors[order], starts, axis=0) / counts[filled, None]
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            # Restart empty clusters on random rows rather than losing them.
+            centroids[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+    return centroids
+
+
+def maximal_marginal_relevance(query_embedding, embedding_list, lambda_mult=0.5, k=4):
+    """Indices of ``k`` rows of ``embedding_list`` picked by maximal marginal relevance.
+
+    Makes the same picks as ``langchain_community.vectorstores.utils.maximal_marginal_relevance``.
+    Instead of recomputing similarities to the whole selected set on every
+    step, it keeps each candidate's highest similarity to the selected set
+    as an array. Every pick is then one row of the candidate-candidate
+    similarity matrix, a ``np.maximum`` and an ``argmax``.
+    """
+    k = min(k, len(embedding_list))
+    if k <= 0:
+        return []
+    candidates = normalize(embedding_list)
+    relevance = candidates @ normalize(query_embedding)[0]
+    selected = [int(np.argmax(relevance))]
+    redundancy = candidates @ candidates[selected[0]]
+    available = np.ones(len(candidates), dtype=bool)
+    available[selected[0]] = False
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, candidates @ candidates[best], out=redundancy)
+    return selected
+
+
+class FlatIndex:
+    """Exact cosine-similarity search over normalised float32 rows."""
+
+    def __init__(self):
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def vectors(self):
+        """The normalised rows, as a view."""
+        return self._vectors[:self._count]
+
+    @property
+    def dimensions(self):
+        return self._vectors.shape[1] if self._count else None
+
+    def add(self, vectors):
+        """Append ``vectors`` (normalised on the way in); returns their row numbers."""
+        vectors = normalize(vectors)
+        if self._count and vectors.shape[1] != self._vectors.shape[1]:
+            raise ValueError(f"index holds {self._vectors.shape[1]}-dimensional vectors, got {vectors.shape[1]}")
+        end = self._count + len(vectors)
+        if end > len(self._vectors) or vectors.shape[1] != self._vectors.shape[1]:
+            # Grow geometrically, so adding in small batches stays linear.
+            grown = np.empty((max(end, 2 * self._count), vectors.shape[1]), dtype=np.float32)
+            if self._count:
+                grown[:self._count] = self._vectors[:self._count]
+            self._vectors = grown
+        self._vectors[self._count:end] = vectors
+        rows = np.arange(self._count, end)
+        self._count = end
+        return rows
+
+    def search(self, queries, k, mask=None):
+        """``(scores, rows)`` of the ``k`` most similar rows for every query, best first.
+
+        Both arrays have shape ``(len(queries), k)``; scores are cosine
+        similarities. Rows where the boolean ``mask`` is False are skipped,
+        and missing results have row ``-1``.
+        """
+        return self._search_exact(normalize(queries), k, mask)
+
+    def _search_exact(self, queries, k, mask=None):
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        rows = np.full((len(queries), k), -1, dtype=np.int64)
+        if not self._count:
+            return scores, rows
+        vectors = self.vectors
+        block = max(1, SCORE_BLOCK // self._count)
+        for start in range(0, len(queries), block):
+            block_scores = queries[start:start + block] @ vectors.T
+            if mask is not None:
+                block_scores[:, ~mask] = -np.inf
+            scores[start:start + block], rows[start:start + block] = top_k(block_scores, k)
+        return scores, rows
+
+
+class IVFPQIndex(FlatIndex):
+    """Inverted-file index with product-quantised residuals, and an exact fallback.
+
+    ``nlist`` defaults to ``sqrt(rows)`` at training time and ``m`` (the
+    number of one-byte codes per row) to one code per 8 dimensions.
+    ``refine`` re-ranks ``k * refine`` candidates per query by exact
+    similarity; ``refine=0`` returns the quantised scores. Until the index
+    holds ``train_threshold`` rows, or until :meth:`train` is called,
+    searches are exact.
+    """
+
+    def __init__(self, nlist=None, m=None, nprobe=8, refine=16, train_threshold=10000, train_size=None,
+                 iterations=10, seed=0):
+        super().__init__()
+        self.nlist = nlist
+        self.m = m
+        self.nprobe = nprobe
+        self.refine = refine
+        self.train_threshold = train_threshold
+        self.train_size = train_size
+        self.iterations = iterations
+        self.seed = seed
+        self.centroids = None
+        self.codebooks = None
+        self._lists = np.empty(0, dtype=np.int64)
+        self._codes = np.empty((0, 0), dtype=np.uint8)
+        self._postings = None
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def train(self, vectors=None):
+        """Learn centroids and codebooks from ``vectors`` (default: the rows added so far), then encode every row."""
+        vectors = self.vectors if vectors is None else normalize(vectors)
+        dimensions = vectors.shape[1]
+        m = self.m or dimensions // next(size for size in (8, 4, 2, 1) if dimensions % size == 0)
+        if dimensions % m:
+            raise ValueError(f"m={m} does not divide {dimensions} dimensions")
+        nlist = self.nlist or max(1, int(np.sqrt(max(len(self), len(vectors)))))
+        if len(vectors) < nlist:
+            raise ValueError(f"training needs at least nlist={nlist} vectors, got {len(vectors)}")
+        rng = np.random.default_rng(self.seed)
+        size = self.train_size or max(64 * nlist, 16384)
+        if len(vectors) > size:
+            vectors = vectors[np.sort(rng.choice(len(vectors), size, replace=False))]
+        centroids = kmeans(vectors, nlist, self.iterations, rng)
+        residuals = vectors - centroids[assign(vectors, centroids)]
+        width = dimensions // m
+        codes_per_space = min(256, len(vectors))
+        self.codebooks = np.stack([
+            kmeans(np.ascontiguousarray(residuals[:, j * width:(j + 1) * width]), codes_per_space, self.iterations, rng)
+            for j in range(m)
+        ])
+        self.centroids = centroids
+        self._lists, self._codes = self._encode(self.vectors)
+        self._postings = None
+
+    def _encode(self, vectors):
+        lists = assign(vectors, self.centroids)
+        residuals = vectors - self.centroids[lists]
+        m, _, width = self.codebooks.shape
+        codes = np.empty((len(vectors), m), dtype=np.uint8)
+        for j in range(m):
+            codes[:, j] = assign(np.ascontiguousarray(residuals[:, j * width:(j + 1) * width]), self.codebooks[j])
+        return lists, codes
+
+    def _posting_lists(self):
+        """``(rows, starts)``: the rows of list ``l`` are ``rows[starts[l]:starts[l + 1]]``."""
+        if self._postings is None:
+            rows = np.argsort(self._lists, kind="stable")
+            starts = np.concatenate([[0], np.cumsum(np.bincount(self._lists, minlength=len(self.centroids)))])
+            self._postings = rows, starts
+        return self._postings
+
+    def add(self, vectors):
+        rows = super().add(vectors)
+        if self.is_trained and len(rows):
+            lists, codes = self._encode(self._vectors[rows])
+            self._lists = np.concatenate([self._lists, lists])
+            self._codes = np.concatenate([self._codes, codes])
+            self._postings = None
+        return rows
+
+    def search(self, queries, k, mask=None, exact=False):
+        """As :meth:`FlatIndex.search`, approximately unless ``exact`` or the index is untrained."""
+        queries = normalize(queries)
+        if not self.is_trained and not exact and len(self) >= self.train_threshold:
+            self.train()
+        if exact or not self.is_trained:
+            return self._search_exact(queries, k, mask)
+
+        count = len(queries)
+        nprobe = min(self.nprobe, len(self.centroids))
+        coarse = queries @ self.centroids.T
+        probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe] if nprobe < coarse.shape[1] else (
+            np.broadcast_to(np.arange(nprobe), (count, nprobe))
+        )
+        m, _, width = self.codebooks.shape
+        # Residual inner products: q . code_j for every subspace j and code, per query.
+        tables = np.einsum("qmd,mcd->qmc", queries.reshape(count, m, width), self.codebooks)
+        postings, starts = self._posting_lists()
+
+        # Visit each probed list once, scoring it for every query that probes it.
+        pairs = np.argsort(probes, axis=None, kind="stable")
+        lists = probes.ravel()[pairs]
+        queries_of = pairs // nprobe
+        bounds = np.concatenate([[0], np.flatnonzero(np.diff(lists)) + 1, [len(lists)]])
+        found_rows = [[] for _ in range(count)]
+        found_scores = [[] for _ in range(count)]
+        for begin, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            cell = int(lists[begin])
+            rows = postings[starts[cell]:starts[cell + 1]]
+            if mask is not None:
+                rows = rows[mask[rows]]
+            if not len(rows):
+                continue
+            probing = queries_of[begin:end]
+            codes = self._codes[rows]
+            table = tables[probing]
+            scores = np.repeat(coarse[probing, cell][:, None], len(rows), axis=1)
+            for j in range(m):
+                scores += table[:, j, codes[:, j]]
+            for i, query in enumerate(probing.tolist()):
+                found_rows[query].append(rows)
+                found_scores[query].append(scores[i])
+
+        fetch = k * self.refine if self.refine else k
+        best_scores = np.full((count, k), -np.inf, dtype=np.float32)
+        best_rows = np.full((count, k), -1, dtype=np.int64)
+        for query in range(count):
+            if not found_rows[query]:
+                continue
+            rows = np.concatenate(found_rows[query])
+            scores = np.concatenate(found_scores[query])
+            if len(rows) > fetch:
+                keep = np.argpartition(-scores, fetch - 1)[:fetch]
+                rows, scores = rows[keep], scores[keep]
+            if self.refine:
+                scores = self._vectors[rows] @ queries[query]
+            top_scores, columns = top_k(scores[None, :], k)
+            best_scores[query] = top_scores[0]
+            best_rows[query] = np.where(columns[0] >= 0, rows[columns[0]], -1)
+        return best_scores, best_rows
+
+
+class NumpyVectorStore(_VectorStoreBase):
+    """LangChain vector store over a :class:`FlatIndex` (default) or :class:`IVFPQIndex`.
+
+    Scores are cosine similarities, so they double as relevance scores.
+    Deleted rows stay in the index and are masked out of searches.
+    """
+
+    def __init__(self, embedding, index=None):
+        self.embedding = embedding
+        self.index = FlatIndex() if index is None else index
+        self.ids = []
+        self.texts = []
+        self.metadatas = []
+        self._row_of = {}
+        self._live = np.ones(0, dtype=bool)
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    def __len__(self):
+        return len(self._row_of)
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        return self.add_embeddings(texts, self.embedding.embed_documents(texts) if texts else [], metadatas, ids)
+
+    def add_embeddings(self, texts, embeddings, metadatas=None, ids=None):
+        """Add ``texts`` with precomputed ``embeddings``; an existing id is replaced."""
+        texts = list(texts)
+        if not texts:
+            return []
+        ids = [str(uuid.uuid4()) for _ in texts] if ids is None else [i or str(uuid.uuid4()) for i in ids]
+        metadatas = [{} for _ in texts] if metadatas is None else list(metadatas)
+        self.delete([i for i in ids if i in self._row_of])
+        rows = self.index.add(np.asarray(embeddings, dtype=np.float32))
+        self.ids.extend(ids)
+        self.texts.extend(texts)
+        self.metadatas.extend(metadatas)
+        self._row_of.update(zip(ids, rows.tolist()))
+        self._live = np.concatenate([self._live, np.ones(len(rows), dtype=bool)])
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        if ids is None:
+            raise ValueError("No ids provided to delete.")
+        for id_ in ids:
+            row = self._row_of.pop(id_, None)
+            if row is not None:
+                self._live[row] = False
+        return True
+
+    def get_by_ids(self, ids, /):
+        return [self._document(self._row_of[id_]) for id_ in ids if id_ in self._row_of]
+
+    def _document(self, row):
+        return Document(id=self.ids[row], page_content=self.texts[row], metadata=self.metadatas[row])
+
+    def _mask(self):
+        return None if self._live.all() else self._live
+
+    def search_vectors(self, embeddings, k=4):
+        """``(scores, rows)`` arrays for a batch of query embeddings; see :meth:`FlatIndex.search`."""
+        return self.index.search(np.asarray(embeddings, dtype=np.float32), k, mask=self._mask())
+
+    def _with_scores(self, scores, rows):
+        return [
+            [(self._document(row), score) for score, row in zip(query_scores, query_rows) if row >= 0]
+            for query_scores, query_rows in zip(scores.tolist(), rows.tolist())
+        ]
+
+    def similarity_search_with_score_by_vectors(self, embeddings, k=4, **kwargs):
+        """``[(Document, score), ...]`` for every query embedding, scored as one batch."""
+        if not len(embeddings):
+            return []
+        return self._with_scores(*self.search_vectors(embeddings, k))
+
+    def similarity_search_batch_with_score(self, queries, k=4, **kwargs):
+        # One embed_documents call for the whole batch, rather than embed_query per query.
+        return self.similarity_search_with_score_by_vectors(self.embedding.embed_documents(list(queries)), k)
+
+    def similarity_search_batch(self, queries, k=4, **kwargs):
+        """The ``k`` most similar documents for each of ``queries``, embedded and scored as one batch."""
+        return [[doc for doc, _ in hits] for hits in self.similarity_search_batch_with_score(queries, k)]
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, **kwargs):
+        return self.similarity_search_with_score_by_vectors([embedding], k)[0]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k)
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def similarity_search_with_relevance_scores(self, query, k=4, score_threshold=None, **kwargs):
+        """As ``VectorStore.similarity_search_with_relevance_scores``, cutting on the score array.
+
+        Hits below ``score_threshold`` are dropped before any ``Document`` is built.
+        """
+        scores, rows = self.search_vectors([self.embedding.embed_query(query)], k)
+        keep = rows[0] >= 0
+        if score_threshold is not None:
+            keep &= scores[0] >= score_threshold
+        return [(self._document(row), score) for row, score in zip(rows[0][keep].tolist(), scores[0][keep].tolist())]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score
+
+    def max_marginal_relevance_search_by_vector(self, embedding, k=4, fetch_k=20, lambda_mult=0.5, **kwargs):
+        _, rows = self.search_vectors([embedding], max(k, fetch_k))
+        rows = rows[0][rows[0] >= 0]
+        picked = maximal_marginal_relevance(embedding, self.index.vectors[rows], lambda_mult, k)
+        return [self._document(int(rows[i])) for i in picked]
+
+    def max_marginal_relevance_search(self, query, k=4, fetch_k=20, lambda_mult=0.5, **kwargs):
+        return self.max_marginal_relevance_search_by_vector(self.embedding.embed_query(query), k, fetch_k, lambda_mult)
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, index=None, **kwargs):
+        # Remaining keyword arguments are options of the store, as in subclasses' constructors.
+        store = cls(embedding, index=index, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store